@@ -37,7 +37,7 @@ if [ ! -d "certs" ]; then
     echo "Creating SSL certificates..."
     mkdir -p certs
     cd certs
-    openssl req -x509 -newkey rsa:4096 -keyout server.key -out server.crt -days 365 -nodes -subj "/CN=localhost"
+    openssl req -x509 -newkey ec -pkeyopt ec_paramgen_curve:prime256v1 -keyout server.key -out server.crt -days 365 -nodes -subj "/CN=localhost"
     chown -R search-server:search-server .
 fi
 
@@ -9,19 +9,20 @@ echo "Setting up SSL certificates..."
 mkdir -p certs
 cd certs
 
+# ECDSA P-256 keys keep the handshake cheap compared to large RSA keys
 # Generate CA private key and certificate
-openssl genrsa -out ca.key 2048
+openssl ecparam -name prime256v1 -genkey -noout -out ca.key
 openssl req -new -x509 -days 365 -key ca.key -out ca.crt -subj "/CN=Search Server CA"
 
 # Generate server private key and CSR
-openssl genrsa -out server.key 2048
+openssl ecparam -name prime256v1 -genkey -noout -out server.key
 openssl req -new -key server.key -out server.csr -subj "/CN=localhost"
 
 # Sign server certificate with CA
 openssl x509 -req -days 365 -in server.csr -CA ca.crt -CAkey ca.key -CAcreateserial -out server.crt
 
 # Generate client private key and CSR
-openssl genrsa -out client.key 2048
+openssl ecparam -name prime256v1 -genkey -noout -out client.key
 openssl req -new -key client.key -out client.csr -subj "/CN=search_client"
 
 # Sign client certificate with CA
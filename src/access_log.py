@@ -0,0 +1,179 @@
+"""
+Structured access log module.
+
+Each handled request can produce one JSON line with the query hash,
+algorithm, client identity, per-stage timings, result and byte counts.
+Ordinary requests are sampled. Slow requests and failed requests are
+always kept. Lines are queued by the request thread and serialized,
+written and rotated by a background listener thread.
+"""
+
+import hashlib
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import time
+from typing import Any, Callable, Dict
+
+from utils import DEFAULT_LOG_QUEUE_SIZE, DroppingQueueHandler
+
+# Results that are always logged regardless of sampling
+ERROR_RESULTS = frozenset({"invalid", "file_not_found", "error"})
+
+DEFAULT_SAMPLE_RATE = 0.01
+DEFAULT_SLOW_THRESHOLD = 0.1
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024
+DEFAULT_BACKUP_COUNT = 5
+
+
+def query_hash(query: str) -> str:
+    """Get a short, stable hash identifying a query without storing it."""
+    return hashlib.blake2b(query.encode("utf-8"), digest_size=8).hexdigest()
+
+
+class _JsonLine:
+    """Access record serialized only when the listener writes it."""
+
+    __slots__ = ("fields",)
+
+    def __init__(self, fields: Dict[str, Any]) -> None:
+        self.fields = fields
+
+    def __str__(self) -> str:
+        return json.dumps(self.fields, separators=(",", ":"))
+
+
+class JsonLinesWriter:
+    """Rotating JSON-lines file written by a background thread."""
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        backup_count: int = DEFAULT_BACKUP_COUNT,
+        queue_size: int = DEFAULT_LOG_QUEUE_SIZE,
+    ) -> None:
+        """
+        Initialize writer.
+
+        Args:
+            path: Output file
+            max_bytes: Rotate the file when it reaches this size
+            backup_count: Number of rotated files to keep
+            queue_size: Maximum number of records waiting to be written;
+                records beyond it are dropped and counted
+        """
+        self.path = path
+        file_handler = logging.handlers.RotatingFileHandler(
+            path, maxBytes=max_bytes, backupCount=backup_count, delay=True
+        )
+        file_handler.setFormatter(logging.Formatter("%(message)s"))
+        self._handler = DroppingQueueHandler(queue.Queue(maxsize=queue_size))
+        self._listener = logging.handlers.QueueListener(
+            self._handler.queue, file_handler
+        )
+        self._file_handler = file_handler
+        self._running = False
+
+    @property
+    def dropped(self) -> int:
+        """Get the number of records dropped because the queue was full."""
+        return self._handler.dropped
+
+    def start(self) -> None:
+        """Start the writer thread."""
+        if not self._running:
+            self._listener.start()
+            self._running = True
+
+    def stop(self) -> None:
+        """Write out queued records and stop the writer thread."""
+        if self._running:
+            self._listener.stop()
+            self._running = False
+        self._file_handler.close()
+
+    def write(self, fields: Dict[str, Any]) -> None:
+        """
+        Queue a record; it is serialized on the writer thread.
+
+        Args:
+            fields: JSON-serializable record
+        """
+        self._handler.handle(
+            logging.makeLogRecord(
+                {
+                    "name": "search_server.access",
+                    "levelno": logging.INFO,
+                    "levelname": "INFO",
+                    "msg": _JsonLine(fields),
+                }
+            )
+        )
+
+
+class AccessLog(JsonLinesWriter):
+    """Sampled JSON-lines access log with off-thread rotation."""
+
+    def __init__(
+        self,
+        path: str,
+        sample_rate: float = DEFAULT_SAMPLE_RATE,
+        slow_threshold: float = DEFAULT_SLOW_THRESHOLD,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        backup_count: int = DEFAULT_BACKUP_COUNT,
+        queue_size: int = DEFAULT_LOG_QUEUE_SIZE,
+        rng: Callable[[], float] = random.random,
+    ) -> None:
+        """
+        Initialize access log.
+
+        Args:
+            path: File the access log is written to
+            sample_rate: Fraction of ordinary requests to log (0.0 - 1.0)
+            slow_threshold: Requests taking at least this many seconds
+                are always logged
+            max_bytes: Rotate the file when it reaches this size
+            backup_count: Number of rotated files to keep
+            queue_size: Maximum number of records waiting to be written;
+                records beyond it are dropped and counted
+            rng: Random source used for sampling
+        """
+        super().__init__(path, max_bytes, backup_count, queue_size)
+        self.sample_rate = sample_rate
+        self.slow_threshold = slow_threshold
+        self.rng = rng
+
+    def should_log(self, result: str, duration: float) -> bool:
+        """
+        Decide whether a request is written to the access log.
+
+        Args:
+            result: Request result label
+            duration: Total request time in seconds
+
+        Returns:
+            bool: True for failed and slow requests, and for a sampled
+                fraction of the rest
+        """
+        if result in ERROR_RESULTS or duration >= self.slow_threshold:
+            return True
+        return self.sample_rate > 0 and self.rng() < self.sample_rate
+
+    def log(self, fields: Dict[str, Any]) -> bool:
+        """
+        Queue a request record if it passes sampling.
+
+        Args:
+            fields: Record fields; must include "result" and "duration"
+
+        Returns:
+            bool: True if the record was kept
+        """
+        if not self.should_log(fields["result"], fields["duration"]):
+            return False
+        fields.setdefault("ts", time.time())
+        self.write(fields)
+        return True
@@ -0,0 +1,559 @@
+"""
+Asyncio client module for the search server.
+
+AsyncSearchClient keeps a few kept-alive connections open and pipelines
+requests over them. Each connection holds a FIFO of pending requests, and a
+reader task matches the newline-delimited responses to them in order. A
+semaphore bounds the number of requests in flight, so one process can keep
+thousands of queries going without a thread or socket per call.
+
+Connections belong to the event loop that opened them: use one client
+inside a single asyncio.run().
+"""
+
+import asyncio
+import json
+import logging
+import ssl
+from collections import deque
+from pathlib import Path
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Deque,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from client import (
+    DEFAULT_PORT,
+    get_client_ssl_context,
+    parse_command_response,
+    parse_search_response,
+)
+from config import Config
+
+logger = logging.getLogger("search_client")
+
+DEFAULT_CONNECTIONS = 4
+DEFAULT_MAX_CONCURRENCY = 256
+# Matches the server's default keepalive_max_requests
+DEFAULT_MAX_REQUESTS_PER_CONNECTION = 1000
+
+
+async def _outcome(query: str, task: "asyncio.Future[Any]") -> Tuple[str, Any]:
+    """Wait for a search, returning the exception instead of raising it."""
+    try:
+        found, _ = await task
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        return query, e
+    return query, found
+
+
+class _PipelinedConnection:
+    """A connection with requests written ahead of their responses."""
+
+    def __init__(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+        max_requests: int,
+    ) -> None:
+        """
+        Initialize connection and start reading responses.
+
+        Args:
+            reader: Stream the responses arrive on
+            writer: Stream requests are written to
+            max_requests: Requests sent before the connection is retired
+        """
+        self.reader = reader
+        self.writer = writer
+        self.max_requests = max_requests
+        self.sent = 0
+        self.answered = 0
+        self.closed = False
+        self.pending: Deque["asyncio.Future[str]"] = deque()
+        self._read_task = asyncio.get_running_loop().create_task(
+            self._read_responses()
+        )
+
+    @property
+    def usable(self) -> bool:
+        """Get whether more requests may be sent on this connection."""
+        return not self.closed and self.sent < self.max_requests
+
+    def send(self, payload: bytes) -> "asyncio.Future[str]":
+        """
+        Write a request without waiting for earlier responses.
+
+        Args:
+            payload: Encoded, newline-terminated request
+
+        Returns:
+            Future resolved with the response line
+        """
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append(future)
+        self.sent += 1
+        self.writer.write(payload)
+        return future
+
+    async def _read_responses(self) -> None:
+        """Resolve pending requests in order until the connection ends."""
+        error = ConnectionError("Connection closed by server")
+        try:
+            while True:
+                line = await self.reader.readline()
+                if not line or not self.pending:
+                    break
+                self.answered += 1
+                future = self.pending.popleft()
+                # Callers that timed out or were cancelled left their future
+                # done; the response is still consumed to keep the order
+                if not future.done():
+                    future.set_result(line.decode("utf-8").rstrip("\r\n"))
+                if self.sent >= self.max_requests and not self.pending:
+                    break
+        except Exception as e:
+            error = ConnectionError(f"Connection failed: {str(e)}")
+        finally:
+            self.closed = True
+            while self.pending:
+                future = self.pending.popleft()
+                if not future.done():
+                    future.set_exception(error)
+            self.writer.close()
+
+    async def close(self) -> None:
+        """Stop reading and close the connection."""
+        self._read_task.cancel()
+        try:
+            await self._read_task
+        except asyncio.CancelledError:
+            pass
+
+
+class AsyncSearchClient:
+    """Asyncio client for the search server."""
+
+    def __init__(
+        self,
+        port: Optional[int] = None,
+        config_path: Optional[str] = None,
+        timeout: Optional[float] = None,
+        unix_socket: Optional[str] = None,
+        connections: int = DEFAULT_CONNECTIONS,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        max_requests_per_connection: int = (
+            DEFAULT_MAX_REQUESTS_PER_CONNECTION
+        ),
+        transport: Optional[str] = None,
+        host: str = "localhost",
+    ) -> None:
+        """
+        Initialize asyncio search client.
+
+        Args:
+            port: Port number to connect to (overrides config)
+            config_path: Path to the configuration file
+            timeout: Seconds allowed for connecting and for each request
+            unix_socket: Path of the server's Unix domain socket (overrides
+                config)
+            connections: Maximum number of connections requests are
+                pipelined over
+            max_concurrency: Maximum number of requests in flight
+            max_requests_per_connection: Requests sent on a connection
+                before it is retired; keep it at or below the server's
+                keepalive_max_requests
+            transport: "tls" or "tcp" to skip probing; by default TLS is
+                tried first and the transport that works is kept
+            host: Server host name; with TLS it must match the server
+                certificate
+        """
+        self.config = None
+        if config_path:
+            try:
+                self.config = Config(config_path)
+            except FileNotFoundError:
+                logger.warning(
+                    "Config file not found: %s, using defaults", config_path
+                )
+                self.config = None
+
+        self.host = host
+        self.port = port
+        if self.port is None:
+            self.port = self.config.port if self.config else DEFAULT_PORT
+        self.timeout = timeout
+        self.unix_socket = unix_socket
+        if self.unix_socket is None and self.config:
+            self.unix_socket = self.config.unix_socket_path
+        self.connections = connections
+        self.max_concurrency = max_concurrency
+        self.max_requests_per_connection = max_requests_per_connection
+        self.ssl_context = None
+        # "tls" or "tcp" once the first connection has succeeded
+        self.transport = transport
+        # Set when the server closes connections after one response
+        self.keepalive_refused = False
+        self._connections: List[_PipelinedConnection] = []
+        self._connect_lock: Optional[asyncio.Lock] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def __aenter__(self) -> "AsyncSearchClient":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.close()
+
+    def _should_try_ssl(self) -> bool:
+        """Check whether TLS should be attempted, like SearchClient."""
+        return bool(
+            (self.config and self.config.ssl_enabled)
+            or Path("certs").exists()
+        )
+
+    async def _open_streams(
+        self,
+    ) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        """
+        Open a connection, trying TLS first until a transport is known.
+
+        Returns:
+            Tuple of (reader, writer)
+
+        Raises:
+            ConnectionError: If the connection failed
+        """
+        if self.unix_socket:
+            try:
+                return await asyncio.open_unix_connection(self.unix_socket)
+            except OSError as e:
+                raise ConnectionError(
+                    f"Failed to connect to {self.unix_socket}: {str(e)}"
+                )
+
+        if self.transport == "tls" or (
+            self.transport is None and self._should_try_ssl()
+        ):
+            try:
+                if self.ssl_context is None:
+                    self.ssl_context = get_client_ssl_context()
+                streams = await asyncio.open_connection(
+                    self.host,
+                    self.port,
+                    ssl=self.ssl_context,
+                    server_hostname=self.host,
+                )
+            except FileNotFoundError as e:
+                logger.warning("SSL setup error: %s, using plain TCP", e)
+            except ssl.SSLError as e:
+                # A plain TCP server answers the ClientHello with a response
+                # line; a connection closed early says nothing about TLS
+                if self.transport == "tls" or isinstance(
+                    e, ssl.SSLEOFError
+                ):
+                    raise ConnectionError(
+                        f"Failed to connect to server: {str(e)}"
+                    )
+                logger.warning(
+                    "SSL connection failed: %s, using plain TCP for "
+                    "%s:%s", e, self.host, self.port,
+                )
+            except OSError as e:
+                raise ConnectionError(
+                    f"Failed to connect to server: {str(e)}"
+                )
+            else:
+                self.transport = "tls"
+                return streams
+
+        try:
+            streams = await asyncio.open_connection(self.host, self.port)
+        except OSError as e:
+            raise ConnectionError(f"Failed to connect to server: {str(e)}")
+        self.transport = "tcp"
+        return streams
+
+    def _pick(self) -> Optional[_PipelinedConnection]:
+        """
+        Choose the connection with the fewest pending requests.
+
+        Returns:
+            A connection, or None if a new one should be opened
+        """
+        self._connections = [c for c in self._connections if c.usable]
+        best = min(
+            self._connections, key=lambda c: len(c.pending), default=None
+        )
+        if best is not None and (
+            not best.pending or len(self._connections) >= self.connections
+        ):
+            return best
+        return None
+
+    async def _acquire(self) -> _PipelinedConnection:
+        """Get a connection to pipeline the next request on."""
+        connection = self._pick()
+        if connection is not None:
+            return connection
+        if self._connect_lock is None:
+            self._connect_lock = asyncio.Lock()
+        async with self._connect_lock:
+            # Others may have opened connections while this one waited
+            connection = self._pick()
+            if connection is not None:
+                return connection
+            reader, writer = await self._with_timeout(self._open_streams())
+            connection = _PipelinedConnection(
+                reader, writer, self.max_requests_per_connection
+            )
+            self._connections.append(connection)
+            return connection
+
+    async def _with_timeout(self, awaitable: Any) -> Any:
+        """Await with the client timeout, raising TimeoutError."""
+        if self.timeout is None:
+            return await awaitable
+        try:
+            return await asyncio.wait_for(awaitable, self.timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError("Connection timed out")
+
+    async def _one_shot(self, request: Dict[str, Any]) -> str:
+        """Send a request on its own connection (no keep-alive)."""
+        reader, writer = await self._with_timeout(self._open_streams())
+        try:
+            writer.write(json.dumps(request).encode("utf-8") + b"\n")
+            line = await self._with_timeout(reader.readline())
+        finally:
+            writer.close()
+        if not line:
+            raise ConnectionError("Connection closed by server")
+        return line.decode("utf-8").rstrip("\r\n")
+
+    async def _request(self, request: Dict[str, Any]) -> str:
+        """
+        Send a request, pipelined on a kept-alive connection.
+
+        A request lost because its connection ended is retried once on
+        another connection; searches and commands are safe to repeat.
+
+        Args:
+            request: Request object
+
+        Returns:
+            Response line without the trailing newline
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self._semaphore:
+            if self.keepalive_refused:
+                return await self._one_shot(request)
+
+            payload = json.dumps(dict(request, keepalive=True)).encode(
+                "utf-8"
+            ) + b"\n"
+            for attempt in range(2):
+                connection = await self._acquire()
+                future = connection.send(payload)
+                try:
+                    await connection.writer.drain()
+                    return await self._with_timeout(future)
+                except ConnectionError:
+                    future.cancel()
+                    # The server dropped the connection before a second
+                    # response: it closes after each request
+                    if connection.answered <= 1 < connection.sent:
+                        self.keepalive_refused = True
+                        logger.info(
+                            "Server does not keep connections alive, using "
+                            "one connection per request"
+                        )
+                        return await self._one_shot(request)
+                    if attempt:
+                        raise
+        raise ConnectionError("Request failed")  # pragma: no cover
+
+    async def search(
+        self, query: str, algorithm: str = "linear", benchmark: bool = False
+    ) -> Tuple[bool, float]:
+        """
+        Search for a string on the server.
+
+        Args:
+            query: String to search for
+            algorithm: Search algorithm to use
+            benchmark: Whether to run in benchmark mode
+
+        Returns:
+            Tuple of (found, execution_time)
+
+        Raises:
+            TimeoutError: If the request took longer than the timeout
+            ConnectionError: If the server could not be reached
+        """
+        response = await self._request(
+            {"query": query, "algorithm": algorithm, "benchmark": benchmark}
+        )
+        return parse_search_response(response), 0.0
+
+    async def search_many(
+        self,
+        queries: Iterable[str],
+        algorithm: str = "linear",
+        return_exceptions: bool = False,
+    ) -> List[Any]:
+        """
+        Run many searches concurrently.
+
+        At most max_concurrency searches are in flight at once. Results
+        are returned in query order. If one search fails and
+        return_exceptions is False, the remaining ones are cancelled.
+
+        Args:
+            queries: Strings to search for
+            algorithm: Search algorithm to use
+            return_exceptions: Return exceptions in place of results
+                instead of raising the first one
+
+        Returns:
+            One (found, execution_time) tuple, or exception, per query
+        """
+        tasks = [
+            asyncio.ensure_future(self.search(query, algorithm))
+            for query in queries
+        ]
+        try:
+            return await asyncio.gather(
+                *tasks, return_exceptions=return_exceptions
+            )
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def search_stream(
+        self,
+        queries: Union[Iterable[str], AsyncIterable[str]],
+        algorithm: str = "linear",
+        window: Optional[int] = None,
+    ) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Search a stream of queries, yielding results in input order.
+
+        Queries are taken from the iterable only while fewer than window
+        searches are in flight, so memory stays bounded however long the
+        input is. A result is yielded as soon as it and every result before
+        it have arrived, even while an async iterable is waiting for its
+        next query. A plain iterable is read on the event loop, so it must
+        not block; pass an async iterable for pipes and terminals.
+
+        Args:
+            queries: Strings to search for, e.g. lines of a file
+            algorithm: Search algorithm to use
+            window: Maximum number of searches in flight (defaults to
+                max_concurrency)
+
+        Yields:
+            (query, result) tuples, where result is whether the query was
+            found or the exception its search raised
+        """
+        if window is None:
+            window = self.max_concurrency
+        if hasattr(queries, "__aiter__"):
+            results = self._stream_async(queries, algorithm, window)
+        else:
+            results = self._stream_sync(queries, algorithm, window)
+        async for result in results:
+            yield result
+
+    async def _stream_sync(
+        self, queries: Iterable[str], algorithm: str, window: int
+    ) -> AsyncIterator[Tuple[str, Any]]:
+        """Run search_stream over a non-blocking iterable."""
+        pending: Deque[Tuple[str, "asyncio.Future[Any]"]] = deque()
+        try:
+            for query in queries:
+                task = asyncio.ensure_future(self.search(query, algorithm))
+                pending.append((query, task))
+                # Let the request be written, and hand back every finished
+                # head, before the next query is read
+                await asyncio.sleep(0)
+                while pending and (
+                    len(pending) >= window or pending[0][1].done()
+                ):
+                    yield await _outcome(*pending.popleft())
+            while pending:
+                yield await _outcome(*pending.popleft())
+        finally:
+            for _, task in pending:
+                task.cancel()
+
+    async def _stream_async(
+        self, queries: AsyncIterable[str], algorithm: str, window: int
+    ) -> AsyncIterator[Tuple[str, Any]]:
+        """Run search_stream, waiting on the input and the oldest search."""
+        pending: Deque[Tuple[str, "asyncio.Future[Any]"]] = deque()
+        source = queries.__aiter__()
+        reading: Optional["asyncio.Future[str]"] = None
+        exhausted = False
+        try:
+            while True:
+                while pending and pending[0][1].done():
+                    yield await _outcome(*pending.popleft())
+                if reading is None and not exhausted and len(pending) < window:
+                    reading = asyncio.ensure_future(source.__anext__())
+                waiting: List["asyncio.Future[Any]"] = []
+                if reading is not None:
+                    waiting.append(reading)
+                if pending:
+                    waiting.append(pending[0][1])
+                if not waiting:
+                    return
+                await asyncio.wait(
+                    waiting, return_when=asyncio.FIRST_COMPLETED
+                )
+                if reading is not None and reading.done():
+                    try:
+                        query = reading.result()
+                    except StopAsyncIteration:
+                        exhausted = True
+                    else:
+                        task = asyncio.ensure_future(
+                            self.search(query, algorithm)
+                        )
+                        pending.append((query, task))
+                    reading = None
+        finally:
+            if reading is not None:
+                reading.cancel()
+            for _, task in pending:
+                task.cancel()
+
+    async def command(self, name: str, **params: Any) -> Any:
+        """
+        Run an admin command on the server.
+
+        Args:
+            name: Command name, e.g. "stats"
+            params: Extra command parameters
+
+        Returns:
+            Decoded JSON result
+        """
+        response = await self._request({"command": name, **params})
+        return parse_command_response(name, response)
+
+    async def close(self) -> None:
+        """Close every connection."""
+        connections, self._connections = self._connections, []
+        for connection in connections:
+            await connection.close()
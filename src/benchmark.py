@@ -0,0 +1,709 @@
+"""
+Reproducible benchmarks for the search algorithms.
+
+Each scenario describes a corpus (number of lines, line length, share of
+duplicate lines, share of non-ASCII lines) that is generated from a seed, so
+the same command always searches the same data with the same queries. Every
+algorithm is run for a few unmeasured warmup rounds and then for a number of
+timed trials; each trial searches the whole query set once and records the
+mean time per query.
+
+Two commands:
+
+- run: benchmark the scenarios and print a table, or JSON with --json.
+  --output FILE also writes the JSON so it can be kept as a baseline.
+- compare: compare a run against a stored baseline and exit with status 1
+  if any scenario regressed.
+- limiters: check rate limits from many threads and report checks per
+  second for each limiter, shard count and thread count.
+
+Run it as python3 src/benchmark.py.
+"""
+
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import string
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from rate_limiter import SLIDING_LOG, TOKEN_BUCKET, create_rate_limiter
+from search import FileSearcher, SearchAlgorithm
+
+SCHEMA_VERSION = 1
+DEFAULT_TRIALS = 5
+DEFAULT_WARMUP = 1
+DEFAULT_QUERIES = 50
+DEFAULT_HIT_RATIO = 0.5
+DEFAULT_THRESHOLD = 0.10
+LIMITER_SHARDS = (1, 16)
+LIMITER_THREADS = (1, 4, 16)
+DEFAULT_CLIENTS_PER_THREAD = 50
+DEFAULT_CHECKS_PER_CLIENT = 40
+
+ASCII_ALPHABET = string.ascii_letters + string.digits + ";"
+# Two-, three- and four-byte UTF-8 characters
+UNICODE_ALPHABET = "éñüßøçαβγδλπЖЯжя中文字检索搜索日本語한국어🙂🚀🔍"
+# Never generated, so a query ending in it cannot be found
+MISS_SUFFIX = "#"
+
+
+class CorpusSpec(NamedTuple):
+    """Parameters a benchmark corpus is generated from."""
+
+    lines: int = 10000
+    min_length: int = 10
+    max_length: int = 50
+    duplicate_ratio: float = 0.0
+    unicode_ratio: float = 0.0
+    seed: int = 0
+
+
+SCENARIOS: Dict[str, CorpusSpec] = {
+    "small": CorpusSpec(lines=1000),
+    "medium": CorpusSpec(lines=10000),
+    "large": CorpusSpec(lines=100000),
+    "long_lines": CorpusSpec(lines=10000, min_length=200, max_length=1000),
+    "duplicates": CorpusSpec(lines=10000, duplicate_ratio=0.5),
+    "unicode": CorpusSpec(lines=10000, unicode_ratio=0.5),
+}
+
+
+class Comparison(NamedTuple):
+    """How one benchmark changed between a baseline and a run."""
+
+    key: str
+    baseline: Optional[float]
+    current: Optional[float]
+    change: Optional[float]
+    status: str
+
+
+def generate_corpus(spec: CorpusSpec) -> List[str]:
+    """
+    Generate corpus lines from a spec.
+
+    Args:
+        spec: Corpus parameters
+
+    Returns:
+        Lines, identical for identical specs
+
+    Raises:
+        ValueError: If the spec is invalid
+    """
+    if spec.lines < 1:
+        raise ValueError("lines must be positive")
+    if not 1 <= spec.min_length <= spec.max_length:
+        raise ValueError("need 1 <= min_length <= max_length")
+    for name in ("duplicate_ratio", "unicode_ratio"):
+        if not 0.0 <= getattr(spec, name) <= 1.0:
+            raise ValueError(f"{name} must be between 0 and 1")
+
+    rng = random.Random(spec.seed)
+    lines: List[str] = []
+    for _ in range(spec.lines):
+        if lines and rng.random() < spec.duplicate_ratio:
+            lines.append(rng.choice(lines))
+            continue
+        alphabet = ASCII_ALPHABET
+        if rng.random() < spec.unicode_ratio:
+            alphabet = UNICODE_ALPHABET
+        length = rng.randint(spec.min_length, spec.max_length)
+        lines.append("".join(rng.choices(alphabet, k=length)))
+    return lines
+
+
+def write_corpus(spec: CorpusSpec, path: str) -> List[str]:
+    """
+    Generate a corpus and write it to a file, one line each.
+
+    Args:
+        spec: Corpus parameters
+        path: File to write
+
+    Returns:
+        The lines written
+    """
+    lines = generate_corpus(spec)
+    with open(path, "w", encoding="utf-8") as f:
+        for line in lines:
+            f.write(f"{line}\n")
+    return lines
+
+
+def make_queries(
+    lines: Sequence[str], count: int, hit_ratio: float, seed: int
+) -> List[str]:
+    """
+    Pick queries for a corpus.
+
+    Args:
+        lines: Corpus lines
+        count: Number of queries
+        hit_ratio: Fraction of queries that are lines of the corpus
+        seed: Random seed
+
+    Returns:
+        Queries; the misses are corpus lines with a suffix that never occurs
+    """
+    if not 0.0 <= hit_ratio <= 1.0:
+        raise ValueError("hit_ratio must be between 0 and 1")
+    rng = random.Random(seed)
+    hits = round(count * hit_ratio)
+    queries = [rng.choice(lines) for _ in range(hits)]
+    queries += [rng.choice(lines) + MISS_SUFFIX for _ in range(count - hits)]
+    rng.shuffle(queries)
+    return queries
+
+
+def measure(
+    func: Callable[[], Any], trials: int, warmup: int = 0
+) -> List[float]:
+    """
+    Time repeated calls of a function.
+
+    Garbage collection is disabled while each trial runs, as timeit does.
+
+    Args:
+        func: Function to time
+        trials: Number of timed calls
+        warmup: Number of untimed calls first
+
+    Returns:
+        Seconds taken by each timed call
+    """
+    if trials < 1:
+        raise ValueError("trials must be positive")
+    for _ in range(warmup):
+        func()
+    samples = []
+    gc_was_enabled = gc.isenabled()
+    try:
+        for _ in range(trials):
+            gc.collect()
+            gc.disable()
+            start = time.perf_counter_ns()
+            func()
+            samples.append((time.perf_counter_ns() - start) / 1e9)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return samples
+
+
+def summarize(samples: Sequence[float]) -> Dict[str, float]:
+    """
+    Compute statistics of benchmark samples.
+
+    Args:
+        samples: Measurements
+
+    Returns:
+        Minimum, maximum, mean, median and sample standard deviation
+    """
+    return {
+        "min": min(samples),
+        "max": max(samples),
+        "mean": statistics.fmean(samples),
+        "median": statistics.median(samples),
+        "stdev": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+    }
+
+
+def benchmark_scenario(
+    name: str,
+    spec: CorpusSpec,
+    algorithms: Iterable[SearchAlgorithm],
+    directory: str,
+    trials: int = DEFAULT_TRIALS,
+    warmup: int = DEFAULT_WARMUP,
+    queries: int = DEFAULT_QUERIES,
+    hit_ratio: float = DEFAULT_HIT_RATIO,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Benchmark the algorithms on one generated corpus.
+
+    Args:
+        name: Scenario name
+        spec: Corpus parameters
+        algorithms: Algorithms to benchmark
+        directory: Directory the corpus file is written to
+        trials: Timed trials per algorithm
+        warmup: Untimed rounds per algorithm
+        queries: Queries per trial
+        hit_ratio: Fraction of queries that are found
+
+    Returns:
+        Results keyed by "scenario/algorithm"; samples and statistics are
+        microseconds per query
+    """
+    path = os.path.join(directory, f"{name}.txt")
+    lines = write_corpus(spec, path)
+    query_set = make_queries(lines, queries, hit_ratio, spec.seed)
+    searcher = FileSearcher(path)
+
+    results = {}
+    for algorithm in algorithms:
+        # Load (and for binary search, sort) outside the timed trials
+        searcher.search(query_set[0], algorithm)
+
+        def run_queries(algorithm: SearchAlgorithm = algorithm) -> None:
+            for query in query_set:
+                searcher.search(query, algorithm)
+
+        samples = [
+            seconds / len(query_set) * 1e6
+            for seconds in measure(run_queries, trials, warmup)
+        ]
+        results[f"{name}/{algorithm.value}"] = {
+            "scenario": name,
+            "algorithm": algorithm.value,
+            "corpus": spec._asdict(),
+            "unit": "us",
+            "samples": samples,
+            "stats": summarize(samples),
+        }
+    return results
+
+
+def environment() -> Dict[str, Any]:
+    """Describe the machine, so runs from different machines stand out."""
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def run(
+    scenarios: Optional[Sequence[str]] = None,
+    algorithms: Optional[Sequence[str]] = None,
+    trials: int = DEFAULT_TRIALS,
+    warmup: int = DEFAULT_WARMUP,
+    queries: int = DEFAULT_QUERIES,
+    hit_ratio: float = DEFAULT_HIT_RATIO,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """
+    Run the benchmark suite.
+
+    Args:
+        scenarios: Names from SCENARIOS (default: all of them)
+        algorithms: Algorithm names (default: all of them)
+        trials: Timed trials per benchmark
+        warmup: Untimed rounds per benchmark
+        queries: Queries per trial
+        hit_ratio: Fraction of queries that are found
+        seed: Seed for every corpus and query set
+
+    Returns:
+        Report that can be serialized as JSON
+
+    Raises:
+        ValueError: If a scenario or algorithm is unknown
+    """
+    names = list(scenarios or SCENARIOS)
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        raise ValueError(f"Unknown scenario: {', '.join(unknown)}")
+    selected = [SearchAlgorithm(a) for a in algorithms or ()] or list(
+        SearchAlgorithm
+    )
+
+    results: Dict[str, Dict[str, Any]] = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for name in names:
+            spec = SCENARIOS[name]._replace(seed=seed)
+            results.update(
+                benchmark_scenario(
+                    name, spec, selected, directory, trials, warmup,
+                    queries, hit_ratio,
+                )
+            )
+    return {
+        "schema": SCHEMA_VERSION,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "environment": environment(),
+        "settings": {
+            "trials": trials,
+            "warmup": warmup,
+            "queries": queries,
+            "hit_ratio": hit_ratio,
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def stress_rate_limiter(
+    limiter: Any,
+    threads: int,
+    clients_per_thread: int = DEFAULT_CLIENTS_PER_THREAD,
+    checks_per_client: int = DEFAULT_CHECKS_PER_CLIENT,
+) -> Tuple[float, Dict[str, int]]:
+    """
+    Check rate limits from several threads at once.
+
+    Each thread checks its own clients, so the allowed count of every
+    client is known while threads still contend for the limiter's shards.
+
+    Args:
+        limiter: Rate limiter to check against
+        threads: Number of threads
+        clients_per_thread: Clients each thread checks
+        checks_per_client: Checks per client
+
+    Returns:
+        Tuple of (seconds taken, allowed checks keyed by client)
+    """
+    allowed: Dict[str, int] = {}
+
+    def work(thread_id: int) -> None:
+        for client in range(clients_per_thread):
+            key = f"10.{thread_id}.0.{client}"
+            allowed[key] = sum(
+                limiter.check_rate_limit(key)
+                for _ in range(checks_per_client)
+            )
+
+    workers = [
+        threading.Thread(target=work, args=(i,)) for i in range(threads)
+    ]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return time.perf_counter() - start, allowed
+
+
+def run_limiters(
+    shards: Sequence[int] = LIMITER_SHARDS,
+    threads: Sequence[int] = LIMITER_THREADS,
+    clients_per_thread: int = DEFAULT_CLIENTS_PER_THREAD,
+    checks_per_client: int = DEFAULT_CHECKS_PER_CLIENT,
+) -> Dict[str, Any]:
+    """
+    Measure rate limiter throughput for each shard and thread count.
+
+    Args:
+        shards: Shard counts to try
+        threads: Thread counts to try
+        clients_per_thread: Clients each thread checks
+        checks_per_client: Checks per client
+
+    Returns:
+        Report that can be serialized as JSON, with results keyed like
+        "sliding_log/shards=16/threads=4"
+    """
+    results: Dict[str, Dict[str, Any]] = {}
+    for algorithm in (SLIDING_LOG, TOKEN_BUCKET):
+        for shard_count in shards:
+            for thread_count in threads:
+                limiter = create_rate_limiter(
+                    algorithm, checks_per_client, 3600, shards=shard_count
+                )
+                seconds, _ = stress_rate_limiter(
+                    limiter, thread_count, clients_per_thread,
+                    checks_per_client,
+                )
+                checks = thread_count * clients_per_thread * checks_per_client
+                key = (
+                    f"{algorithm}/shards={shard_count}/threads={thread_count}"
+                )
+                results[key] = {
+                    "algorithm": algorithm,
+                    "shards": shard_count,
+                    "threads": thread_count,
+                    "checks": checks,
+                    "seconds": seconds,
+                    "checks_per_second": checks / seconds,
+                }
+    return {
+        "schema": SCHEMA_VERSION,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "environment": environment(),
+        "settings": {
+            "clients_per_thread": clients_per_thread,
+            "checks_per_client": checks_per_client,
+        },
+        "results": results,
+    }
+
+
+def compare(
+    baseline: Dict[str, Any],
+    current: Dict[str, Any],
+    threshold: float = DEFAULT_THRESHOLD,
+) -> List[Comparison]:
+    """
+    Compare a run against a baseline by median time per query.
+
+    A benchmark regressed when its median is more than threshold slower
+    and even its fastest trial is slower than the baseline median, so a
+    single noisy trial cannot flag it. Improvements are judged the same
+    way in the other direction.
+
+    Args:
+        baseline: Report from run()
+        current: Report from run()
+        threshold: Relative change of the median that counts
+
+    Returns:
+        One comparison per benchmark in either report
+    """
+    old = baseline["results"]
+    new = current["results"]
+    comparisons = []
+    for key in sorted(set(old) | set(new)):
+        if key not in new:
+            median = old[key]["stats"]["median"]
+            comparisons.append(Comparison(key, median, None, None, "missing"))
+            continue
+        if key not in old:
+            median = new[key]["stats"]["median"]
+            comparisons.append(Comparison(key, None, median, None, "new"))
+            continue
+        before = old[key]["stats"]
+        after = new[key]["stats"]
+        change = after["median"] / before["median"] - 1
+        status = "unchanged"
+        if change > threshold and after["min"] > before["median"]:
+            status = "regression"
+        elif change < -threshold and after["max"] < before["median"]:
+            status = "improvement"
+        comparisons.append(
+            Comparison(key, before["median"], after["median"], change, status)
+        )
+    return comparisons
+
+
+def format_results(report: Dict[str, Any]) -> str:
+    """Format a run as a table of microseconds per query."""
+    header = (
+        f"{'benchmark':<24} {'median':>10} {'mean':>10} {'stdev':>9} "
+        f"{'min':>10} {'max':>10}"
+    )
+    rows = [header, "-" * len(header)]
+    for key, result in report["results"].items():
+        stats = result["stats"]
+        rows.append(
+            f"{key:<24} {stats['median']:>10.2f} {stats['mean']:>10.2f} "
+            f"{stats['stdev']:>9.2f} {stats['min']:>10.2f} "
+            f"{stats['max']:>10.2f}"
+        )
+    settings = report["settings"]
+    rows.append(
+        f"(us per query; {settings['trials']} trials, "
+        f"{settings['warmup']} warmup, {settings['queries']} queries, "
+        f"seed {settings['seed']})"
+    )
+    return "\n".join(rows)
+
+
+def format_limiters(report: Dict[str, Any]) -> str:
+    """Format a limiters run as a table of checks per second."""
+    header = (
+        f"{'algorithm':<14} {'shards':>6} {'threads':>7} {'checks/s':>12}"
+    )
+    rows = [header, "-" * len(header)]
+    for result in report["results"].values():
+        rows.append(
+            f"{result['algorithm']:<14} {result['shards']:>6} "
+            f"{result['threads']:>7} {result['checks_per_second']:>12,.0f}"
+        )
+    return "\n".join(rows)
+
+
+def format_comparisons(comparisons: Sequence[Comparison]) -> str:
+    """Format comparisons as a table of median microseconds per query."""
+    header = (
+        f"{'benchmark':<24} {'baseline':>10} {'current':>10} "
+        f"{'change':>8}  status"
+    )
+    rows = [header, "-" * len(header)]
+    for item in comparisons:
+        baseline = "-" if item.baseline is None else f"{item.baseline:.2f}"
+        current = "-" if item.current is None else f"{item.current:.2f}"
+        change = "-" if item.change is None else f"{item.change:+.1%}"
+        rows.append(
+            f"{item.key:<24} {baseline:>10} {current:>10} {change:>8}  "
+            f"{item.status}"
+        )
+    return "\n".join(rows)
+
+
+def load_report(path: str) -> Dict[str, Any]:
+    """
+    Read a JSON report written by the run command.
+
+    Args:
+        path: Report file
+
+    Returns:
+        The report
+
+    Raises:
+        ValueError: If the file is not a report of this schema
+    """
+    with open(path, encoding="utf-8") as f:
+        report = json.load(f)
+    if not isinstance(report, dict) or "results" not in report:
+        raise ValueError(f"{path} is not a benchmark report")
+    if report.get("schema") != SCHEMA_VERSION:
+        raise ValueError(
+            f"{path} has schema {report.get('schema')}, "
+            f"expected {SCHEMA_VERSION}"
+        )
+    return report
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """Main entry point."""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Benchmark the search algorithms on generated corpora"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Run the benchmarks")
+    run_parser.add_argument(
+        "--scenario", "-s", action="append", choices=list(SCENARIOS),
+        help="Scenario to run (repeatable; default: all)",
+    )
+    run_parser.add_argument(
+        "--algorithm", "-a", action="append",
+        choices=[a.value for a in SearchAlgorithm],
+        help="Algorithm to run (repeatable; default: all)",
+    )
+    run_parser.add_argument(
+        "--trials", "-n", type=int, default=DEFAULT_TRIALS,
+        help="Timed trials per benchmark",
+    )
+    run_parser.add_argument(
+        "--warmup", "-w", type=int, default=DEFAULT_WARMUP,
+        help="Untimed rounds per benchmark",
+    )
+    run_parser.add_argument(
+        "--queries", "-q", type=int, default=DEFAULT_QUERIES,
+        help="Queries per trial",
+    )
+    run_parser.add_argument(
+        "--hit-ratio", type=float, default=DEFAULT_HIT_RATIO,
+        help="Fraction of queries that are found",
+    )
+    run_parser.add_argument(
+        "--seed", type=int, default=0, help="Corpus and query seed"
+    )
+    run_parser.add_argument(
+        "--json", action="store_true", help="Print the report as JSON"
+    )
+    run_parser.add_argument(
+        "--output", "-o", help="Also write the JSON report here"
+    )
+
+    compare_parser = commands.add_parser(
+        "compare", help="Compare a run against a baseline"
+    )
+    compare_parser.add_argument("baseline", help="Baseline JSON report")
+    compare_parser.add_argument("current", help="JSON report to check")
+    compare_parser.add_argument(
+        "--threshold", "-t", type=float, default=DEFAULT_THRESHOLD,
+        help="Relative slowdown of the median that counts as a regression",
+    )
+    compare_parser.add_argument(
+        "--json", action="store_true", help="Print the comparison as JSON"
+    )
+
+    limiters_parser = commands.add_parser(
+        "limiters", help="Measure rate limiter throughput"
+    )
+    limiters_parser.add_argument(
+        "--shards", type=int, action="append",
+        help="Shard count to try (repeatable; default: 1 and 16)",
+    )
+    limiters_parser.add_argument(
+        "--threads", type=int, action="append",
+        help="Thread count to try (repeatable; default: 1, 4 and 16)",
+    )
+    limiters_parser.add_argument(
+        "--json", action="store_true", help="Print the report as JSON"
+    )
+    limiters_parser.add_argument(
+        "--output", "-o", help="Also write the JSON report here"
+    )
+
+    args = parser.parse_args(argv)
+    if args.command == "limiters":
+        report = run_limiters(
+            args.shards or LIMITER_SHARDS, args.threads or LIMITER_THREADS
+        )
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(report, f, indent=2)
+        if args.json:
+            print(json.dumps(report, indent=2))
+        else:
+            print(format_limiters(report))
+        return
+
+    try:
+        if args.command == "run":
+            report = run(
+                args.scenario, args.algorithm, args.trials, args.warmup,
+                args.queries, args.hit_ratio, args.seed,
+            )
+        else:
+            baseline = load_report(args.baseline)
+            current = load_report(args.current)
+    except (OSError, ValueError) as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        sys.exit(2)
+
+    if args.command == "run":
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(report, f, indent=2)
+        if args.json:
+            print(json.dumps(report, indent=2))
+        else:
+            print(format_results(report))
+        return
+
+    if baseline["environment"] != current["environment"]:
+        print(
+            "Warning: the reports come from different environments",
+            file=sys.stderr,
+        )
+    comparisons = compare(baseline, current, args.threshold)
+    if args.json:
+        print(json.dumps([item._asdict() for item in comparisons], indent=2))
+    else:
+        print(format_comparisons(comparisons))
+    if any(item.status == "regression" for item in comparisons):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,15 +2,292 @@
 Client module for the search server.
 """
 
+import logging
+import os
+import select
 import socket
 import ssl
+import stat
 import json
-from typing import Optional, Tuple
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional, Set, Tuple
 from pathlib import Path
 # import os
 # import argparse
 
 from config import Config
+from metrics import Histogram
+
+logger = logging.getLogger("search_client")
+
+DEFAULT_PORT = 44445
+DEFAULT_POOL_SIZE = 4
+# Below the server's default keepalive_timeout, so the client retires idle
+# connections before the server closes them
+DEFAULT_POOL_IDLE_TIMEOUT = 4.0
+# Longest line bulk mode reads from a pipe on stdin
+_STDIN_LINE_LIMIT = 1024 * 1024
+
+
+def create_client_ssl_context(cert_dir: str = "certs") -> ssl.SSLContext:
+    """
+    Create the client's TLS context.
+
+    The server certificate is always verified against the CA, and the
+    client certificate is presented for mutual authentication.
+
+    Args:
+        cert_dir: Directory holding ca.crt, client.crt and client.key
+
+    Returns:
+        Configured SSL context
+
+    Raises:
+        FileNotFoundError: If the certificate directory does not exist
+    """
+    cert_path = Path(cert_dir)
+    if not cert_path.exists():
+        raise FileNotFoundError(
+            "SSL certificates not found. Run `./setup_ssl.sh` "
+            "from the project root directory to generate certificates."
+        )
+
+    context = ssl.create_default_context(ssl.Purpose.SERVER_AUTH)
+
+    # Always verify server certificate and provide client certificate
+    context.verify_mode = ssl.CERT_REQUIRED
+    context.check_hostname = True
+    context.load_verify_locations(str(cert_path / "ca.crt"))
+    context.load_cert_chain(
+        str(cert_path / "client.crt"), str(cert_path / "client.key")
+    )
+
+    # Set minimum TLS version to 1.2 for better security
+    context.minimum_version = ssl.TLSVersion.TLSv1_2
+    return context
+
+
+# Client contexts shared by every client in the process, keyed by the
+# certificate files and their modification times
+_ssl_contexts: Dict[Tuple[Any, ...], ssl.SSLContext] = {}
+_ssl_contexts_lock = threading.Lock()
+
+
+def get_client_ssl_context(cert_dir: str = "certs") -> ssl.SSLContext:
+    """
+    Get the process-wide client TLS context for a certificate directory.
+
+    The context is created on first use and shared afterwards, so connects
+    do not reload certificates from disk. Replacing a certificate file
+    yields a new context.
+
+    Args:
+        cert_dir: Directory holding ca.crt, client.crt and client.key
+
+    Returns:
+        Configured SSL context
+
+    Raises:
+        FileNotFoundError: If the certificates do not exist
+    """
+    paths = [
+        os.path.abspath(os.path.join(cert_dir, name))
+        for name in ("ca.crt", "client.crt", "client.key")
+    ]
+    key = tuple(
+        (path, os.stat(path).st_mtime_ns) if os.path.exists(path) else path
+        for path in paths
+    )
+    context = _ssl_contexts.get(key)
+    if context is None:
+        with _ssl_contexts_lock:
+            context = _ssl_contexts.get(key)
+            if context is None:
+                context = create_client_ssl_context(cert_dir)
+                _ssl_contexts[key] = context
+                logger.debug("Loaded client certificates from %s", cert_dir)
+    return context
+
+
+class _HandshakeFailed(ConnectionError):
+    """TLS could not be negotiated on an established TCP connection."""
+
+
+def parse_search_response(response: str) -> bool:
+    """
+    Interpret the server's reply to a search.
+
+    Args:
+        response: Response line without the trailing newline
+
+    Returns:
+        bool: True if the string exists
+
+    Raises:
+        RuntimeError: If the request was rate limited or failed
+        ValueError: If the server rejected the request
+    """
+    if response == "STRING EXISTS":
+        return True
+    elif response == "STRING NOT FOUND":
+        return False
+    elif response == "RATE LIMIT EXCEEDED":
+        raise RuntimeError("RATE LIMIT EXCEEDED")
+    elif response == "INVALID REQUEST":
+        raise ValueError("INVALID REQUEST")
+    elif response.startswith("Error"):
+        raise RuntimeError(response)
+    else:
+        raise RuntimeError(f"Unexpected response: {response}")
+
+
+def parse_command_response(name: str, response: str) -> Any:
+    """
+    Interpret the server's reply to an admin command.
+
+    Args:
+        name: Command name
+        response: Response line without the trailing newline
+
+    Returns:
+        Decoded JSON result
+
+    Raises:
+        ValueError: If the server does not accept the command
+        RuntimeError: If the request was rate limited
+    """
+    if response == "INVALID REQUEST":
+        raise ValueError(f"Command not accepted: {name}")
+    if response == "RATE LIMIT EXCEEDED":
+        raise RuntimeError("RATE LIMIT EXCEEDED")
+    return json.loads(response)
+
+
+class PooledConnection:
+    """An open connection and how much it has been used."""
+
+    __slots__ = ("sock", "requests", "last_used")
+
+    def __init__(self, sock: socket.socket) -> None:
+        """
+        Initialize pooled connection.
+
+        Args:
+            sock: Connected socket
+        """
+        self.sock = sock
+        self.requests = 0
+        self.last_used = time.monotonic()
+
+
+class ConnectionPool:
+    """Thread-safe pool of idle kept-alive connections."""
+
+    def __init__(
+        self,
+        max_size: int = DEFAULT_POOL_SIZE,
+        idle_timeout: float = DEFAULT_POOL_IDLE_TIMEOUT,
+        close: Optional[Callable[[socket.socket], None]] = None,
+    ) -> None:
+        """
+        Initialize connection pool.
+
+        Args:
+            max_size: Maximum number of idle connections kept open
+            idle_timeout: Seconds after which an idle connection is closed
+            close: Function used to close connections (socket.close() if
+                None)
+        """
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        # Set when the server closed a connection after one request
+        self.keepalive_refused = False
+        self._close = close or (lambda sock: sock.close())
+        self._idle: Deque[PooledConnection] = deque()
+        self._lock = threading.Lock()
+
+    @property
+    def idle(self) -> int:
+        """Get number of idle connections."""
+        return len(self._idle)
+
+    def _healthy(self, connection: PooledConnection) -> bool:
+        """
+        Check that an idle connection can still be used.
+
+        A healthy idle connection has nothing to read. If it is readable,
+        the server closed it (or sent something unexpected).
+
+        Args:
+            connection: Idle connection
+
+        Returns:
+            bool: True if the connection may be reused
+        """
+        if time.monotonic() - connection.last_used > self.idle_timeout:
+            return False
+        sock = connection.sock
+        if isinstance(sock, ssl.SSLSocket) and sock.pending():
+            return False
+        try:
+            readable, _, _ = select.select([sock], [], [], 0)
+        except (OSError, ValueError):
+            return False
+        if readable and connection.requests == 1:
+            self.keepalive_refused = True
+        return not readable
+
+    def get(self) -> Optional[PooledConnection]:
+        """
+        Take the most recently used healthy idle connection.
+
+        Returns:
+            A connection, or None if no idle connection is usable
+        """
+        while True:
+            with self._lock:
+                if not self._idle:
+                    return None
+                connection = self._idle.pop()
+            if self._healthy(connection):
+                return connection
+            self.discard(connection)
+
+    def put(self, connection: PooledConnection) -> None:
+        """
+        Return a connection after a successful request.
+
+        Args:
+            connection: Connection taken from get() or newly opened
+        """
+        connection.last_used = time.monotonic()
+        with self._lock:
+            if len(self._idle) < self.max_size:
+                self._idle.append(connection)
+                return
+        self.discard(connection)
+
+    def discard(self, connection: PooledConnection) -> None:
+        """
+        Close a connection instead of returning it.
+
+        Args:
+            connection: Connection to close
+        """
+        try:
+            self._close(connection.sock)
+        except OSError:
+            pass
+
+    def close(self) -> None:
+        """Close every idle connection."""
+        with self._lock:
+            idle = list(self._idle)
+            self._idle.clear()
+        for connection in idle:
+            self.discard(connection)
 
 
 class SearchClient:
@@ -21,6 +298,11 @@ class SearchClient:
         port: Optional[int] = None,
         config_path: Optional[str] = None,
         timeout: Optional[float] = None,
+        unix_socket: Optional[str] = None,
+        keepalive: bool = False,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        pool_idle_timeout: float = DEFAULT_POOL_IDLE_TIMEOUT,
+        host: str = "localhost",
     ) -> None:
         """
         Initialize search client.
@@ -29,122 +311,323 @@ class SearchClient:
             port: Port number to connect to (overrides config)
             config_path: Path to the configuration file
             timeout: Socket timeout in seconds
+            unix_socket: Path of the server's Unix domain socket (overrides
+                config); when set, TCP and TLS are bypassed entirely
+            keepalive: Reuse pooled connections instead of opening one per
+                request; the client can then be shared between threads
+            pool_size: Maximum number of idle connections kept open
+            pool_idle_timeout: Seconds an idle connection is kept; keep it
+                below the server's keepalive_timeout
+            host: Server host name; with TLS it must match the server
+                certificate
         """
         self.config = None
         if config_path:
             try:
                 self.config = Config(config_path)
             except FileNotFoundError:
-                print(f"Config file not found: {config_path}, using defaults")
+                logger.warning(
+                    "Config file not found: %s, using defaults", config_path
+                )
                 self.config = None
 
+        self.host = host
         self.port = port
         self.timeout = timeout
+        self.unix_socket = unix_socket
+        if self.unix_socket is None and self.config:
+            self.unix_socket = self.config.unix_socket_path
         self.socket: Optional[socket.socket] = None
         self.ssl_context: Optional[ssl.SSLContext] = None
+        # "tls" or "tcp" once the first connection has succeeded
+        self.transport: Optional[str] = None
+        # TLS session from the previous connection, offered for resumption
+        self.tls_session: Optional[ssl.SSLSession] = None
+        self._session_context: Optional[ssl.SSLContext] = None
+        self.last_handshake_time: Optional[float] = None
+        self.last_session_reused = False
+        self.handshake_latency = Histogram(
+            "search_client_tls_handshake_seconds",
+            "Client-side TLS handshake latency",
+            ("resumed",),
+        )
+        self.keepalive = keepalive
+        self.pool = ConnectionPool(
+            pool_size, pool_idle_timeout, close=self._close_socket
+        )
+        # Thread id -> socket of the request that thread is waiting on,
+        # and the threads whose requests were cancelled
+        self._in_flight: Dict[int, socket.socket] = {}
+        self._cancelled: Set[int] = set()
 
-    def setup_ssl(self) -> None:
-        """Set up SSL context if enabled."""
-        # Always set up SSL context when this method is called
-        # The caller is responsible for determining when to call this
+    def cancel(self, thread_id: int) -> None:
+        """
+        Abort the request another thread is making on this client.
 
-        try:
-            cert_path = Path("certs")
-            if not cert_path.exists():
-                raise FileNotFoundError(
-                    "SSL certificates not found. Run `./setup_ssl.sh` "
-                    "from the project root directory to generate certificates."
-                )
+        The request's socket is shut down, and until resume() is called,
+        every request by that thread fails with ConnectionAbortedError.
 
-            self.ssl_context = ssl.create_default_context(
-                ssl.Purpose.SERVER_AUTH)
+        Args:
+            thread_id: threading.get_ident() of the requesting thread
+        """
+        self._cancelled.add(thread_id)
+        sock = self._in_flight.get(thread_id)
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
 
-            # Always verify server certificate and provide client certificate
-            self.ssl_context.verify_mode = ssl.CERT_REQUIRED
-            self.ssl_context.check_hostname = True
-            self.ssl_context.load_verify_locations(str(cert_path / "ca.crt"))
-            self.ssl_context.load_cert_chain(
-                str(cert_path / "client.crt"), str(cert_path / "client.key")
-            )
+    def resume(self, thread_id: int) -> None:
+        """
+        Let a thread make requests again after cancel().
 
-            # Set minimum TLS version to 1.2 for better security
-            self.ssl_context.minimum_version = ssl.TLSVersion.TLSv1_2
+        Args:
+            thread_id: threading.get_ident() of the requesting thread
+        """
+        self._cancelled.discard(thread_id)
 
-            print("SSL created successfully with certificate verification")
+    def setup_ssl(self) -> None:
+        """Set up SSL context if enabled."""
+        try:
+            context = get_client_ssl_context()
         except Exception as e:
-            print(f"SSL setup error: {str(e)}")
+            logger.error("SSL setup error: %s", e)
             raise RuntimeError(f"Failed to set up SSL: {str(e)}")
+        if context is not self._session_context:
+            # Sessions can only be resumed through the context that created
+            # them, so a reloaded context starts over
+            self.tls_session = None
+            self._session_context = context
+        self.ssl_context = context
+
+    def _connect_unix(self) -> socket.socket:
+        """Open a connection to the server's Unix domain socket."""
+        sock = None
+        try:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            if self.timeout:
+                sock.settimeout(self.timeout)
+            sock.connect(self.unix_socket)
+            return sock
+        except Exception as e:
+            if sock:
+                sock.close()
+            raise ConnectionError(
+                f"Failed to connect to {self.unix_socket}: {str(e)}"
+            )
 
     def connect(self) -> None:
         """Connect to the server."""
+        self.socket = self._open_connection()
+
+    def _open_connection(self) -> socket.socket:
+        """
+        Open a new connection to the server.
+
+        The first connection tries TLS (when enabled in the config or when
+        certificates exist) and falls back to plain TCP if TLS cannot be
+        negotiated. The transport that worked is remembered, so later
+        connections make a single attempt.
+
+        Returns:
+            Connected (and, when possible, TLS-wrapped) socket
+
+        Raises:
+            ConnectionError: If no connection could be made
+        """
+        if self.unix_socket:
+            return self._connect_unix()
+
         # Determine port to connect to
         port = self.port
         if port is None:
-            port = self.config.port if self.config else 44445
+            port = self.config.port if self.config else DEFAULT_PORT
 
-        # Try SSL first if certificates are available
-        ssl_attempted = False
+        if self.transport == "tls" or (
+            self.transport is None and self._should_try_ssl()
+        ):
+            try:
+                sock = self._connect_tls(port)
+            except _HandshakeFailed as e:
+                if self.transport == "tls":
+                    raise
+                logger.warning(
+                    "SSL connection failed: %s, using plain TCP for "
+                    "%s:%s", e, self.host, port,
+                )
+            else:
+                self.transport = "tls"
+                return sock
+
+        sock = self._connect_tcp(port)
+        self.transport = "tcp"
+        return sock
+
+    def _should_try_ssl(self) -> bool:
+        """Check whether TLS should be attempted first."""
+        return bool(
+            (self.config and self.config.ssl_enabled)
+            or Path("certs").exists()
+        )
+
+    def _connect_tcp(self, port: int) -> socket.socket:
+        """
+        Open a plain TCP connection.
+
+        Args:
+            port: Server port
+
+        Returns:
+            Connected socket
+
+        Raises:
+            ConnectionError: If the connection failed
+        """
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        if self.timeout:
+            sock.settimeout(self.timeout)
+        try:
+            sock.connect((self.host, port))
+        except (OSError, OverflowError) as e:
+            sock.close()
+            logger.debug("Connection error", exc_info=True)
+            raise ConnectionError(f"Failed to connect to server: {str(e)}")
+        logger.debug("Connected to %s:%s (non-SSL)", self.host, port)
+        return sock
+
+    def _connect_tls(self, port: int) -> ssl.SSLSocket:
+        """
+        Open a TLS connection with a verified server certificate.
+
+        Args:
+            port: Server port
+
+        Returns:
+            Connected socket after a completed handshake
 
-        # Check if we should try SSL (either from config or if certs exist)
-        should_try_ssl = (
-            (self.config and self.config.ssl_enabled) or
-            Path("certs").exists()
+        Raises:
+            ConnectionError: If the connection failed or was closed
+            _HandshakeFailed: If TLS could not be set up or negotiated
+            socket.timeout: If the handshake timed out
+        """
+        try:
+            self.setup_ssl()
+        except RuntimeError as e:
+            raise _HandshakeFailed(str(e))
+        sock = self.ssl_context.wrap_socket(
+            socket.socket(socket.AF_INET, socket.SOCK_STREAM),
+            server_hostname=self.host,
+            do_handshake_on_connect=False,
+            session=self.tls_session,
         )
+        if self.timeout:
+            sock.settimeout(self.timeout)
+        try:
+            sock.connect((self.host, port))
+        except (OSError, OverflowError) as e:
+            sock.close()
+            raise ConnectionError(f"Failed to connect to server: {str(e)}")
 
-        if should_try_ssl:
-            try:
-                # Try SSL connection first
-                self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                if self.timeout:
-                    self.socket.settimeout(self.timeout)
-
-                print("Setting up SSL...")
-                self.setup_ssl()
-                print("SSL context created, wrapping socket...")
-                self.socket = self.ssl_context.wrap_socket(
-                    self.socket, server_hostname="localhost"
-                )
-                print("Socket wrapped with SSL")
-
-                print(f"Connecting to localhost:{port}...")
-                self.socket.connect(("localhost", port))
-
-                # Verify SSL connection
-                cert = self.socket.getpeercert()
-                if not cert:
-                    raise ssl.SSLError(
-                        "Server certificate verification failed")
-                print("SSL connection established with verified server")
-                ssl_attempted = True
-                return
+        try:
+            self._do_handshake(sock)
+            # Verify SSL connection
+            if not sock.getpeercert():
+                raise ssl.SSLError("Server certificate verification failed")
+        except socket.timeout:
+            sock.close()
+            raise
+        except ssl.SSLError as e:
+            sock.close()
+            if isinstance(e, ssl.SSLEOFError):
+                # Closed before answering, e.g. by admission control; that
+                # says nothing about whether the server speaks TLS
+                raise ConnectionError(f"Connection closed by server: {e}")
+            raise _HandshakeFailed(str(e))
+        except OSError as e:
+            sock.close()
+            raise ConnectionError(f"Connection failed: {str(e)}")
+        logger.debug("SSL connection established with verified server")
+        return sock
+
+    def _do_handshake(self, sock: ssl.SSLSocket) -> None:
+        """Perform the TLS handshake and record its latency."""
+        start = time.perf_counter()
+        sock.do_handshake()
+        self.last_handshake_time = time.perf_counter() - start
+        self.last_session_reused = sock.session_reused
+        self.handshake_latency.observe(
+            self.last_handshake_time, str(self.last_session_reused).lower()
+        )
 
-            except Exception as e:
-                print(f"SSL connection failed: {str(e)}, trying non-SSL...")
-                if self.socket:
-                    self.socket.close()
-                    self.socket = None
-                ssl_attempted = True
+    def _exchange(
+        self, request: Dict[str, Any], sock: Optional[socket.socket] = None
+    ) -> str:
+        """
+        Send one JSON request and read one response line.
+
+        Args:
+            request: Request object
+            sock: Connection to use (defaults to self.socket)
 
-        # Try non-SSL connection (either as fallback or primary)
+        Returns:
+            Response line without the trailing newline
+
+        Raises:
+            ConnectionError: If the server closed the connection
+            ConnectionAbortedError: If the request was cancelled
+        """
+        if sock is None:
+            sock = self.socket
+        request_data = json.dumps(request).encode("utf-8") + b"\n"
+
+        # Registered before the check, so cancel() either sees the socket
+        # or is seen here
+        thread_id = threading.get_ident()
+        self._in_flight[thread_id] = sock
         try:
-            self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            if self.timeout:
-                self.socket.settimeout(self.timeout)
+            if thread_id in self._cancelled:
+                raise ConnectionAbortedError("Request cancelled")
 
-            print(f"Connecting to localhost:{port}...")
-            self.socket.connect(("localhost", port))
-            print("Connected successfully (non-SSL)")
+            # Send request
+            sock.sendall(request_data)
 
-        except Exception as e:
-            import traceback
-            print(f"Connection error: {str(e)}")
-            print(traceback.format_exc())
-            if ssl_attempted:
-                raise ConnectionError(
-                    f"Both SSL & non-SSL failed. Last error: {str(e)}"
-                    )
-            else:
-                raise ConnectionError(f"Failed to connect to server: {str(e)}")
+            # Receive response
+            response = b""
+            while not response.endswith(b"\n"):
+                chunk = sock.recv(1024)
+                if not chunk:
+                    break
+                response += chunk
+        finally:
+            del self._in_flight[thread_id]
+
+        if thread_id in self._cancelled:
+            raise ConnectionAbortedError("Request cancelled")
+        if not response:
+            raise ConnectionError("Connection closed by server")
+
+        return response.decode("utf-8").rstrip("\r\n")
+
+    def command(self, name: str, **params: Any) -> Any:
+        """
+        Run an admin command on the server.
+
+        Args:
+            name: Command name, e.g. "stats"
+            params: Extra command parameters
+
+        Returns:
+            Decoded JSON result
+
+        Raises:
+            ValueError: If the server does not accept the command
+        """
+        try:
+            response = self._request({"command": name, **params})
+        except socket.timeout:
+            raise TimeoutError("Connection timed out")
+        return parse_command_response(name, response)
 
     def search(
         self,
@@ -165,47 +648,17 @@ class SearchClient:
         Returns:
             Tuple of (found, execution_time)
         """
-        if not self.socket:
-            self.connect()
-
         try:
             # Create request as JSON
-            request = {
-                "query": query,
-                "algorithm": algorithm,
-                "benchmark": benchmark
-            }
-            request_data = json.dumps(request).encode("utf-8") + b"\n"
-
-            # Send request
-            self.socket.sendall(request_data)
+            response = self._request(
+                {
+                    "query": query,
+                    "algorithm": algorithm,
+                    "benchmark": benchmark
+                }
+            )
 
-            # Receive response
-            response = b""
-            while not response.endswith(b"\n"):
-                chunk = self.socket.recv(1024)
-                if not chunk:
-                    break
-                response += chunk
-
-            if not response:
-                raise ConnectionError("Connection closed by server")
-
-            response = response.decode("utf-8").rstrip("\r\n")
-
-            # Parse response
-            if response == "STRING EXISTS":
-                return True, 0.0
-            elif response == "STRING NOT FOUND":
-                return False, 0.0
-            elif response == "RATE LIMIT EXCEEDED":
-                raise RuntimeError("RATE LIMIT EXCEEDED")
-            elif response == "INVALID REQUEST":
-                raise ValueError("INVALID REQUEST")
-            elif response.startswith("Error"):
-                raise RuntimeError(response)
-            else:
-                raise RuntimeError(f"Unexpected response: {response}")
+            return parse_search_response(response), 0.0
 
         except socket.timeout:
             raise TimeoutError("Connection timed out")
@@ -215,14 +668,202 @@ class SearchClient:
             if isinstance(e, (TimeoutError, ConnectionError, ValueError)):
                 raise
             raise RuntimeError(f"Search failed: {str(e)}")
+
+    def _request(self, request: Dict[str, Any]) -> str:
+        """
+        Send a request over a pooled or a one-shot connection.
+
+        Args:
+            request: Request object
+
+        Returns:
+            Response line without the trailing newline
+        """
+        if self.socket:
+            # Connection opened explicitly with connect()
+            try:
+                return self._exchange(request)
+            finally:
+                self._close_socket()
+        if self.keepalive:
+            return self._pooled_request(request)
+
+        sock = self._open_connection()
+        try:
+            return self._exchange(request, sock)
         finally:
-            self.close()  # Close connection after each request
+            self._close_socket(sock)  # Close connection after each request
+
+    def _pooled_request(self, request: Dict[str, Any]) -> str:
+        """
+        Send a request over a kept-alive connection from the pool.
+
+        A reused connection that turns out to be closed is dropped and the
+        request is retried on another one; searches and commands are safe
+        to repeat. If the server closed a connection right after its first
+        response, it does not support keep-alive and the client switches
+        to one-shot connections.
+
+        Args:
+            request: Request object
+
+        Returns:
+            Response line without the trailing newline
+        """
+        payload = dict(request, keepalive=True)
+        while True:
+            connection = self.pool.get()
+            if self.pool.keepalive_refused:
+                if connection is not None:
+                    self.pool.discard(connection)
+                logger.info(
+                    "Server does not keep connections alive, using one "
+                    "connection per request"
+                )
+                self.keepalive = False
+                self.pool.close()
+                return self._request(request)
+
+            reused = connection is not None
+            if connection is None:
+                connection = PooledConnection(self._open_connection())
+            try:
+                response = self._exchange(payload, connection.sock)
+            except socket.timeout:
+                self.pool.discard(connection)
+                raise
+            except (ConnectionError, ssl.SSLError) as e:
+                self.pool.discard(connection)
+                if not reused or isinstance(e, ConnectionAbortedError):
+                    raise
+                if connection.requests == 1:
+                    self.pool.keepalive_refused = True
+            else:
+                connection.requests += 1
+                self.pool.put(connection)
+                return response
+
+    def _close_socket(self, sock: Optional[socket.socket] = None) -> None:
+        """
+        Close a connection, keeping its TLS session for resumption.
+
+        Args:
+            sock: Connection to close (defaults to self.socket, which is
+                then cleared)
+        """
+        if sock is None:
+            sock, self.socket = self.socket, None
+            if sock is None:
+                return
+        if isinstance(sock, ssl.SSLSocket):
+            # TLS 1.3 tickets arrive after the handshake, so the session
+            # is captured on close once the response has been read
+            try:
+                session = sock.session
+            except (ssl.SSLError, ValueError):
+                session = None
+            if session is not None:
+                self.tls_session = session
+        sock.close()
 
     def close(self) -> None:
-        """Close the connection."""
-        if self.socket:
-            self.socket.close()
-            self.socket = None
+        """Close the connection and every pooled connection."""
+        self._close_socket()
+        self.pool.close()
+
+
+def _is_regular_file(stream: Any) -> bool:
+    """
+    Check whether a stream reads from a regular file.
+
+    Args:
+        stream: File object, e.g. sys.stdin
+
+    Returns:
+        True for files and in-memory streams, whose reads never wait on
+        a writer; False for pipes, sockets and terminals
+    """
+    try:
+        return stat.S_ISREG(os.fstat(stream.fileno()).st_mode)
+    except (OSError, ValueError):
+        return True
+
+
+def _bulk_search(args: Any) -> int:
+    """
+    Stream queries from a file or stdin and print a result line for each.
+
+    Lines are written as query<TAB>result (found, not_found or
+    error: message) in input order. Blank lines are skipped.
+
+    Args:
+        args: Parsed command-line arguments
+
+    Returns:
+        Number of queries that failed
+    """
+    import asyncio
+    import sys
+
+    from async_client import AsyncSearchClient
+
+    async def run(lines: Any) -> int:
+        errors = 0
+        if hasattr(lines, "__aiter__"):
+            queries: Any = (
+                line.rstrip("\r\n") async for line in lines
+                if line.strip()
+            )
+        else:
+            queries = (
+                line.rstrip("\r\n") for line in lines if line.strip()
+            )
+        client = AsyncSearchClient(
+            port=args.port,
+            config_path=args.config,
+            timeout=args.timeout,
+            unix_socket=args.unix_socket,
+            connections=args.connections,
+            max_concurrency=args.window,
+        )
+        async with client:
+            results = client.search_stream(
+                queries,
+                args.algorithm,
+                args.window,
+            )
+            async for query, result in results:
+                if isinstance(result, Exception):
+                    errors += 1
+                    status = f"error: {result}"
+                else:
+                    status = "found" if result else "not_found"
+                sys.stdout.write(f"{query}\t{status}\n")
+        return errors
+
+    async def read_stdin() -> Any:
+        # A pipe or terminal can stall between lines; reading it through
+        # the event loop keeps searches going out and results coming back
+        loop = asyncio.get_running_loop()
+        reader = asyncio.StreamReader(limit=_STDIN_LINE_LIMIT)
+        await loop.connect_read_pipe(
+            lambda: asyncio.StreamReaderProtocol(reader), sys.stdin
+        )
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            yield line.decode("utf-8", errors="replace")
+
+    async def run_stdin() -> int:
+        return await run(read_stdin())
+
+    if args.input == "-":
+        if _is_regular_file(sys.stdin):
+            return asyncio.run(run(sys.stdin))
+        return asyncio.run(run_stdin())
+    with open(args.input, encoding="utf-8", errors="replace") as f:
+        return asyncio.run(run(f))
 
 
 def main() -> None:
@@ -231,7 +872,7 @@ def main() -> None:
     import argparse
 
     parser = argparse.ArgumentParser(description="Search client")
-    parser.add_argument("query", help="String to search for")
+    parser.add_argument("query", nargs="?", help="String to search for")
     parser.add_argument(
         "--algorithm",
         "-a",
@@ -248,15 +889,74 @@ def main() -> None:
     parser.add_argument(
         "--timeout", "-t", type=float, help="Connection timeout in seconds"
     )
+    parser.add_argument(
+        "--unix-socket", "-u", help="Connect through a Unix domain socket"
+    )
+    parser.add_argument(
+        "--command", help="Run an admin command (e.g. stats) instead"
+    )
+    parser.add_argument(
+        "--input", "-i", metavar="FILE",
+        help="Search every line of FILE (- for stdin) and print "
+        "query<TAB>result lines",
+    )
+    parser.add_argument(
+        "--window", type=int, default=256,
+        help="With --input, maximum number of searches in flight",
+    )
+    parser.add_argument(
+        "--connections", type=int, default=4,
+        help="With --input, connections searches are pipelined over",
+    )
+    parser.add_argument(
+        "--endpoint", "-e", action="append",
+        help="Server as host:port; repeat to fail over between replicas",
+    )
+    parser.add_argument(
+        "--hedge-after", type=float,
+        help="With --endpoint, also ask a second replica after this many "
+        "seconds (requires --timeout)",
+    )
+    parser.add_argument(
+        "--verbose", "-v", action="store_true",
+        help="Log connection details",
+    )
 
     args = parser.parse_args()
+    if args.query is None and args.command is None and args.input is None:
+        parser.error("a query, --command or --input is required")
+    if args.hedge_after is not None and not args.timeout:
+        parser.error("--hedge-after requires --timeout")
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.WARNING,
+        format="%(levelname)s: %(message)s",
+    )
 
     try:
-        client = SearchClient(
-            port=args.port,
-            config_path=args.config,
-            timeout=args.timeout,
-        )
+        if args.input:
+            if _bulk_search(args):
+                sys.exit(1)
+            return
+        if args.endpoint:
+            from failover import FailoverSearchClient
+
+            client = FailoverSearchClient(
+                args.endpoint,
+                config_path=args.config,
+                timeout=args.timeout,
+                hedge_after=args.hedge_after,
+                health_interval=None,
+            )
+        else:
+            client = SearchClient(
+                port=args.port,
+                config_path=args.config,
+                timeout=args.timeout,
+                unix_socket=args.unix_socket,
+            )
+        if args.command:
+            print(json.dumps(client.command(args.command), indent=2))
+            return
         found, _ = client.search(args.query, algorithm=args.algorithm)
         if found:
             print("String found!")
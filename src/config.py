@@ -1,10 +1,295 @@
 """
 Configuration handling module.
+
+The configuration file is parsed and validated once into an immutable
+ConfigSnapshot. Config exposes the snapshot's fields as properties, so
+reading a setting on a hot path is an attribute lookup rather than a
+configparser call. reload() parses the file again and swaps in the new
+snapshot in one assignment: readers see either the old settings or the
+new ones, never a mix.
 """
 
 import configparser
+import logging
+import tempfile
 from pathlib import Path
-from typing import Optional
+from typing import Any, Callable, Dict, NamedTuple, Optional, Tuple
+
+RATE_LIMIT_ALGORITHMS = ("sliding_log", "token_bucket")
+RATE_LIMIT_BACKENDS = ("local", "shared")
+RATE_LIMIT_KEYS = ("ip", "certificate")
+
+
+class ConfigSnapshot(NamedTuple):
+    """Parsed, validated and immutable configuration values."""
+
+    port: int
+    ssl_enabled: bool
+    reread_on_query: bool
+    accept_threads: int
+    reuse_port: bool
+    listen_backlog: int
+    tls_session_tickets: int
+    handshake_workers: int
+    handshake_queue_size: int
+    handshake_timeout: float
+    search_workers: int
+    unix_socket_path: Optional[str]
+    unix_socket_mode: int
+    admin_commands: bool
+    # None when missing; file_path_error says why, and Config.file_path
+    # raises it only when the path is actually needed
+    file_path: Optional[str]
+    file_path_error: Optional[str]
+    metrics_port: Optional[int]
+    metrics_host: str
+    log_level: str
+    log_queue_size: int
+    access_log_path: Optional[str]
+    access_log_sample_rate: float
+    access_log_slow_threshold: float
+    access_log_max_bytes: int
+    access_log_backup_count: int
+    profile_dir: str
+    profile_seconds: float
+    profile_max_seconds: float
+    keepalive_timeout: float
+    keepalive_max_requests: int
+    slow_query_threshold: float
+    slow_query_capacity: int
+    slow_query_log_path: Optional[str]
+    slow_query_include_query: bool
+    max_requests_per_minute: int
+    rate_limit_window: int
+    rate_limit_algorithm: str
+    rate_limit_shards: int
+    rate_limit_max_clients: int
+    rate_limit_cleanup_interval: float
+    rate_limit_backend: str
+    rate_limit_shared_path: Optional[str]
+    rate_limit_key: str
+    # (algorithm, cost) pairs, kept as a tuple so the snapshot stays
+    # immutable
+    rate_limit_costs: Tuple[Tuple[str, float], ...]
+    rate_limit_time_cost: float
+    max_connections_per_minute: int
+    max_connections_per_client: int
+
+
+def parse_config(parser: configparser.ConfigParser) -> ConfigSnapshot:
+    """
+    Read every setting, with its default, from a parsed configuration file.
+
+    Args:
+        parser: Parser the configuration file was read into
+
+    Returns:
+        Configuration snapshot
+
+    Raises:
+        ValueError: If a setting has an invalid value
+    """
+    file_path = None
+    file_path_error = None
+    if not parser.has_section("file"):
+        file_path_error = "File not found in config"
+    else:
+        file_path = parser.get("file", "linuxpath", fallback=None) or None
+        if file_path is None:
+            file_path_error = "File path not found in configuration"
+
+    metrics_port = None
+    if parser.has_option("metrics", "port"):
+        metrics_port = parser.getint("metrics", "port")
+
+    costs: Tuple[Tuple[str, float], ...] = ()
+    if parser.has_section("rate_limit"):
+        costs = tuple(
+            (option[len("cost_"):], parser.getfloat("rate_limit", option))
+            for option in parser.options("rate_limit")
+            if option.startswith("cost_")
+        )
+
+    snapshot = ConfigSnapshot(
+        port=parser.getint("server", "port", fallback=44445),
+        ssl_enabled=parser.getboolean(
+            "server", "ssl_enabled", fallback=False
+        ),
+        reread_on_query=parser.getboolean(
+            "server", "reread_on_query", fallback=False
+        ),
+        accept_threads=max(
+            1, parser.getint("server", "accept_threads", fallback=1)
+        ),
+        reuse_port=parser.getboolean("server", "reuse_port", fallback=False),
+        listen_backlog=parser.getint(
+            "server", "listen_backlog", fallback=128
+        ),
+        tls_session_tickets=parser.getint(
+            "server", "tls_session_tickets", fallback=2
+        ),
+        handshake_workers=max(
+            1, parser.getint("server", "handshake_workers", fallback=8)
+        ),
+        handshake_queue_size=max(
+            1, parser.getint("server", "handshake_queue_size", fallback=64)
+        ),
+        handshake_timeout=parser.getfloat(
+            "server", "handshake_timeout", fallback=10.0
+        ),
+        search_workers=max(
+            1, parser.getint("server", "search_workers", fallback=50)
+        ),
+        unix_socket_path=parser.get(
+            "server", "unix_socket_path", fallback=""
+        ) or None,
+        unix_socket_mode=int(
+            parser.get("server", "unix_socket_mode", fallback="660"), 8
+        ),
+        admin_commands=parser.getboolean(
+            "server", "admin_commands", fallback=False
+        ),
+        file_path=file_path,
+        file_path_error=file_path_error,
+        metrics_port=metrics_port,
+        metrics_host=parser.get("metrics", "host", fallback="localhost"),
+        log_level=parser.get("logging", "level", fallback="DEBUG").upper(),
+        log_queue_size=parser.getint(
+            "logging", "queue_size", fallback=10000
+        ),
+        access_log_path=parser.get(
+            "access_log", "path", fallback=None
+        ) or None,
+        access_log_sample_rate=parser.getfloat(
+            "access_log", "sample_rate", fallback=0.01
+        ),
+        access_log_slow_threshold=parser.getfloat(
+            "access_log", "slow_threshold", fallback=0.1
+        ),
+        access_log_max_bytes=parser.getint(
+            "access_log", "max_bytes", fallback=10485760
+        ),
+        access_log_backup_count=parser.getint(
+            "access_log", "backup_count", fallback=5
+        ),
+        profile_dir=parser.get(
+            "profiling", "output_dir", fallback=tempfile.gettempdir()
+        ),
+        profile_seconds=parser.getfloat(
+            "profiling", "seconds", fallback=30.0
+        ),
+        profile_max_seconds=parser.getfloat(
+            "profiling", "max_seconds", fallback=300.0
+        ),
+        keepalive_timeout=parser.getfloat(
+            "server", "keepalive_timeout", fallback=5.0
+        ),
+        keepalive_max_requests=parser.getint(
+            "server", "keepalive_max_requests", fallback=1000
+        ),
+        slow_query_threshold=parser.getfloat(
+            "slow_log", "threshold", fallback=0.1
+        ),
+        slow_query_capacity=parser.getint(
+            "slow_log", "capacity", fallback=128
+        ),
+        slow_query_log_path=parser.get(
+            "slow_log", "path", fallback=None
+        ) or None,
+        slow_query_include_query=parser.getboolean(
+            "slow_log", "include_query", fallback=False
+        ),
+        max_requests_per_minute=parser.getint(
+            "rate_limit", "max_requests_per_minute", fallback=100
+        ),
+        rate_limit_window=parser.getint(
+            "rate_limit", "window_seconds", fallback=60
+        ),
+        rate_limit_algorithm=parser.get(
+            "rate_limit", "algorithm", fallback="sliding_log"
+        ),
+        rate_limit_shards=max(
+            1, parser.getint("rate_limit", "shards", fallback=16)
+        ),
+        rate_limit_max_clients=parser.getint(
+            "rate_limit", "max_clients", fallback=100000
+        ),
+        rate_limit_cleanup_interval=parser.getfloat(
+            "rate_limit", "cleanup_interval", fallback=60.0
+        ),
+        rate_limit_backend=parser.get(
+            "rate_limit", "backend", fallback="local"
+        ),
+        rate_limit_shared_path=parser.get(
+            "rate_limit", "shared_path", fallback=None
+        ),
+        rate_limit_key=parser.get("rate_limit", "key", fallback="ip"),
+        rate_limit_costs=costs,
+        rate_limit_time_cost=parser.getfloat(
+            "rate_limit", "time_cost_seconds", fallback=0.0
+        ),
+        max_connections_per_minute=parser.getint(
+            "rate_limit", "max_connections_per_minute", fallback=0
+        ),
+        max_connections_per_client=parser.getint(
+            "rate_limit", "max_connections_per_client", fallback=0
+        ),
+    )
+    validate(snapshot)
+    return snapshot
+
+
+def validate(snapshot: ConfigSnapshot) -> None:
+    """
+    Check values that parse but cannot work.
+
+    Args:
+        snapshot: Configuration snapshot
+
+    Raises:
+        ValueError: If a setting has an invalid value
+    """
+    if not 0 <= snapshot.port <= 65535:
+        raise ValueError(f"Invalid port: {snapshot.port}")
+    if not isinstance(logging.getLevelName(snapshot.log_level), int):
+        raise ValueError(f"Invalid log level: {snapshot.log_level}")
+    if not 0.0 <= snapshot.access_log_sample_rate <= 1.0:
+        raise ValueError("access_log sample_rate must be between 0 and 1")
+    if not 0 < snapshot.profile_seconds <= snapshot.profile_max_seconds:
+        raise ValueError(
+            "profiling seconds must be positive and at most max_seconds"
+        )
+    if snapshot.keepalive_timeout < 0:
+        raise ValueError("keepalive_timeout must not be negative")
+    if snapshot.rate_limit_window <= 0:
+        raise ValueError("rate_limit window_seconds must be positive")
+    if snapshot.rate_limit_algorithm not in RATE_LIMIT_ALGORITHMS:
+        raise ValueError(
+            f"Unknown rate limit algorithm: {snapshot.rate_limit_algorithm}"
+        )
+    if snapshot.rate_limit_backend not in RATE_LIMIT_BACKENDS:
+        raise ValueError(
+            f"Unknown rate limit backend: {snapshot.rate_limit_backend}"
+        )
+    if (
+        snapshot.rate_limit_backend == "shared"
+        and snapshot.rate_limit_algorithm != "token_bucket"
+    ):
+        raise ValueError(
+            "rate_limit backend = shared requires algorithm = token_bucket"
+        )
+    if snapshot.rate_limit_key not in RATE_LIMIT_KEYS:
+        raise ValueError(f"Unknown rate limit key: {snapshot.rate_limit_key}")
+    for algorithm, cost in snapshot.rate_limit_costs:
+        # A cost above the quota could never be paid, and a free request
+        # could never be limited
+        if not 0 < cost <= snapshot.max_requests_per_minute:
+            raise ValueError(
+                f"rate_limit cost_{algorithm} must be positive and at most "
+                f"max_requests_per_minute"
+            )
+    if snapshot.rate_limit_time_cost < 0:
+        raise ValueError("rate_limit time_cost_seconds must not be negative")
 
 
 class Config:
@@ -17,56 +302,305 @@ class Config:
         Args:
             config_path: Path to the configuration file.
             If None, looks for config.ini in the current directory.
+
+        Raises:
+            FileNotFoundError: If the configuration file does not exist
+            ValueError: If a setting has an invalid value
         """
         self.config = configparser.ConfigParser()
         self.config_path = config_path or "config.ini"
+        self.snapshot: Optional[ConfigSnapshot] = None
         self.load_config()
 
-    def load_config(self) -> None:
-        """Load configuration from file."""
+    def load_config(
+        self, check: Optional[Callable[[ConfigSnapshot], None]] = None
+    ) -> None:
+        """
+        Load configuration from file.
+
+        The current settings are only replaced once the whole file has
+        been read and validated.
+
+        Args:
+            check: Called with the new snapshot before it replaces the
+                current one; raising keeps the current settings
+
+        Raises:
+            FileNotFoundError: If the configuration file does not exist
+            ValueError: If a setting has an invalid value
+        """
         if not Path(self.config_path).exists():
             raise FileNotFoundError(
                 f"Configuration file not found: {self.config_path}"
             )
 
-        self.config.read(self.config_path)
+        parser = configparser.ConfigParser()
+        try:
+            parser.read(self.config_path)
+        except configparser.Error as e:
+            raise ValueError(f"Invalid configuration file: {str(e)}")
+        snapshot = parse_config(parser)
+        if check is not None:
+            check(snapshot)
+        self.config = parser
+        self.snapshot = snapshot
+
+    def reload(
+        self, check: Optional[Callable[[ConfigSnapshot], None]] = None
+    ) -> Dict[str, Tuple[Any, Any]]:
+        """
+        Read the configuration file again.
+
+        Args:
+            check: Called with the new snapshot before it replaces the
+                current one; raising keeps the current settings
+
+        Returns:
+            Changed settings, as name -> (old value, new value)
+
+        Raises:
+            FileNotFoundError: If the configuration file does not exist
+            ValueError: If a setting has an invalid value; the previous
+                settings are kept
+        """
+        old = self.snapshot
+        self.load_config(check)
+        return {
+            name: (old_value, new_value)
+            for name, old_value, new_value in zip(
+                ConfigSnapshot._fields, old, self.snapshot
+            )
+            if old_value != new_value
+        }
 
     @property
     def port(self) -> int:
         """Get server port from configuration."""
-        return self.config.getint("server", "port", fallback=44445)
+        return self.snapshot.port
 
     @property
     def ssl_enabled(self) -> bool:
         """Get SSL enabled status from configuration."""
-        return self.config.getboolean("server", "ssl_enabled", fallback=False)
+        return self.snapshot.ssl_enabled
 
     @property
     def reread_on_query(self) -> bool:
         """Get reread on query setting from configuration."""
-        return self.config.getboolean(
-            "server", "reread_on_query", fallback=False
-        )
+        return self.snapshot.reread_on_query
+
+    @property
+    def accept_threads(self) -> int:
+        """Get number of acceptor threads from configuration."""
+        return self.snapshot.accept_threads
+
+    @property
+    def reuse_port(self) -> bool:
+        """Get whether several processes may bind the same port."""
+        return self.snapshot.reuse_port
+
+    @property
+    def listen_backlog(self) -> int:
+        """Get listen backlog size from configuration."""
+        return self.snapshot.listen_backlog
+
+    @property
+    def tls_session_tickets(self) -> int:
+        """Get number of TLS 1.3 session tickets issued per handshake."""
+        return self.snapshot.tls_session_tickets
+
+    @property
+    def handshake_workers(self) -> int:
+        """Get number of threads dedicated to TLS handshakes."""
+        return self.snapshot.handshake_workers
+
+    @property
+    def handshake_queue_size(self) -> int:
+        """Get maximum number of pending and running TLS handshakes."""
+        return self.snapshot.handshake_queue_size
+
+    @property
+    def handshake_timeout(self) -> float:
+        """Get deadline in seconds for completing a TLS handshake."""
+        return self.snapshot.handshake_timeout
+
+    @property
+    def search_workers(self) -> int:
+        """Get number of threads serving search connections."""
+        return self.snapshot.search_workers
+
+    @property
+    def unix_socket_path(self) -> Optional[str]:
+        """Get Unix domain socket path, or None if disabled."""
+        return self.snapshot.unix_socket_path
+
+    @property
+    def unix_socket_mode(self) -> int:
+        """Get permission bits applied to the Unix domain socket file."""
+        return self.snapshot.unix_socket_mode
+
+    @property
+    def admin_commands(self) -> bool:
+        """Get whether admin commands such as stats are accepted."""
+        return self.snapshot.admin_commands
 
     @property
     def file_path(self) -> str:
         """Get file path from configuration."""
-        if not self.config.has_section("file"):
-            raise ValueError("File not found in config")
+        if self.snapshot.file_path is None:
+            raise ValueError(self.snapshot.file_path_error)
+        return self.snapshot.file_path
+
+    @property
+    def metrics_port(self) -> Optional[int]:
+        """Get metrics listener port, or None if metrics are disabled."""
+        return self.snapshot.metrics_port
+
+    @property
+    def metrics_host(self) -> str:
+        """Get interface the metrics listener binds to."""
+        return self.snapshot.metrics_host
+
+    @property
+    def log_level(self) -> str:
+        """Get server log level name from configuration."""
+        return self.snapshot.log_level
+
+    @property
+    def log_queue_size(self) -> int:
+        """Get maximum number of log records waiting to be written."""
+        return self.snapshot.log_queue_size
+
+    @property
+    def access_log_path(self) -> Optional[str]:
+        """Get access log file, or None if the access log is disabled."""
+        return self.snapshot.access_log_path
+
+    @property
+    def access_log_sample_rate(self) -> float:
+        """Get fraction of ordinary requests written to the access log."""
+        return self.snapshot.access_log_sample_rate
+
+    @property
+    def access_log_slow_threshold(self) -> float:
+        """Get seconds after which a request is always access-logged."""
+        return self.snapshot.access_log_slow_threshold
 
-        path = self.config.get("file", "linuxpath", fallback=None)
-        if not path:
-            raise ValueError("File path not found in configuration")
-        return path
+    @property
+    def access_log_max_bytes(self) -> int:
+        """Get access log size that triggers rotation."""
+        return self.snapshot.access_log_max_bytes
+
+    @property
+    def access_log_backup_count(self) -> int:
+        """Get number of rotated access log files kept."""
+        return self.snapshot.access_log_backup_count
+
+    @property
+    def profile_dir(self) -> str:
+        """Get directory profiles and stack samples are written to."""
+        return self.snapshot.profile_dir
+
+    @property
+    def profile_seconds(self) -> float:
+        """Get default length of a profiling window in seconds."""
+        return self.snapshot.profile_seconds
+
+    @property
+    def profile_max_seconds(self) -> float:
+        """Get longest profiling window an admin command may request."""
+        return self.snapshot.profile_max_seconds
+
+    @property
+    def keepalive_timeout(self) -> float:
+        """Get idle seconds before a kept-alive connection is closed."""
+        return self.snapshot.keepalive_timeout
+
+    @property
+    def keepalive_max_requests(self) -> int:
+        """Get maximum number of requests served on one connection."""
+        return self.snapshot.keepalive_max_requests
+
+    @property
+    def slow_query_threshold(self) -> float:
+        """Get seconds after which a request is captured as slow."""
+        return self.snapshot.slow_query_threshold
+
+    @property
+    def slow_query_capacity(self) -> int:
+        """Get number of slow requests kept in memory."""
+        return self.snapshot.slow_query_capacity
+
+    @property
+    def slow_query_log_path(self) -> Optional[str]:
+        """Get slow-query log file, or None to keep captures in memory."""
+        return self.snapshot.slow_query_log_path
+
+    @property
+    def slow_query_include_query(self) -> bool:
+        """Get whether slow-query captures store the query text."""
+        return self.snapshot.slow_query_include_query
 
     @property
     def max_requests_per_minute(self) -> int:
         """Get maximum requests per minute from configuration."""
-        return self.config.getint(
-            "rate_limit", "max_requests_per_minute", fallback=100
-        )
+        return self.snapshot.max_requests_per_minute
 
     @property
     def rate_limit_window(self) -> int:
         """Get rate limit window in seconds from configuration."""
-        return self.config.getint("rate_limit", "window_seconds", fallback=60)
+        return self.snapshot.rate_limit_window
+
+    @property
+    def rate_limit_algorithm(self) -> str:
+        """Get rate limiting algorithm from configuration."""
+        return self.snapshot.rate_limit_algorithm
+
+    @property
+    def rate_limit_shards(self) -> int:
+        """Get number of lock stripes used by the rate limiter."""
+        return self.snapshot.rate_limit_shards
+
+    @property
+    def rate_limit_max_clients(self) -> int:
+        """Get maximum number of clients tracked by the rate limiter."""
+        return self.snapshot.rate_limit_max_clients
+
+    @property
+    def rate_limit_cleanup_interval(self) -> float:
+        """Get seconds between background rate limiter sweeps."""
+        return self.snapshot.rate_limit_cleanup_interval
+
+    @property
+    def rate_limit_backend(self) -> str:
+        """Get rate limiter state backend from configuration."""
+        return self.snapshot.rate_limit_backend
+
+    @property
+    def rate_limit_shared_path(self) -> Optional[str]:
+        """Get file backing the shared rate limit table."""
+        return self.snapshot.rate_limit_shared_path
+
+    @property
+    def rate_limit_key(self) -> str:
+        """Get client identity used for rate limiting (ip or certificate)."""
+        return self.snapshot.rate_limit_key
+
+    @property
+    def rate_limit_costs(self) -> Dict[str, float]:
+        """Get per-algorithm request costs from cost_<algorithm> options."""
+        return dict(self.snapshot.rate_limit_costs)
+
+    @property
+    def rate_limit_time_cost(self) -> float:
+        """Get execution seconds charged as one extra request (0 = off)."""
+        return self.snapshot.rate_limit_time_cost
+
+    @property
+    def max_connections_per_minute(self) -> int:
+        """Get connections accepted per client per window (0 = no limit)."""
+        return self.snapshot.max_connections_per_minute
+
+    @property
+    def max_connections_per_client(self) -> int:
+        """Get concurrent connections allowed per client (0 = no limit)."""
+        return self.snapshot.max_connections_per_client
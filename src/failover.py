@@ -0,0 +1,636 @@
+"""
+Multi-endpoint client for replicated search servers.
+
+FailoverSearchClient spreads requests over several servers. Each endpoint
+has its own kept-alive SearchClient and tracks its outstanding requests
+and an exponentially weighted moving average (EWMA) of its latency.
+Requests go to the endpoint with the lowest expected cost. An endpoint
+that fails is skipped until a background health check reaches it again.
+
+A request that fails with a connection error, a timeout or a rate limit is
+retried on another endpoint. Retries come out of a budget that refills
+with a fraction of the requests sent, so a wide outage does not multiply
+the load on what is left. With hedge_after set, a request that has not
+been answered in that many seconds is also sent to a second endpoint, and
+the first answer wins. The first attempt runs on the caller's thread; a
+timer thread starts hedges on a small pool, and a hedge that answers first
+cancels the caller's attempt.
+"""
+
+import concurrent.futures
+import heapq
+import itertools
+import logging
+import threading
+import time
+from typing import Any, Callable, List, Optional, Sequence, Tuple, Union
+
+from client import DEFAULT_PORT, SearchClient
+
+logger = logging.getLogger("search_client")
+
+DEFAULT_HEALTH_INTERVAL = 1.0
+DEFAULT_HEALTH_TIMEOUT = 1.0
+# Weight of the newest latency sample in the moving average
+DEFAULT_EWMA_ALPHA = 0.3
+DEFAULT_RETRY_RATIO = 0.2
+DEFAULT_RETRY_RESERVE = 10
+# Hedges in flight at once; requests beyond that are not hedged
+DEFAULT_MAX_HEDGES = 4
+
+STRATEGIES = ("ewma", "least_outstanding")
+
+
+def parse_endpoint(spec: str) -> Tuple[str, int]:
+    """
+    Parse an endpoint given as "host:port", "[ipv6]:port", "host" or "port".
+
+    Args:
+        spec: Endpoint specification
+
+    Returns:
+        Tuple of (host, port)
+
+    Raises:
+        ValueError: If the port is not a number
+    """
+    spec = spec.strip()
+    if spec.isdigit():
+        return "localhost", int(spec)
+    if spec.endswith("]"):
+        return spec.strip("[]"), DEFAULT_PORT
+    host, sep, port = spec.rpartition(":")
+    if not sep or host.count(":") and not host.startswith("["):
+        # No port, or a bare IPv6 address
+        host, port = spec, str(DEFAULT_PORT)
+    if not port.isdigit():
+        raise ValueError(f"Invalid endpoint: {spec}")
+    return host.strip("[]") or "localhost", int(port)
+
+
+def _retryable(error: BaseException) -> bool:
+    """Check whether another endpoint might succeed where this one failed."""
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    return isinstance(error, RuntimeError) and "RATE LIMIT" in str(error)
+
+
+class RetryBudget:
+    """
+    Token bucket limiting retries to a fraction of requests.
+
+    Every request deposits ratio tokens and every retry (or hedge) spends
+    one. The bucket starts with, and never holds more than, reserve tokens.
+    """
+
+    def __init__(
+        self,
+        ratio: float = DEFAULT_RETRY_RATIO,
+        reserve: int = DEFAULT_RETRY_RESERVE,
+    ) -> None:
+        """
+        Initialize retry budget.
+
+        Args:
+            ratio: Tokens deposited per request
+            reserve: Initial and maximum number of tokens
+        """
+        self.ratio = ratio
+        self.reserve = reserve
+        self._tokens = float(reserve)
+        self._lock = threading.Lock()
+
+    @property
+    def tokens(self) -> float:
+        """Get the number of tokens available."""
+        return self._tokens
+
+    def deposit(self) -> None:
+        """Add tokens for a request."""
+        with self._lock:
+            self._tokens = min(self._tokens + self.ratio, self.reserve)
+
+    def withdraw(self) -> bool:
+        """
+        Spend a token on a retry.
+
+        Returns:
+            bool: True if the retry may be sent
+        """
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+class Endpoint:
+    """A server replica and what the client has seen of it."""
+
+    def __init__(self, host: str, port: int, client: SearchClient) -> None:
+        """
+        Initialize endpoint.
+
+        Args:
+            host: Server host name
+            port: Server port
+            client: Client used for requests to this endpoint
+        """
+        self.host = host
+        self.port = port
+        self.client = client
+        self.healthy = True
+        self.outstanding = 0
+        # Zero until measured, so new endpoints are tried early
+        self.ewma = 0.0
+        self.requests = 0
+        self.failures = 0
+
+    @property
+    def name(self) -> str:
+        """Get the endpoint as host:port."""
+        return f"{self.host}:{self.port}"
+
+    def observe(self, latency: float, alpha: float) -> None:
+        """Fold a latency sample into the moving average."""
+        if self.ewma == 0.0:
+            self.ewma = latency
+        else:
+            self.ewma += alpha * (latency - self.ewma)
+
+
+class _HedgedRequest:
+    """A request whose first attempt runs on the caller's thread."""
+
+    def __init__(
+        self, endpoint: Endpoint, operation: Callable[[SearchClient], Any]
+    ) -> None:
+        """
+        Initialize hedged request.
+
+        Args:
+            endpoint: Endpoint of the caller's attempt
+            operation: Function making the request with an endpoint client
+        """
+        self.endpoint = endpoint
+        self.operation = operation
+        self.thread_id = threading.get_ident()
+        self.lock = threading.Lock()
+        # Set once the caller's attempt has returned; no hedge starts, and
+        # nothing is cancelled, after that
+        self.primary_done = False
+        # Set when a hedge answered first and cancelled the caller's attempt
+        self.cancelled = False
+        self.hedge: Optional["concurrent.futures.Future[Any]"] = None
+        self.hedge_endpoint: Optional[Endpoint] = None
+
+
+class FailoverSearchClient:
+    """Search client that balances and fails over between endpoints."""
+
+    def __init__(
+        self,
+        endpoints: Sequence[Union[str, int, Tuple[str, int]]],
+        config_path: Optional[str] = None,
+        timeout: Optional[float] = None,
+        strategy: str = "ewma",
+        hedge_after: Optional[float] = None,
+        retry_budget: Optional[RetryBudget] = None,
+        health_interval: Optional[float] = DEFAULT_HEALTH_INTERVAL,
+        health_timeout: float = DEFAULT_HEALTH_TIMEOUT,
+        ewma_alpha: float = DEFAULT_EWMA_ALPHA,
+        max_hedges: int = DEFAULT_MAX_HEDGES,
+    ) -> None:
+        """
+        Initialize failover client.
+
+        Args:
+            endpoints: "host:port" strings, ports on localhost or
+                (host, port) tuples
+            config_path: Path to the configuration file (for TLS settings)
+            timeout: Socket timeout in seconds for each attempt
+            strategy: "ewma" to weigh the latency average by outstanding
+                requests, or "least_outstanding" to pick the least busy
+                endpoint
+            hedge_after: Seconds after which an unanswered request is also
+                sent to a second endpoint (None disables hedging); requires
+                a timeout
+            retry_budget: Budget shared by retries and hedges
+            health_interval: Seconds between health checks (None disables
+                them; failed endpoints then return once every endpoint
+                has failed)
+            health_timeout: Socket timeout in seconds for health checks
+            ewma_alpha: Weight of the newest latency sample (0 to 1)
+            max_hedges: Maximum number of hedges in flight, and threads
+                running them
+
+        Raises:
+            ValueError: If no endpoints, an unknown strategy, or hedging
+                without a timeout is given
+        """
+        if not endpoints:
+            raise ValueError("At least one endpoint is required")
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown strategy: {strategy}")
+        if hedge_after is not None and not (timeout and timeout > 0):
+            # A hung attempt would otherwise hold a hedge thread forever
+            raise ValueError("hedge_after requires a positive timeout")
+        self.strategy = strategy
+        self.hedge_after = hedge_after
+        self.max_hedges = max_hedges
+        self.retry_budget = retry_budget or RetryBudget()
+        self.ewma_alpha = ewma_alpha
+        self.retries = 0
+        self.hedges = 0
+
+        self.endpoints: List[Endpoint] = []
+        self._probes: List[SearchClient] = []
+        for endpoint in endpoints:
+            if isinstance(endpoint, (str, int)):
+                host, port = parse_endpoint(str(endpoint))
+            else:
+                host, port = endpoint
+            client = SearchClient(
+                port=port,
+                config_path=config_path,
+                timeout=timeout,
+                keepalive=True,
+                host=host,
+            )
+            # TCP endpoints only: a configured Unix socket would route
+            # every endpoint to the same local server
+            client.unix_socket = None
+            self.endpoints.append(Endpoint(host, port, client))
+            probe = SearchClient(
+                port=port,
+                config_path=config_path,
+                timeout=health_timeout,
+                keepalive=True,
+                pool_size=1,
+                host=host,
+            )
+            probe.unix_socket = None
+            self._probes.append(probe)
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._executor: Optional[
+            concurrent.futures.ThreadPoolExecutor
+        ] = None
+        # (deadline, sequence, request) of requests that may need a hedge
+        self._hedge_queue: List[Tuple[float, int, _HedgedRequest]] = []
+        self._hedge_due = threading.Condition()
+        self._hedge_sequence = itertools.count()
+        self._hedges_running = 0
+        self._hedge_thread: Optional[threading.Thread] = None
+        if hedge_after is not None:
+            self._executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=max_hedges, thread_name_prefix="search-hedge"
+            )
+            self._hedge_thread = threading.Thread(
+                target=self._hedge_loop,
+                name="search-hedge-timer",
+                daemon=True,
+            )
+            self._hedge_thread.start()
+        self._health_thread: Optional[threading.Thread] = None
+        if health_interval:
+            self._health_thread = threading.Thread(
+                target=self._health_loop,
+                args=(health_interval,),
+                name="search-health-check",
+                daemon=True,
+            )
+            self._health_thread.start()
+
+    def __enter__(self) -> "FailoverSearchClient":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def _cost(self, endpoint: Endpoint) -> Tuple[float, float]:
+        """Get the sort key of an endpoint for the current strategy."""
+        if self.strategy == "least_outstanding":
+            return endpoint.outstanding, endpoint.ewma
+        load = endpoint.outstanding + 1
+        return endpoint.ewma * load, endpoint.outstanding
+
+    def _select(self, exclude: Sequence[Endpoint] = ()) -> Optional[Endpoint]:
+        """
+        Choose the endpoint for the next attempt.
+
+        Healthy endpoints are preferred; when none is left, the others are
+        tried rather than failing outright.
+
+        Args:
+            exclude: Endpoints already tried for this request
+
+        Returns:
+            An endpoint, or None if every endpoint was tried
+        """
+        with self._lock:
+            candidates = [e for e in self.endpoints if e not in exclude]
+            healthy = [e for e in candidates if e.healthy]
+            return min(healthy or candidates, key=self._cost, default=None)
+
+    def _attempt(
+        self,
+        endpoint: Endpoint,
+        operation: Callable[[SearchClient], Any],
+        request: Optional[_HedgedRequest] = None,
+    ) -> Any:
+        """
+        Run one attempt on an endpoint and update what is known about it.
+
+        Args:
+            endpoint: Endpoint to use
+            operation: Function making the request with the endpoint client
+            request: Hedged request this is the caller's attempt of; its
+                failure is not held against the endpoint once a hedge has
+                cancelled it
+
+        Returns:
+            The operation's result
+        """
+        with self._lock:
+            endpoint.outstanding += 1
+            endpoint.requests += 1
+        start = time.perf_counter()
+        try:
+            result = operation(endpoint.client)
+        except Exception as e:
+            with self._lock:
+                endpoint.outstanding -= 1
+                if request is not None and request.cancelled:
+                    raise
+                if isinstance(e, (ConnectionError, TimeoutError)):
+                    endpoint.failures += 1
+                    if endpoint.healthy:
+                        logger.warning(
+                            "Endpoint %s failed: %s", endpoint.name, e
+                        )
+                    endpoint.healthy = False
+            raise
+        with self._lock:
+            endpoint.outstanding -= 1
+            endpoint.healthy = True
+            endpoint.observe(time.perf_counter() - start, self.ewma_alpha)
+        return result
+
+    def _call(self, operation: Callable[[SearchClient], Any]) -> Any:
+        """
+        Run a request, failing over to other endpoints.
+
+        Args:
+            operation: Function making the request with an endpoint client
+
+        Returns:
+            The first successful result
+        """
+        self.retry_budget.deposit()
+        if self.hedge_after is not None:
+            return self._call_hedged(operation)
+
+        tried: List[Endpoint] = []
+        while True:
+            endpoint = self._select(tried)
+            tried.append(endpoint)
+            try:
+                return self._attempt(endpoint, operation)
+            except Exception as e:
+                if (
+                    not _retryable(e)
+                    or len(tried) == len(self.endpoints)
+                    or not self.retry_budget.withdraw()
+                ):
+                    raise
+                logger.info("Retrying on another endpoint after: %s", e)
+                with self._lock:
+                    self.retries += 1
+
+    def _call_hedged(self, operation: Callable[[SearchClient], Any]) -> Any:
+        """
+        Run a request on the caller's thread, hedging it if it is slow.
+
+        Args:
+            operation: Function making the request with an endpoint client
+
+        Returns:
+            The first successful result
+        """
+        endpoint = self._select()
+        request = _HedgedRequest(endpoint, operation)
+        with self._hedge_due:
+            heapq.heappush(
+                self._hedge_queue,
+                (
+                    time.monotonic() + self.hedge_after,
+                    next(self._hedge_sequence),
+                    request,
+                ),
+            )
+            self._hedge_due.notify()
+
+        error: Optional[Exception] = None
+        try:
+            result = self._attempt(endpoint, operation, request)
+        except Exception as e:
+            error = e
+        with request.lock:
+            request.primary_done = True
+        endpoint.client.resume(request.thread_id)
+        if error is None:
+            return result
+        if not request.cancelled and not _retryable(error):
+            raise error
+
+        tried = [endpoint]
+        if request.hedge is not None:
+            # Bounded by the hedge's socket timeout
+            tried.append(request.hedge_endpoint)
+            try:
+                return request.hedge.result()
+            except Exception as e:
+                if not _retryable(e):
+                    raise
+                error = e
+        while True:
+            retry = self._select(tried)
+            if retry is None or not self.retry_budget.withdraw():
+                raise error
+            logger.info("Retrying on another endpoint after: %s", error)
+            with self._lock:
+                self.retries += 1
+            tried.append(retry)
+            try:
+                return self._attempt(retry, operation)
+            except Exception as e:
+                if not _retryable(e):
+                    raise
+                error = e
+
+    def _hedge_loop(self) -> None:
+        """Start hedges for requests still unanswered at their deadline."""
+        with self._hedge_due:
+            while not self._stop.is_set():
+                if not self._hedge_queue:
+                    self._hedge_due.wait()
+                    continue
+                delay = self._hedge_queue[0][0] - time.monotonic()
+                if delay > 0:
+                    self._hedge_due.wait(delay)
+                    continue
+                _, _, request = heapq.heappop(self._hedge_queue)
+                self._launch_hedge(request)
+
+    def _launch_hedge(self, request: _HedgedRequest) -> None:
+        """
+        Send a slow request to a second endpoint too, if allowed.
+
+        Args:
+            request: Request whose deadline has passed
+        """
+        with request.lock:
+            if request.primary_done:
+                return
+            with self._lock:
+                if self._hedges_running >= self.max_hedges:
+                    return
+            endpoint = self._select([request.endpoint])
+            if endpoint is None or not self.retry_budget.withdraw():
+                return
+            with self._lock:
+                self._hedges_running += 1
+                self.hedges += 1
+            request.hedge_endpoint = endpoint
+            request.hedge = self._executor.submit(
+                self._hedge, request, endpoint
+            )
+
+    def _hedge(self, request: _HedgedRequest, endpoint: Endpoint) -> Any:
+        """
+        Run a hedge, cancelling the caller's attempt if it answers first.
+
+        Args:
+            request: Request being hedged
+            endpoint: Endpoint to send it to
+
+        Returns:
+            The operation's result
+        """
+        try:
+            result = self._attempt(endpoint, request.operation)
+        finally:
+            with self._lock:
+                self._hedges_running -= 1
+        with request.lock:
+            if not request.primary_done:
+                request.cancelled = True
+                request.endpoint.client.cancel(request.thread_id)
+        return result
+
+    def search(
+        self, query: str, algorithm: str = "linear", benchmark: bool = False
+    ) -> Tuple[bool, float]:
+        """
+        Search for a string on the best available endpoint.
+
+        Args:
+            query: String to search for
+            algorithm: Search algorithm to use
+            benchmark: Whether to run in benchmark mode
+
+        Returns:
+            Tuple of (found, execution_time)
+        """
+        return self._call(
+            lambda client: client.search(query, algorithm, benchmark)
+        )
+
+    def command(self, name: str, **params: Any) -> Any:
+        """
+        Run an admin command on the best available endpoint.
+
+        Args:
+            name: Command name, e.g. "stats"
+            params: Extra command parameters
+
+        Returns:
+            Decoded JSON result
+        """
+        return self._call(lambda client: client.command(name, **params))
+
+    def check_health(self) -> None:
+        """Ping every endpoint once and update whether it is healthy."""
+        for endpoint, probe in zip(self.endpoints, self._probes):
+            start = time.perf_counter()
+            try:
+                probe.command("ping")
+            except (ValueError, RuntimeError):
+                # Commands disabled or rate limited: the server answered
+                healthy = True
+            except Exception as e:
+                logger.debug(
+                    "Health check of %s failed: %s", endpoint.name, e
+                )
+                healthy = False
+            else:
+                healthy = True
+            with self._lock:
+                if healthy and not endpoint.healthy:
+                    logger.info("Endpoint %s is back", endpoint.name)
+                elif not healthy and endpoint.healthy:
+                    logger.warning(
+                        "Endpoint %s failed its health check", endpoint.name
+                    )
+                endpoint.healthy = healthy
+                if healthy:
+                    endpoint.observe(
+                        time.perf_counter() - start, self.ewma_alpha
+                    )
+
+    def _health_loop(self, interval: float) -> None:
+        """Check endpoint health until the client is closed."""
+        while not self._stop.wait(interval):
+            try:
+                self.check_health()
+            except Exception:
+                logger.exception("Health check failed")
+
+    def stats(self) -> List[dict]:
+        """
+        Get what the client has seen of each endpoint.
+
+        Returns:
+            One dict per endpoint with its name, health, outstanding
+            requests, latency average, request and failure counts
+        """
+        with self._lock:
+            return [
+                {
+                    "endpoint": e.name,
+                    "healthy": e.healthy,
+                    "outstanding": e.outstanding,
+                    "ewma": e.ewma,
+                    "requests": e.requests,
+                    "failures": e.failures,
+                }
+                for e in self.endpoints
+            ]
+
+    def close(self) -> None:
+        """Stop health checks and close every connection."""
+        self._stop.set()
+        if self._health_thread is not None:
+            self._health_thread.join()
+        if self._hedge_thread is not None:
+            with self._hedge_due:
+                self._hedge_due.notify()
+            self._hedge_thread.join()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+        for endpoint in self.endpoints:
+            endpoint.client.close()
+        for probe in self._probes:
+            probe.close()
@@ -0,0 +1,507 @@
+"""
+Load generator for a running search server.
+
+Drives the server through AsyncSearchClient in one of two modes:
+
+- Closed loop (--concurrency N): N workers each send their next request as
+  soon as the previous one completes.
+- Open loop (--rate R): requests arrive as a Poisson process at R per
+  second, whether or not earlier ones have completed. Latency is measured
+  from each request's scheduled arrival, so a saturated server shows up as
+  queueing delay instead of silently slowing the generator down.
+
+Queries are drawn from a file, one per line (by default the corpus named in
+the config). --hit-ratio sets the fraction of requests expected to be found;
+the others get a random suffix so they miss. The report covers throughput,
+errors by kind and latency percentiles, as text or JSON.
+
+Run it as ./search-bench or python3 src/loadgen.py.
+"""
+
+import asyncio
+import json
+import logging
+import math
+import random
+import sys
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence
+
+from async_client import DEFAULT_CONNECTIONS, AsyncSearchClient
+from config import Config
+from metrics import (
+    DEFAULT_QUANTILES,
+    LOG_LINEAR_LATENCY_BUCKETS,
+    Histogram,
+    quantile_name,
+)
+
+DEFAULT_DURATION = 10.0
+DEFAULT_CONCURRENCY = 16
+DEFAULT_MAX_IN_FLIGHT = 10000
+
+
+def load_queries(path: str) -> List[str]:
+    """
+    Read queries, one per non-empty line.
+
+    Args:
+        path: Query file
+
+    Returns:
+        Queries
+
+    Raises:
+        ValueError: If the file has no queries
+    """
+    with open(path, encoding="utf-8", errors="replace") as f:
+        queries = [line.strip() for line in f if line.strip()]
+    if not queries:
+        raise ValueError(f"No queries in {path}")
+    return queries
+
+
+class QueryMix:
+    """Pick queries with a given fraction of expected hits."""
+
+    def __init__(
+        self,
+        queries: Sequence[str],
+        hit_ratio: float = 1.0,
+        rng: Optional[random.Random] = None,
+    ) -> None:
+        """
+        Initialize query mix.
+
+        Args:
+            queries: Queries expected to be found
+            hit_ratio: Fraction of picks returned unchanged (0 to 1)
+            rng: Random number generator (seed it for repeatable runs)
+        """
+        if not 0.0 <= hit_ratio <= 1.0:
+            raise ValueError("hit_ratio must be between 0 and 1")
+        self.queries = list(queries)
+        self.hit_ratio = hit_ratio
+        self.rng = rng or random.Random()
+
+    def next(self) -> str:
+        """Get the next query."""
+        query = self.rng.choice(self.queries)
+        if self.rng.random() < self.hit_ratio:
+            return query
+        return f"{query} #miss-{self.rng.getrandbits(32):08x}"
+
+
+def classify_error(error: BaseException) -> str:
+    """
+    Map a failed request to a short error kind for the report.
+
+    Args:
+        error: Exception raised by the client
+
+    Returns:
+        "timeout", "connection", "rate_limited", "invalid" or "error"
+    """
+    if isinstance(error, TimeoutError):
+        return "timeout"
+    if isinstance(error, ConnectionError):
+        return "connection"
+    if isinstance(error, RuntimeError) and "RATE LIMIT" in str(error):
+        return "rate_limited"
+    if isinstance(error, ValueError):
+        return "invalid"
+    return "error"
+
+
+class LoadReport:
+    """Outcome of a load test."""
+
+    def __init__(self) -> None:
+        """Initialize an empty report."""
+        self.latency = Histogram(
+            "search_bench_latency_seconds",
+            "Request latency seen by the load generator",
+            buckets=LOG_LINEAR_LATENCY_BUCKETS,
+        )
+        self.found = 0
+        self.not_found = 0
+        self.errors: Counter = Counter()
+        self.max_latency = 0.0
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.settings: Dict[str, Any] = {}
+
+    def record(self, latency: float, found: bool) -> None:
+        """Record a completed request."""
+        self.latency.observe(latency)
+        self.max_latency = max(self.max_latency, latency)
+        if found:
+            self.found += 1
+        else:
+            self.not_found += 1
+
+    def record_error(self, kind: str) -> None:
+        """Record a failed (or dropped) request."""
+        self.errors[kind] += 1
+
+    @property
+    def completed(self) -> int:
+        """Get number of successful requests."""
+        return self.found + self.not_found
+
+    @property
+    def requests(self) -> int:
+        """Get number of requests, including failed ones."""
+        return self.completed + sum(self.errors.values())
+
+    @property
+    def elapsed(self) -> float:
+        """Get seconds between the start and end of measurement."""
+        if self.started is None or self.finished is None:
+            return 0.0
+        return max(self.finished - self.started, 0.0)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get the report as JSON-compatible data."""
+        elapsed = self.elapsed
+        completed = self.completed
+        latency: Dict[str, float] = {
+            "mean": self.latency.total() / completed if completed else 0.0,
+            "max": self.max_latency,
+        }
+        for q in DEFAULT_QUANTILES:
+            latency[quantile_name(q)] = self.latency.quantile(q)
+        return {
+            "settings": self.settings,
+            "elapsed": elapsed,
+            "requests": self.requests,
+            "completed": completed,
+            "found": self.found,
+            "not_found": self.not_found,
+            "errors": dict(self.errors),
+            "error_rate": (
+                sum(self.errors.values()) / self.requests
+                if self.requests else 0.0
+            ),
+            "throughput": completed / elapsed if elapsed else 0.0,
+            "latency": latency,
+        }
+
+    def format_text(self) -> str:
+        """Get the report as human readable text."""
+        data = self.to_dict()
+        settings = ", ".join(
+            f"{key}={value}" for key, value in data["settings"].items()
+        )
+        lines = [
+            f"Settings:    {settings}",
+            f"Elapsed:     {data['elapsed']:.2f} s",
+            f"Requests:    {data['requests']} "
+            f"({data['found']} found, {data['not_found']} not found)",
+            f"Throughput:  {data['throughput']:.1f} req/s",
+            f"Error rate:  {data['error_rate']:.2%}",
+        ]
+        for kind, count in sorted(data["errors"].items()):
+            lines.append(f"  {kind}: {count}")
+        lines.append("Latency (ms):")
+        for name, value in data["latency"].items():
+            lines.append(f"  {name:<5} {value * 1000:.3f}")
+        return "\n".join(lines)
+
+
+async def _issue(
+    client: AsyncSearchClient,
+    query: str,
+    algorithm: str,
+    started: float,
+    report: Optional[LoadReport],
+) -> None:
+    """Send one search and record it (unless report is None, for warmup)."""
+    try:
+        found, _ = await client.search(query, algorithm)
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        if report is not None:
+            report.record_error(classify_error(e))
+        return
+    if report is not None:
+        report.record(time.perf_counter() - started, found)
+
+
+async def run_closed_loop(
+    client: AsyncSearchClient,
+    mix: QueryMix,
+    report: LoadReport,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    duration: Optional[float] = DEFAULT_DURATION,
+    requests: Optional[int] = None,
+    warmup: float = 0.0,
+    algorithm: str = "linear",
+) -> None:
+    """
+    Keep a fixed number of requests outstanding.
+
+    Args:
+        client: Connected client
+        mix: Query source
+        report: Report results are recorded in
+        concurrency: Number of workers
+        duration: Seconds to measure for (None to rely on requests)
+        requests: Number of measured requests to send (None for no limit)
+        warmup: Seconds of unmeasured load before measuring
+        algorithm: Search algorithm to use
+    """
+    now = time.perf_counter()
+    measure_from = now + warmup
+    deadline = measure_from + duration if duration is not None else math.inf
+    budget = [requests if requests is not None else math.inf]
+
+    async def worker() -> None:
+        while True:
+            started = time.perf_counter()
+            if started >= deadline:
+                return
+            measured = started >= measure_from
+            if measured:
+                if budget[0] <= 0:
+                    return
+                budget[0] -= 1
+            await _issue(
+                client, mix.next(), algorithm, started,
+                report if measured else None,
+            )
+
+    report.started = measure_from
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    report.finished = time.perf_counter()
+
+
+async def run_open_loop(
+    client: AsyncSearchClient,
+    mix: QueryMix,
+    report: LoadReport,
+    rate: float,
+    duration: Optional[float] = DEFAULT_DURATION,
+    requests: Optional[int] = None,
+    warmup: float = 0.0,
+    algorithm: str = "linear",
+    max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+    rng: Optional[random.Random] = None,
+) -> None:
+    """
+    Send requests with Poisson arrivals at a fixed mean rate.
+
+    Arrivals that would exceed max_in_flight outstanding requests are not
+    sent and are reported as "dropped" errors.
+
+    Args:
+        client: Connected client
+        mix: Query source
+        report: Report results are recorded in
+        rate: Mean arrivals per second
+        duration: Seconds to measure for (None to rely on requests)
+        requests: Number of measured requests to send (None for no limit)
+        warmup: Seconds of unmeasured load before measuring
+        algorithm: Search algorithm to use
+        max_in_flight: Maximum number of outstanding requests
+        rng: Random number generator for inter-arrival times
+    """
+    if rate <= 0:
+        raise ValueError("rate must be positive")
+    if duration is None and requests is None:
+        raise ValueError("an open loop needs a duration or a request count")
+    rng = rng or random.Random()
+    start = time.perf_counter()
+    measure_from = start + warmup
+    deadline = measure_from + duration if duration is not None else math.inf
+    remaining = requests if requests is not None else math.inf
+    in_flight: set = set()
+    arrival = start
+
+    report.started = measure_from
+    while True:
+        arrival += rng.expovariate(rate)
+        if arrival >= deadline or remaining <= 0:
+            break
+        delay = arrival - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        measured = arrival >= measure_from
+        if measured:
+            remaining -= 1
+        if len(in_flight) >= max_in_flight:
+            if measured:
+                report.record_error("dropped")
+            continue
+        # Latency counts from the scheduled arrival, not from when the
+        # generator got round to sending it
+        task = asyncio.ensure_future(
+            _issue(
+                client, mix.next(), algorithm, arrival,
+                report if measured else None,
+            )
+        )
+        in_flight.add(task)
+        task.add_done_callback(in_flight.discard)
+    if in_flight:
+        await asyncio.gather(*in_flight)
+    report.finished = time.perf_counter()
+
+
+async def run(args: Any) -> LoadReport:
+    """
+    Run a load test described by parsed command-line arguments.
+
+    Args:
+        args: Namespace from the argument parser in main()
+
+    Returns:
+        The report
+    """
+    config = Config(args.config) if args.config else None
+    queries_path = args.queries
+    if queries_path is None:
+        if config is None:
+            raise ValueError("--queries or --config is required")
+        queries_path = config.file_path
+    rng = random.Random(args.seed)
+    mix = QueryMix(load_queries(queries_path), args.hit_ratio, rng)
+
+    transport = {"tls": "tls", "plain": "tcp"}.get(args.transport)
+    report = LoadReport()
+    report.settings = {
+        "mode": "open" if args.rate else "closed",
+        "algorithm": args.algorithm,
+        "transport": "unix" if args.unix_socket else args.transport,
+        "hit_ratio": args.hit_ratio,
+    }
+    if args.rate:
+        report.settings["rate"] = args.rate
+    else:
+        report.settings["concurrency"] = args.concurrency
+
+    client = AsyncSearchClient(
+        port=args.port,
+        config_path=args.config,
+        timeout=args.timeout,
+        unix_socket=args.unix_socket,
+        connections=args.connections,
+        max_concurrency=args.max_in_flight,
+        transport=transport,
+        host=args.host,
+    )
+    # --requests alone runs until that many are sent
+    duration = args.duration
+    if duration is None and args.requests is None:
+        duration = DEFAULT_DURATION
+    async with client:
+        if args.rate:
+            await run_open_loop(
+                client, mix, report, args.rate, duration, args.requests,
+                args.warmup, args.algorithm, args.max_in_flight, rng,
+            )
+        else:
+            await run_closed_loop(
+                client, mix, report, args.concurrency, duration,
+                args.requests, args.warmup, args.algorithm,
+            )
+    return report
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """Main entry point."""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Generate load against a running search server"
+    )
+    parser.add_argument(
+        "--host", default="localhost",
+        help="Server host name (default: localhost)",
+    )
+    parser.add_argument("--port", "-p", type=int, help="Server port")
+    parser.add_argument("--config", "-c", help="Path to configuration file")
+    parser.add_argument(
+        "--unix-socket", "-u", help="Connect through a Unix domain socket"
+    )
+    parser.add_argument(
+        "--transport",
+        choices=["auto", "tls", "plain"],
+        default="auto",
+        help="TCP transport (auto tries TLS first)",
+    )
+    parser.add_argument(
+        "--queries", "-q",
+        help="Query file, one per line (default: the corpus in --config)",
+    )
+    parser.add_argument(
+        "--hit-ratio", type=float, default=1.0,
+        help="Fraction of queries expected to be found",
+    )
+    parser.add_argument(
+        "--algorithm", "-a",
+        default="linear",
+        choices=["linear", "binary", "boyer_moore", "kmp"],
+        help="Search algorithm to use",
+    )
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument(
+        "--concurrency", "-n", type=int, default=DEFAULT_CONCURRENCY,
+        help="Closed loop: number of outstanding requests",
+    )
+    mode.add_argument(
+        "--rate", "-r", type=float,
+        help="Open loop: mean requests per second (Poisson arrivals)",
+    )
+    parser.add_argument(
+        "--duration", "-d", type=float,
+        help=f"Seconds to measure (default {DEFAULT_DURATION:g})",
+    )
+    parser.add_argument(
+        "--requests", type=int, help="Stop after this many requests"
+    )
+    parser.add_argument(
+        "--warmup", type=float, default=0.0,
+        help="Seconds of unmeasured load first",
+    )
+    parser.add_argument(
+        "--connections", type=int, default=DEFAULT_CONNECTIONS,
+        help="Connections requests are pipelined over",
+    )
+    parser.add_argument(
+        "--max-in-flight", type=int, default=DEFAULT_MAX_IN_FLIGHT,
+        help="Cap on outstanding requests (open loop drops beyond it)",
+    )
+    parser.add_argument(
+        "--timeout", "-t", type=float, help="Per-request timeout in seconds"
+    )
+    parser.add_argument("--seed", type=int, help="Random seed")
+    parser.add_argument(
+        "--json", action="store_true", help="Print the report as JSON"
+    )
+    parser.add_argument("--output", "-o", help="Also write JSON report here")
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(
+        level=logging.WARNING, format="%(levelname)s: %(message)s"
+    )
+    try:
+        report = asyncio.run(run(args))
+    except (OSError, ValueError) as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        sys.exit(1)
+
+    data = report.to_dict()
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(data, f, indent=2)
+    if args.json:
+        print(json.dumps(data, indent=2))
+    else:
+        print(report.format_text())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,593 @@
+"""
+Metrics collection module.
+
+Counters and histograms are sharded per thread: each thread updates its
+own dictionary without taking a lock, and shards are only summed when the
+metrics are read. Exposition uses the Prometheus text format.
+"""
+
+import logging
+import math
+import threading
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Upper bounds (seconds) used for latency histograms
+DEFAULT_LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+# Quantiles reported for latency distributions
+DEFAULT_QUANTILES: Tuple[float, ...] = (0.5, 0.9, 0.99, 0.999)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def log_linear_buckets(
+    min_value: float = 1e-6, max_value: float = 10.0, steps: int = 9
+) -> Tuple[float, ...]:
+    """
+    Build log-linear bucket bounds.
+
+    Every power of ten between min_value and max_value is split into
+    steps equal-width buckets, so relative resolution stays roughly
+    constant from microseconds to seconds.
+
+    Args:
+        min_value: Lowest bucket bound (rounded down to a power of ten)
+        max_value: Highest bucket bound
+        steps: Linear subdivisions per power of ten
+
+    Returns:
+        Sorted bucket upper bounds
+    """
+    bounds = []
+    decade = 10.0 ** math.floor(math.log10(min_value))
+    while decade < max_value:
+        for i in range(steps):
+            bound = float(f"{decade * (1 + 9 * i / steps):.6g}")
+            if bound > max_value:
+                break
+            bounds.append(bound)
+        decade *= 10
+    bounds.append(float(max_value))
+    return tuple(sorted(set(bounds)))
+
+
+# Bounds for per-stage latency: 1us - 10s, 9 buckets per power of ten
+LOG_LINEAR_LATENCY_BUCKETS = log_linear_buckets()
+
+
+def quantile_name(q: float) -> str:
+    """Get the short name of a quantile, e.g. 0.999 -> "p999"."""
+    return "p" + format(q * 100, "g").replace(".", "")
+
+
+def _quantile(buckets: Sequence[float], data: List[float], q: float) -> float:
+    """
+    Estimate a quantile from raw histogram data.
+
+    The value is interpolated linearly inside the bucket that holds the
+    requested rank. Ranks in the +Inf bucket report the highest bound.
+
+    Args:
+        buckets: Bucket upper bounds
+        data: Histogram data [bucket counts..., +Inf count, sum, count]
+        q: Quantile between 0 and 1
+
+    Returns:
+        Estimated value, or 0.0 if there are no observations
+    """
+    total = data[-1]
+    if not total:
+        return 0.0
+    rank = q * total
+    cumulative = 0.0
+    for i, count in enumerate(data[:len(buckets)]):
+        if count and cumulative + count >= rank:
+            lower = buckets[i - 1] if i else 0.0
+            fraction = (rank - cumulative) / count
+            return lower + (buckets[i] - lower) * fraction
+        cumulative += count
+    return buckets[-1]
+
+
+def _escape_label_value(value: str) -> str:
+    """Escape a label value for the Prometheus text format."""
+    return (
+        value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+    )
+
+
+def _format_labels(
+    labelnames: Sequence[str],
+    labels: Sequence[str],
+    extra: Sequence[Tuple[str, str]] = (),
+) -> str:
+    """Format label names and values as a Prometheus label set."""
+    pairs = list(zip(labelnames, labels)) + list(extra)
+    if not pairs:
+        return ""
+    body = ",".join(
+        f'{name}="{_escape_label_value(str(value))}"' for name, value in pairs
+    )
+    return "{" + body + "}"
+
+
+def _format_value(value: float) -> str:
+    """Format a sample value for the Prometheus text format."""
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _ThreadShards:
+    """Per-thread dictionaries that are merged on read."""
+
+    def __init__(self) -> None:
+        self._local = threading.local()
+        self._shards: List[dict] = []
+        self._lock = threading.Lock()
+
+    def local(self) -> dict:
+        """Get the calling thread's shard, creating it on first use."""
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = {}
+            self._local.shard = shard
+            with self._lock:
+                self._shards.append(shard)
+        return shard
+
+    def all(self) -> List[dict]:
+        """Get copies of every thread's shard."""
+        with self._lock:
+            shards = list(self._shards)
+        return [dict(shard) for shard in shards]
+
+
+class Counter:
+    """Monotonically increasing counter with optional labels."""
+
+    metric_type = "counter"
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        labelnames: Sequence[str] = (),
+        func: Optional[Callable[[], float]] = None,
+    ) -> None:
+        """
+        Initialize counter.
+
+        Args:
+            name: Metric name
+            description: Human readable description
+            labelnames: Names of the labels values are keyed by
+            func: Callback returning a total maintained elsewhere, sampled
+                at read time instead of stored increments
+        """
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self.func = func
+        self._shards = _ThreadShards()
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        """
+        Increment the counter.
+
+        Args:
+            labels: Label values, in the order of labelnames
+            amount: Amount to add
+        """
+        shard = self._shards.local()
+        shard[labels] = shard.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        """Get the current value for the given label values."""
+        if self.func is not None:
+            return float(self.func())
+        return sum(shard.get(labels, 0.0) for shard in self._shards.all())
+
+    def snapshot(self) -> Dict[Tuple[str, ...], float]:
+        """Get all values keyed by label values."""
+        if self.func is not None:
+            return {(): float(self.func())}
+        totals: Dict[Tuple[str, ...], float] = {}
+        for shard in self._shards.all():
+            for labels, value in shard.items():
+                totals[labels] = totals.get(labels, 0.0) + value
+        return totals
+
+    def render(self) -> List[str]:
+        """Render samples in the Prometheus text format."""
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} "
+            f"{_format_value(value)}"
+            for labels, value in sorted(self.snapshot().items())
+        ]
+
+
+class Gauge:
+    """Value that can go up and down, with optional labels."""
+
+    metric_type = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        labelnames: Sequence[str] = (),
+        func: Optional[Callable[[], float]] = None,
+    ) -> None:
+        """
+        Initialize gauge.
+
+        Args:
+            name: Metric name
+            description: Human readable description
+            labelnames: Names of the labels values are keyed by
+            func: Callback sampled at read time instead of a stored value
+        """
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self.func = func
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def set(self, value: float, *labels: str) -> None:
+        """Set the gauge to a value."""
+        with self._lock:
+            self._values[labels] = value
+
+    def set_function(self, func: Callable[[], float]) -> None:
+        """Sample the gauge from a callback at read time."""
+        self.func = func
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        """Increase the gauge."""
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        """Decrease the gauge."""
+        self.inc(*labels, amount=-amount)
+
+    def value(self, *labels: str) -> float:
+        """Get the current value for the given label values."""
+        if self.func is not None:
+            return float(self.func())
+        with self._lock:
+            return self._values.get(labels, 0.0)
+
+    def snapshot(self) -> Dict[Tuple[str, ...], float]:
+        """Get a copy of all values keyed by label values."""
+        if self.func is not None:
+            return {(): float(self.func())}
+        with self._lock:
+            return dict(self._values)
+
+    def render(self) -> List[str]:
+        """Render samples in the Prometheus text format."""
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} "
+            f"{_format_value(value)}"
+            for labels, value in sorted(self.snapshot().items())
+        ]
+
+
+class Histogram:
+    """Bucketed distribution of observed values with optional labels."""
+
+    metric_type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+    ) -> None:
+        """
+        Initialize histogram.
+
+        Args:
+            name: Metric name
+            description: Human readable description
+            labelnames: Names of the labels values are keyed by
+            buckets: Sorted bucket upper bounds
+        """
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # label values -> [bucket counts..., +Inf count, sum, count]
+        self._shards = _ThreadShards()
+
+    def observe(self, value: float, *labels: str) -> None:
+        """
+        Record an observation.
+
+        Args:
+            value: Observed value
+            labels: Label values, in the order of labelnames
+        """
+        shard = self._shards.local()
+        data = shard.get(labels)
+        if data is None:
+            data = [0.0] * (len(self.buckets) + 3)
+            shard[labels] = data
+        data[bisect_left(self.buckets, value)] += 1
+        data[-2] += value
+        data[-1] += 1
+
+    def count(self, *labels: str) -> int:
+        """Get the number of observations for the given label values."""
+        data = self.snapshot().get(labels)
+        return int(data[-1]) if data else 0
+
+    def total(self, *labels: str) -> float:
+        """Get the sum of observations for the given label values."""
+        data = self.snapshot().get(labels)
+        return data[-2] if data else 0.0
+
+    def quantile(self, q: float, *labels: str) -> float:
+        """Estimate a quantile of the observations for label values."""
+        data = self.snapshot().get(labels)
+        return _quantile(self.buckets, data, q) if data else 0.0
+
+    def quantiles(
+        self, quantiles: Sequence[float] = DEFAULT_QUANTILES
+    ) -> Dict[Tuple[str, ...], Dict[str, float]]:
+        """
+        Summarize every label set with its count and quantiles.
+
+        Args:
+            quantiles: Quantiles to estimate
+
+        Returns:
+            Label values -> {"count": n, "p50": value, ...}
+        """
+        summary = {}
+        for labels, data in self.snapshot().items():
+            entry = {"count": int(data[-1])}
+            for q in quantiles:
+                entry[quantile_name(q)] = _quantile(self.buckets, data, q)
+            summary[labels] = entry
+        return summary
+
+    def snapshot(self) -> Dict[Tuple[str, ...], List[float]]:
+        """Get raw bucket data, merged across threads, by label values."""
+        totals: Dict[Tuple[str, ...], List[float]] = {}
+        for shard in self._shards.all():
+            for labels, data in shard.items():
+                merged = totals.get(labels)
+                if merged is None:
+                    totals[labels] = list(data)
+                else:
+                    for i, value in enumerate(data):
+                        merged[i] += value
+        return totals
+
+    def render(self) -> List[str]:
+        """Render samples in the Prometheus text format."""
+        lines = []
+        bounds = [_format_value(b) for b in self.buckets] + ["+Inf"]
+        for labels, data in sorted(self.snapshot().items()):
+            cumulative = 0.0
+            for bound, count in zip(bounds, data):
+                cumulative += count
+                label_set = _format_labels(
+                    self.labelnames, labels, (("le", bound),)
+                )
+                lines.append(
+                    f"{self.name}_bucket{label_set} "
+                    f"{_format_value(cumulative)}"
+                )
+            label_set = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_set} {data[-2]!r}")
+            lines.append(
+                f"{self.name}_count{label_set} {_format_value(data[-1])}"
+            )
+        return lines
+
+
+class HistogramQuantiles:
+    """Gauge view exposing estimated quantiles of a histogram."""
+
+    metric_type = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        histogram: Histogram,
+        quantiles: Sequence[float] = DEFAULT_QUANTILES,
+    ) -> None:
+        """
+        Initialize quantile view.
+
+        Args:
+            name: Metric name
+            description: Human readable description
+            histogram: Histogram the quantiles are estimated from
+            quantiles: Quantiles to expose
+        """
+        self.name = name
+        self.description = description
+        self.histogram = histogram
+        self.quantiles = tuple(quantiles)
+
+    def render(self) -> List[str]:
+        """Render one sample per label set and quantile."""
+        lines = []
+        labelnames = self.histogram.labelnames
+        for labels, data in sorted(self.histogram.snapshot().items()):
+            for q in self.quantiles:
+                label_set = _format_labels(
+                    labelnames, labels, (("quantile", _format_value(q)),)
+                )
+                value = _quantile(self.histogram.buckets, data, q)
+                lines.append(f"{self.name}{label_set} {value!r}")
+        return lines
+
+
+class MetricsRegistry:
+    """Collection of named metrics."""
+
+    def __init__(self) -> None:
+        """Initialize an empty registry."""
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = cls(name, *args, **kwargs)
+                self._metrics[name] = metric
+            elif not isinstance(metric, cls):
+                raise ValueError(
+                    f"Metric {name} already registered as "
+                    f"{type(metric).__name__}"
+                )
+            return metric
+
+    def counter(
+        self,
+        name: str,
+        description: str,
+        labelnames: Sequence[str] = (),
+        func: Optional[Callable[[], float]] = None,
+    ) -> Counter:
+        """Get or create a counter."""
+        return self._get_or_create(
+            Counter, name, description, labelnames, func
+        )
+
+    def gauge(
+        self,
+        name: str,
+        description: str,
+        labelnames: Sequence[str] = (),
+        func: Optional[Callable[[], float]] = None,
+    ) -> Gauge:
+        """Get or create a gauge."""
+        return self._get_or_create(
+            Gauge, name, description, labelnames, func
+        )
+
+    def histogram(
+        self,
+        name: str,
+        description: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+    ) -> Histogram:
+        """Get or create a histogram."""
+        return self._get_or_create(
+            Histogram, name, description, labelnames, buckets
+        )
+
+    def quantiles(
+        self,
+        name: str,
+        description: str,
+        histogram: Histogram,
+        quantiles: Sequence[float] = DEFAULT_QUANTILES,
+    ) -> HistogramQuantiles:
+        """Get or create a quantile view of a histogram."""
+        return self._get_or_create(
+            HistogramQuantiles, name, description, histogram, quantiles
+        )
+
+    def get(self, name: str) -> Optional[object]:
+        """Get a registered metric by name."""
+        with self._lock:
+            return self._metrics.get(name)
+
+    def render(self) -> str:
+        """
+        Render all metrics in the Prometheus text exposition format.
+
+        Returns:
+            Exposition text, one sample per line
+        """
+        with self._lock:
+            metrics = sorted(self._metrics.items())
+        lines = []
+        for name, metric in metrics:
+            lines.append(f"# HELP {name} {metric.description}")
+            lines.append(f"# TYPE {name} {metric.metric_type}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """HTTP listener exposing a registry at /metrics."""
+
+    def __init__(
+        self, registry: MetricsRegistry, host: str = "localhost", port: int = 0
+    ) -> None:
+        """
+        Initialize metrics server.
+
+        Args:
+            registry: Registry to expose
+            host: Interface to listen on
+            port: Port to listen on (0 picks a free port)
+        """
+        self.registry = registry
+        self.logger = logging.getLogger("search_server")
+        handler = self._make_handler(registry)
+        self._httpd = ThreadingHTTPServer((host, port), handler)
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def _make_handler(registry: MetricsRegistry):
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", PROMETHEUS_CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args) -> None:
+                # Scrapes are frequent; keep them out of the server log
+                pass
+
+        return MetricsHandler
+
+    @property
+    def port(self) -> int:
+        """Get the port the listener is bound to."""
+        return self._httpd.server_address[1]
+
+    def start(self) -> None:
+        """Serve metrics on a background thread."""
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever, name="metrics", daemon=True
+        )
+        self._thread.start()
+        self.logger.info(f"Metrics listener started on port {self.port}")
+
+    def stop(self) -> None:
+        """Stop serving and close the listening socket."""
+        if self._thread:
+            self._httpd.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._httpd.server_close()
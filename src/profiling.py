@@ -0,0 +1,417 @@
+"""
+On-demand profiling module.
+
+Lets operators look inside a running server without restarting it:
+
+- cProfile for a fixed number of seconds. Each request served during the
+  window runs under its own profiler, and the results are merged into one
+  pstats file when the window ends. Python 3.12+ allows only one active
+  profiler per process, so there requests that overlap a profiled one run
+  unprofiled.
+- tracemalloc snapshots, each diffed against the previous one.
+- A stack sampler that records every thread's stack at a fixed interval
+  and writes collapsed stacks ("frame;frame;frame count"), the input
+  format of flamegraph.pl, speedscope and similar tools.
+
+Everything can be driven by admin commands or, for the cProfile window
+and sampler together, by SIGUSR2.
+
+The sampler runs on its own thread and reads sys._current_frames(). It
+does not use a SIGPROF timer because Python runs signal handlers only on
+the main thread. Here that thread spends most of its time blocked in
+select(), so timer-driven samples would be delayed or lost.
+"""
+
+import cProfile
+import logging
+import os
+import pstats
+import signal
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from types import FrameType
+from typing import Any, Callable, Dict, Optional
+
+DEFAULT_PROFILE_SECONDS = 30.0
+DEFAULT_MAX_PROFILE_SECONDS = 300.0
+DEFAULT_SAMPLE_INTERVAL = 0.005
+# Shorter intervals would keep the sampler thread spinning
+MIN_SAMPLE_INTERVAL = 0.001
+DEFAULT_TRACEMALLOC_FRAMES = 10
+
+
+def _frame_name(frame: FrameType) -> str:
+    """Get a collapsed-stack frame name, e.g. "search.py:_kmp_search"."""
+    code = frame.f_code
+    name = f"{os.path.basename(code.co_filename)}:{code.co_name}"
+    # Spaces and semicolons are separators in the collapsed format
+    return name.replace(" ", "_").replace(";", "_")
+
+
+def collapse_stack(frame: Optional[FrameType], root: str = "") -> str:
+    """
+    Render a stack as "root;outermost;...;innermost".
+
+    Args:
+        frame: Innermost frame of the stack
+        root: Optional first element, e.g. the thread name
+
+    Returns:
+        Semicolon separated frame names
+    """
+    names = []
+    while frame is not None:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    if root:
+        names.append(root.replace(" ", "_").replace(";", "_"))
+    return ";".join(reversed(names))
+
+
+class StackSampler:
+    """Statistical profiler recording the stacks of all threads."""
+
+    def __init__(self, interval: float = DEFAULT_SAMPLE_INTERVAL) -> None:
+        """
+        Initialize sampler.
+
+        Args:
+            interval: Seconds between samples
+        """
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def sample(self) -> None:
+        """Record one stack for every thread except the calling one."""
+        names = {t.ident: t.name for t in threading.enumerate()}
+        own = threading.get_ident()
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            root = names.get(ident, f"thread-{ident}")
+            self.samples[collapse_stack(frame, root)] += 1
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            self.sample()
+
+    def start(self) -> None:
+        """Start sampling in a daemon thread."""
+        self.samples.clear()
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="stack-sampler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop sampling and wait for the thread to exit."""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def write(self, path: str) -> int:
+        """
+        Write collapsed stacks, one "stack count" line each.
+
+        Args:
+            path: Output file
+
+        Returns:
+            int: Number of samples written
+        """
+        with open(path, "w") as f:
+            for stack, count in sorted(self.samples.items()):
+                f.write(f"{stack} {count}\n")
+        return sum(self.samples.values())
+
+
+class ProfilingController:
+    """Start and stop profilers on a running server."""
+
+    def __init__(
+        self,
+        output_dir: str,
+        max_seconds: float = DEFAULT_MAX_PROFILE_SECONDS,
+    ) -> None:
+        """
+        Initialize controller.
+
+        Args:
+            output_dir: Directory profiles and stack files are written to
+            max_seconds: Longest profiling or sampling window accepted
+        """
+        self.output_dir = output_dir
+        self.max_seconds = max_seconds
+        self.logger = logging.getLogger("search_server")
+        self._lock = threading.Lock()
+        self._stats: Optional[pstats.Stats] = None
+        self._cprofile_path: Optional[str] = None
+        self._cprofile_timer: Optional[threading.Timer] = None
+        self._sampler: Optional[StackSampler] = None
+        self._sample_path: Optional[str] = None
+        self._sample_timer: Optional[threading.Timer] = None
+        self._snapshot: Optional[tracemalloc.Snapshot] = None
+
+    def install_signal_handler(self) -> None:
+        """
+        Toggle cProfile and the stack sampler on SIGUSR2.
+
+        Must be called from the main thread. The toggle runs on its own
+        thread, so the signal handler never waits on the profiler lock if
+        the interrupted code holds it.
+        """
+        signal.signal(
+            signal.SIGUSR2,
+            lambda signum, frame: threading.Thread(
+                target=self.toggle, name="profiler-toggle", daemon=True
+            ).start(),
+        )
+
+    def _output_path(self, suffix: str) -> str:
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        name = f"search-server-{os.getpid()}-{stamp}{suffix}"
+        return os.path.join(self.output_dir, name)
+
+    def _check_window(self, seconds: float) -> None:
+        """Reject window lengths that are not in (0, max_seconds]."""
+        if not 0 < seconds <= self.max_seconds:
+            raise ValueError(
+                f"seconds must be more than 0 and at most "
+                f"{self.max_seconds:g}"
+            )
+
+    @property
+    def cprofile_active(self) -> bool:
+        """Get whether a cProfile window is open."""
+        return self._cprofile_path is not None
+
+    @property
+    def sampling_active(self) -> bool:
+        """Get whether the stack sampler is running."""
+        return self._sampler is not None
+
+    def call(self, func: Callable[..., Any], *args: Any) -> Any:
+        """
+        Run func, under a profiler if a cProfile window is open.
+
+        Args:
+            func: Function to run
+            args: Positional arguments
+
+        Returns:
+            func's return value
+        """
+        path = self._cprofile_path
+        if path is None:
+            return func(*args)
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another request holds the process-wide profiler (Python
+            # 3.12+); serve this one unprofiled rather than fail it
+            return func(*args)
+        try:
+            return func(*args)
+        finally:
+            profile.disable()
+            with self._lock:
+                # Drop calls that outlived the window they started in
+                if self._cprofile_path == path:
+                    if self._stats is None:
+                        self._stats = pstats.Stats(profile)
+                    else:
+                        self._stats.add(profile)
+
+    def start_cprofile(
+        self,
+        seconds: float = DEFAULT_PROFILE_SECONDS,
+        path: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Profile requests for a number of seconds.
+
+        Args:
+            seconds: Length of the profiling window
+            path: Output pstats file (generated in output_dir if None)
+
+        Returns:
+            Status with the output path
+
+        Raises:
+            ValueError: If seconds is out of range or a cProfile window is
+                already open
+        """
+        self._check_window(seconds)
+        with self._lock:
+            if self._cprofile_path is not None:
+                raise ValueError("cProfile is already running")
+            self._stats = None
+            self._cprofile_path = path or self._output_path(".prof")
+            self._cprofile_timer = threading.Timer(seconds, self.stop_cprofile)
+            self._cprofile_timer.daemon = True
+            self._cprofile_timer.start()
+        self.logger.info(
+            f"cProfile started for {seconds}s, writing "
+            f"{self._cprofile_path}"
+        )
+        return {"profiling": True, "seconds": seconds,
+                "output": self._cprofile_path}
+
+    def stop_cprofile(self) -> Dict[str, Any]:
+        """
+        Close the cProfile window and write merged stats.
+
+        Returns:
+            Status with the output path and profiled call count
+        """
+        with self._lock:
+            path, stats = self._cprofile_path, self._stats
+            self._cprofile_path = None
+            self._stats = None
+            if self._cprofile_timer is not None:
+                self._cprofile_timer.cancel()
+                self._cprofile_timer = None
+        if path is None:
+            return {"profiling": False}
+
+        calls = 0
+        if stats is not None:
+            stats.dump_stats(path)
+            calls = stats.total_calls
+        else:
+            # Nothing was served during the window; still leave a file
+            cProfile.Profile().dump_stats(path)
+        self.logger.info(f"cProfile written to {path}")
+        return {"profiling": False, "output": path, "calls": calls}
+
+    def start_sampling(
+        self,
+        seconds: float = DEFAULT_PROFILE_SECONDS,
+        path: Optional[str] = None,
+        interval: float = DEFAULT_SAMPLE_INTERVAL,
+    ) -> Dict[str, Any]:
+        """
+        Sample all thread stacks for a number of seconds.
+
+        Args:
+            seconds: Length of the sampling window
+            path: Output collapsed-stack file (generated if None)
+            interval: Seconds between samples
+
+        Returns:
+            Status with the output path and sampler mode
+
+        Raises:
+            ValueError: If seconds or interval is out of range, or the
+                sampler is already running
+        """
+        self._check_window(seconds)
+        if not interval >= MIN_SAMPLE_INTERVAL:
+            raise ValueError(
+                f"interval must be at least {MIN_SAMPLE_INTERVAL:g}"
+            )
+        with self._lock:
+            if self._sampler is not None:
+                raise ValueError("Stack sampler is already running")
+            self._sampler = StackSampler(interval)
+            self._sample_path = path or self._output_path(".folded")
+            self._sampler.start()
+            self._sample_timer = threading.Timer(seconds, self.stop_sampling)
+            self._sample_timer.daemon = True
+            self._sample_timer.start()
+        self.logger.info(
+            f"Stack sampler started for {seconds}s, writing "
+            f"{self._sample_path}"
+        )
+        return {"sampling": True, "seconds": seconds,
+                "output": self._sample_path}
+
+    def stop_sampling(self) -> Dict[str, Any]:
+        """
+        Stop the stack sampler and write collapsed stacks.
+
+        Returns:
+            Status with the output path and number of samples
+        """
+        with self._lock:
+            sampler, path = self._sampler, self._sample_path
+            self._sampler = None
+            self._sample_path = None
+            if self._sample_timer is not None:
+                self._sample_timer.cancel()
+                self._sample_timer = None
+        if sampler is None:
+            return {"sampling": False}
+        sampler.stop()
+        samples = sampler.write(path)
+        self.logger.info(f"Collapsed stacks written to {path}")
+        return {"sampling": False, "output": path, "samples": samples}
+
+    def tracemalloc(self, action: str, limit: int = 10) -> Dict[str, Any]:
+        """
+        Control tracemalloc.
+
+        Args:
+            action: "start", "snapshot" (diffed against the previous
+                snapshot, if any) or "stop"
+            limit: Number of top allocation sites to report
+
+        Returns:
+            Status and, for snapshots, the top allocation sites
+
+        Raises:
+            ValueError: For an unknown action or a snapshot while stopped
+        """
+        if action == "start":
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(DEFAULT_TRACEMALLOC_FRAMES)
+            self._snapshot = None
+            return {"tracing": True}
+        if action == "stop":
+            tracemalloc.stop()
+            self._snapshot = None
+            return {"tracing": False}
+        if action != "snapshot":
+            raise ValueError(f"Unknown tracemalloc action: {action}")
+        if not tracemalloc.is_tracing():
+            raise ValueError("tracemalloc is not running")
+
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            (tracemalloc.Filter(False, tracemalloc.__file__),)
+        )
+        current, peak = tracemalloc.get_traced_memory()
+        if self._snapshot is None:
+            top = [str(stat) for stat in snapshot.statistics("lineno")[:limit]]
+            result = {"tracing": True, "top": top}
+        else:
+            diff = snapshot.compare_to(self._snapshot, "lineno")
+            result = {
+                "tracing": True,
+                "diff": [str(stat) for stat in diff[:limit]],
+            }
+        result.update(current_bytes=current, peak_bytes=peak)
+        self._snapshot = snapshot
+        return result
+
+    def toggle(self) -> None:
+        """Start or stop cProfile and the sampler together (for SIGUSR2)."""
+        if self.cprofile_active or self.sampling_active:
+            self.stop_cprofile()
+            self.stop_sampling()
+        else:
+            seconds = min(DEFAULT_PROFILE_SECONDS, self.max_seconds)
+            self.start_cprofile(seconds)
+            self.start_sampling(seconds)
+
+    def stop(self) -> None:
+        """Stop everything that is running, writing pending output."""
+        self.stop_cprofile()
+        self.stop_sampling()
@@ -1,64 +1,565 @@
 """
 Rate limiting functionality module.
+
+Limiter state is split into lock-protected shards: a client key is hashed
+to one shard, so concurrent requests from different clients rarely
+contend on the same lock while updates for one client stay atomic. Each
+shard is an LRU-ordered map with a hard size cap, so the number of
+tracked clients stays bounded no matter how many addresses show up. A full
+shard evicts a client whose quota has fully recovered before it evicts one
+that is still being throttled.
 """
 
+import logging
+import threading
 import time
-# from collections import defaultdict
-# from typing import Dict, Tuple
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+SLIDING_LOG = "sliding_log"
+TOKEN_BUCKET = "token_bucket"
+
+LOCAL_BACKEND = "local"
+SHARED_BACKEND = "shared"
+
+DEFAULT_SHARDS = 16
+DEFAULT_MAX_CLIENTS = 100000
+# Least recently used entries checked for an idle one before evicting an
+# active client
+EVICTION_SCAN = 32
+
+
+class _StripedTable:
+    """Per-client state split across independently locked LRU shards."""
+
+    def __init__(
+        self,
+        shards: int,
+        max_clients: int,
+        is_idle: Optional[Callable[[Any], bool]] = None,
+    ) -> None:
+        """
+        Initialize the table.
+
+        Args:
+            shards: Number of shards (and locks)
+            max_clients: Maximum number of keys tracked across all shards
+            is_idle: Tells whether an entry can be forgotten without losing
+                state, e.g. a refilled bucket; such entries are evicted first
+        """
+        shards = max(1, shards)
+        self._shards: List[Tuple[threading.Lock, OrderedDict]] = [
+            (threading.Lock(), OrderedDict()) for _ in range(shards)
+        ]
+        # Round up so the table holds at least max_clients keys
+        self.shard_capacity = max(1, -(-max_clients // shards))
+        self._evictions = [0] * shards
+        self._pressure = [0] * shards
+        self._is_idle = is_idle
+
+    def _index(self, key: str) -> int:
+        return hash(key) % len(self._shards)
+
+    def shard(self, key: str) -> Tuple[threading.Lock, OrderedDict]:
+        """Get the (lock, entries) pair responsible for a key."""
+        return self._shards[self._index(key)]
+
+    def shards(self) -> List[Tuple[threading.Lock, OrderedDict]]:
+        """Get all (lock, entries) pairs."""
+        return self._shards
+
+    def touch(self, entries: OrderedDict, key: str, default):
+        """
+        Get a key's entry and mark it most recently used.
+
+        Must be called with the shard's lock held. A missing key is inserted
+        with the value returned by default(). If the shard is full, the least
+        recently used idle entry is evicted, or the least recently used entry
+        if none of the oldest EVICTION_SCAN entries is idle.
+
+        Args:
+            entries: Shard returned by shard()
+            key: Client key
+            default: Factory for the initial entry
+
+        Returns:
+            The entry for key
+        """
+        entry = entries.get(key)
+        if entry is not None:
+            entries.move_to_end(key)
+            return entry
+        if len(entries) >= self.shard_capacity:
+            self._evict(entries, self._index(key))
+        entry = default()
+        entries[key] = entry
+        return entry
+
+    def _evict(self, entries: OrderedDict, index: int) -> None:
+        """Make room in a full shard. Caller holds the shard's lock."""
+        self._evictions[index] += 1
+        if self._is_idle is not None:
+            for scanned, (key, entry) in enumerate(entries.items()):
+                if scanned == EVICTION_SCAN:
+                    break
+                if self._is_idle(entry):
+                    del entries[key]
+                    return
+            self._pressure[index] += 1
+        entries.popitem(last=False)
+
+    @property
+    def evictions(self) -> int:
+        """Get the number of entries evicted to respect the size cap."""
+        return sum(self._evictions)
+
+    @property
+    def pressure_evictions(self) -> int:
+        """Get the number of evicted entries that were not idle."""
+        return sum(self._pressure)
+
+    def snapshot(self) -> dict:
+        """Get a merged copy of every shard's entries."""
+        merged = {}
+        for lock, entries in self._shards:
+            with lock:
+                merged.update(entries)
+        return merged
+
+    def __len__(self) -> int:
+        return sum(len(entries) for _, entries in self._shards)
 
 
 class RateLimiter:
     """Rate limiter for controlling request frequency."""
 
-    def __init__(self, max_requests: int, window_seconds: int):
+    def __init__(
+        self,
+        max_requests: int,
+        window_seconds: int,
+        shards: int = DEFAULT_SHARDS,
+        max_clients: int = DEFAULT_MAX_CLIENTS,
+    ):
         """
         Initialize rate limiter.
 
         Args:
             max_requests: Maximum number of requests allowed in the time window
             window_seconds: Time window in seconds
+            shards: Number of independently locked state shards
+            max_clients: Maximum number of clients tracked at once
         """
         self.max_requests = max_requests
         self.window_seconds = window_seconds
-        self.requests = {}  # IP -> list of timestamps
+        # IP -> list of (timestamp, cost)
+        self._table = _StripedTable(shards, max_clients, self._is_idle)
+
+    @property
+    def requests(self) -> Dict[str, List[Tuple[float, float]]]:
+        """Get a snapshot of (timestamp, cost) records keyed by IP."""
+        return self._table.snapshot()
+
+    @property
+    def tracked_clients(self) -> int:
+        """Get the number of clients currently tracked."""
+        return len(self._table)
+
+    @property
+    def evictions(self) -> int:
+        """Get the number of clients evicted to respect max_clients."""
+        return self._table.evictions
+
+    @property
+    def pressure_evictions(self) -> int:
+        """Get the number of evicted clients that still had requests logged."""
+        return self._table.pressure_evictions
 
-    def check_rate_limit(self, ip_address: str) -> bool:
+    def _is_idle(self, entries: List[Tuple[float, float]]) -> bool:
+        """Check whether a client's log has expired. Caller holds the lock."""
+        return not entries or (
+            entries[-1][0] <= time.time() - self.window_seconds
+        )
+
+    def check_rate_limit(self, ip_address: str, cost: float = 1.0) -> bool:
         """
         Check if a request from an IP address is allowed.
 
         Args:
-            ip_address: IP address of the client
+            ip_address: IP address (or other identity) of the client
+            cost: Quota units the request consumes
 
         Returns:
             bool: True if request is allowed, False if rate limit exceeded
         """
-        now = time.time()
-        window_start = now - self.window_seconds
+        lock, requests = self._table.shard(ip_address)
+        with lock:
+            now = time.time()
+            window_start = now - self.window_seconds
 
-        # Clean up old requests
-        if ip_address in self.requests:
-            self.requests[ip_address] = [
-                ts for ts in self.requests[ip_address] if ts > window_start
+            # Clean up old requests
+            entries = self._table.touch(requests, ip_address, list)
+            entries[:] = [
+                entry for entry in entries if entry[0] > window_start
             ]
-        else:
-            self.requests[ip_address] = []
 
-        # Check if rate limit is exceeded
-        if len(self.requests[ip_address]) >= self.max_requests:
-            return False
+            # Check if rate limit is exceeded
+            used = sum(entry[1] for entry in entries)
+            if used + cost > self.max_requests:
+                return False
+
+            # Add new request
+            entries.append((now, cost))
+            return True
+
+    def charge(self, ip_address: str, cost: float) -> None:
+        """
+        Consume quota after the fact, e.g. for measured execution time.
 
-        # Add new request
-        self.requests[ip_address].append(now)
-        return True
+        Args:
+            ip_address: IP address (or other identity) of the client
+            cost: Quota units to consume
+        """
+        lock, requests = self._table.shard(ip_address)
+        with lock:
+            entries = self._table.touch(requests, ip_address, list)
+            entries.append((time.time(), cost))
 
     def cleanup(self) -> None:
         """Clean up old request records."""
-        current_time = time.time()
-        for client_ip in list(self.requests.keys()):
-            self.requests[client_ip] = [
-                req_time
-                for req_time in self.requests[client_ip]
-                if current_time - req_time <= self.window_seconds
-            ]
-            if not self.requests[client_ip]:
-                del self.requests[client_ip]
+        for lock, requests in self._table.shards():
+            with lock:
+                current_time = time.time()
+                for client_ip in list(requests.keys()):
+                    requests[client_ip] = [
+                        entry
+                        for entry in requests[client_ip]
+                        if current_time - entry[0] <= self.window_seconds
+                    ]
+                    if not requests[client_ip]:
+                        del requests[client_ip]
+
+
+class TokenBucketRateLimiter:
+    """
+    Token bucket rate limiter with constant memory and time per client.
+
+    Each client holds up to max_requests tokens, refilled continuously at
+    max_requests per window_seconds. A request spends one token. This allows
+    the same sustained rate as RateLimiter but stores only two numbers per
+    client instead of one timestamp per request.
+    """
+
+    def __init__(
+        self,
+        max_requests: int,
+        window_seconds: int,
+        clock: Callable[[], float] = time.monotonic,
+        shards: int = DEFAULT_SHARDS,
+        max_clients: int = DEFAULT_MAX_CLIENTS,
+    ):
+        """
+        Initialize rate limiter.
+
+        Args:
+            max_requests: Bucket capacity (burst size)
+            window_seconds: Time to refill an empty bucket completely
+            clock: Monotonic time source in seconds
+            shards: Number of independently locked state shards
+            max_clients: Maximum number of clients tracked at once
+        """
+        self.max_requests = max_requests
+        self.window_seconds = window_seconds
+        self.refill_rate = max_requests / window_seconds
+        self.clock = clock
+        # IP -> [tokens, updated]
+        self._table = _StripedTable(shards, max_clients, self._is_idle)
+
+    @property
+    def buckets(self) -> Dict[str, List[float]]:
+        """Get a snapshot of [tokens, updated] buckets keyed by IP."""
+        return self._table.snapshot()
+
+    @property
+    def tracked_clients(self) -> int:
+        """Get the number of clients currently tracked."""
+        return len(self._table)
+
+    @property
+    def evictions(self) -> int:
+        """Get the number of clients evicted to respect max_clients."""
+        return self._table.evictions
+
+    @property
+    def pressure_evictions(self) -> int:
+        """Get the number of evicted clients whose bucket was not full."""
+        return self._table.pressure_evictions
+
+    def _is_idle(self, bucket: List[float]) -> bool:
+        """Check whether a bucket has refilled. Caller holds the lock."""
+        tokens, updated = bucket
+        refilled = tokens + (self.clock() - updated) * self.refill_rate
+        return refilled >= self.max_requests
+
+    def _refill(self, buckets, ip_address: str) -> List[float]:
+        """Get a client's bucket, topped up to now. Caller holds the lock."""
+        now = self.clock()
+        bucket = self._table.touch(
+            buckets, ip_address, lambda: [float(self.max_requests), now]
+        )
+        bucket[0] = min(
+            self.max_requests,
+            bucket[0] + (now - bucket[1]) * self.refill_rate,
+        )
+        bucket[1] = now
+        return bucket
+
+    def check_rate_limit(self, ip_address: str, cost: float = 1.0) -> bool:
+        """
+        Check if a request from an IP address is allowed.
+
+        Args:
+            ip_address: IP address (or other identity) of the client
+            cost: Tokens the request consumes
+
+        Returns:
+            bool: True if request is allowed, False if rate limit exceeded
+        """
+        lock, buckets = self._table.shard(ip_address)
+        with lock:
+            bucket = self._refill(buckets, ip_address)
+            if bucket[0] < cost:
+                return False
+
+            bucket[0] -= cost
+            return True
+
+    def charge(self, ip_address: str, cost: float) -> None:
+        """
+        Consume tokens after the fact, e.g. for measured execution time.
+
+        The bucket may go into debt, down to minus its capacity, which
+        delays the client's next requests accordingly.
+
+        Args:
+            ip_address: IP address (or other identity) of the client
+            cost: Tokens to consume
+        """
+        lock, buckets = self._table.shard(ip_address)
+        with lock:
+            bucket = self._refill(buckets, ip_address)
+            bucket[0] = max(-self.max_requests, bucket[0] - cost)
+
+    def cleanup(self) -> None:
+        """Forget clients whose buckets have refilled completely."""
+        for lock, buckets in self._table.shards():
+            with lock:
+                for client_ip in list(buckets.keys()):
+                    if self._is_idle(buckets[client_ip]):
+                        del buckets[client_ip]
+
+
+class ConnectionLimiter:
+    """Cap the number of simultaneously open connections per client."""
+
+    def __init__(
+        self, max_connections: int, shards: int = DEFAULT_SHARDS
+    ) -> None:
+        """
+        Initialize connection limiter.
+
+        Args:
+            max_connections: Maximum open connections per client key;
+                0 disables the cap
+            shards: Number of lock stripes
+        """
+        self.max_connections = max_connections
+        # Key -> open connections. Only keys with open connections are
+        # kept, so the size cap of the table is never reached.
+        self._table = _StripedTable(shards, DEFAULT_MAX_CLIENTS)
+
+    def acquire(self, key: str) -> bool:
+        """
+        Register a new connection from a client if it is under the cap.
+
+        Args:
+            key: Client key (IP address or peer identity)
+
+        Returns:
+            bool: True if the connection was admitted and must later be
+                released, False if the client has too many connections
+        """
+        lock, counts = self._table.shard(key)
+        with lock:
+            count = counts.get(key, 0)
+            if self.max_connections and count >= self.max_connections:
+                return False
+            counts[key] = count + 1
+            return True
+
+    def release(self, key: str) -> None:
+        """
+        Unregister a connection admitted by acquire().
+
+        Args:
+            key: Client key passed to acquire()
+        """
+        lock, counts = self._table.shard(key)
+        with lock:
+            count = counts.get(key, 0) - 1
+            if count > 0:
+                counts[key] = count
+            else:
+                counts.pop(key, None)
+
+    def connections(self, key: str) -> int:
+        """Get the number of open connections for a client key."""
+        lock, counts = self._table.shard(key)
+        with lock:
+            return counts.get(key, 0)
+
+    @property
+    def tracked_clients(self) -> int:
+        """Get the number of clients with open connections."""
+        return len(self._table)
+
+
+class CostModel:
+    """
+    Price requests in quota units.
+
+    A request is charged its algorithm's weight times the batch size up
+    front, plus one unit per seconds_per_unit of measured execution time
+    once it has run.
+    """
+
+    def __init__(
+        self,
+        weights: Optional[Dict[str, float]] = None,
+        seconds_per_unit: float = 0.0,
+    ) -> None:
+        """
+        Initialize cost model.
+
+        Args:
+            weights: Algorithm name -> cost per query (default 1.0)
+            seconds_per_unit: Execution time charged as one extra unit;
+                0 disables time-based charging
+        """
+        self.weights = dict(weights or {})
+        self.seconds_per_unit = seconds_per_unit
+
+    def upfront(self, algorithm: str, batch_size: int = 1) -> float:
+        """Get the cost charged before a request runs."""
+        return self.weights.get(algorithm, 1.0) * batch_size
+
+    def measured(self, execution_time: float) -> float:
+        """Get the extra cost for a request's measured execution time."""
+        if self.seconds_per_unit <= 0:
+            return 0.0
+        return execution_time / self.seconds_per_unit
+
+
+class RateLimitSweeper:
+    """Background thread that periodically calls a limiter's cleanup()."""
+
+    def __init__(self, limiter, interval: float) -> None:
+        """
+        Initialize sweeper.
+
+        Args:
+            limiter: Rate limiter exposing cleanup()
+            interval: Seconds between sweeps
+        """
+        self.limiter = limiter
+        self.interval = interval
+        self.sweeps = 0
+        self.logger = logging.getLogger("search_server")
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.limiter.cleanup()
+                self.sweeps += 1
+            except Exception as e:
+                self.logger.error(f"Rate limiter cleanup failed: {str(e)}")
+
+    def start(self) -> None:
+        """Start sweeping in a daemon thread."""
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="rate-limit-sweeper", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop sweeping and wait for the thread to exit."""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+
+def create_rate_limiter(
+    algorithm: str,
+    max_requests: int,
+    window_seconds: int,
+    shards: int = DEFAULT_SHARDS,
+    max_clients: int = DEFAULT_MAX_CLIENTS,
+    backend: str = LOCAL_BACKEND,
+    shared_path: Optional[str] = None,
+):
+    """
+    Create a rate limiter for the configured algorithm.
+
+    Args:
+        algorithm: SLIDING_LOG or TOKEN_BUCKET
+        max_requests: Maximum number of requests allowed in the time window
+        window_seconds: Time window in seconds
+        shards: Number of independently locked state shards
+        max_clients: Maximum number of clients tracked at once
+        backend: LOCAL_BACKEND for per-process state, or SHARED_BACKEND for
+            a token bucket table shared by all processes on the host (only
+            with TOKEN_BUCKET)
+        shared_path: File backing the shared table
+
+    Returns:
+        Rate limiter exposing check_rate_limit() and cleanup()
+
+    Raises:
+        ValueError: If the algorithm or backend is unknown, or the shared
+            backend is asked for another algorithm than TOKEN_BUCKET
+    """
+    if backend == SHARED_BACKEND:
+        if algorithm != TOKEN_BUCKET:
+            raise ValueError(
+                f"The shared rate limit backend requires {TOKEN_BUCKET}, "
+                f"not {algorithm}"
+            )
+        # Imported lazily: the shared backend needs fcntl (POSIX only)
+        from shared_rate_limiter import (
+            DEFAULT_SHARED_PATH,
+            SharedMemoryRateLimiter,
+        )
+
+        return SharedMemoryRateLimiter(
+            max_requests,
+            window_seconds,
+            path=shared_path or DEFAULT_SHARED_PATH,
+            slots=max_clients,
+        )
+    if backend != LOCAL_BACKEND:
+        raise ValueError(f"Unknown rate limit backend: {backend}")
+
+    if algorithm == SLIDING_LOG:
+        return RateLimiter(
+            max_requests, window_seconds,
+            shards=shards, max_clients=max_clients,
+        )
+    if algorithm == TOKEN_BUCKET:
+        return TokenBucketRateLimiter(
+            max_requests, window_seconds,
+            shards=shards, max_clients=max_clients,
+        )
+    raise ValueError(f"Unknown rate limit algorithm: {algorithm}")
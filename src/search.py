@@ -8,6 +8,7 @@ from typing import Tuple, Optional, Callable, List
 from enum import Enum
 import mmap
 import os
+import itertools
 
 
 class SearchAlgorithm(Enum):
@@ -22,6 +23,10 @@ class SearchAlgorithm(Enum):
 class FileSearcher:
     """Handles file search operations."""
 
+    # Shared across instances so generations stay unique when the server
+    # replaces its searcher
+    _generations = itertools.count(1)
+
     def __init__(self, file_path: str, reread_on_query: bool = False) -> None:
         """
         Initialize file searcher.
@@ -38,6 +43,9 @@ class FileSearcher:
         self._file_size: int = 0
         self._mmap_file: Optional[mmap.mmap] = None
         self._mmap_size: int = 0
+        # Incremented on every (re)load of the file
+        self.generation: int = 0
+        self.last_load_duration: float = 0.0
 
     def _load_file(self) -> List[str]:
         """
@@ -49,6 +57,8 @@ class FileSearcher:
         if not self.file_path.exists():
             raise FileNotFoundError(f"File not found: {self.file_path}")
 
+        load_start = time.perf_counter()
+
         # Get file size for monitoring
         self._file_size = self.file_path.stat().st_size
 
@@ -80,8 +90,26 @@ class FileSearcher:
 
         # Update last read time
         self._last_read_time = time.time()
+        self.last_load_duration = time.perf_counter() - load_start
+        self.generation = next(self._generations)
         return contents
 
+    def load(self) -> None:
+        """
+        Load the file now instead of on the first search.
+
+        Raises:
+            FileNotFoundError: If the file cannot be found
+        """
+        self._file_contents = self._load_file()
+        self._sorted_contents = None
+
+    @property
+    def line_count(self) -> int:
+        """Get number of lines currently loaded (0 if not loaded yet)."""
+        contents = self._file_contents
+        return len(contents) if contents is not None else 0
+
     def _ensure_file_loaded(self, algorithm: SearchAlgorithm) -> None:
         """
         Ensure file contents are loaded based on reread_on_query setting.
@@ -200,7 +228,7 @@ class FileSearcher:
             FileNotFoundError: If file cannot be found
             RuntimeError: If search operation fails
         """
-        start_time = time.time()
+        start_ns = time.perf_counter_ns()
 
         try:
             # Strip whitespace and newlines from the query
@@ -226,9 +254,8 @@ class FileSearcher:
 
             # Perform search
             result = search_func(query)
-            end_time = time.time()
 
-            return result, end_time - start_time
+            return result, (time.perf_counter_ns() - start_ns) / 1e9
 
         except Exception as e:
             raise RuntimeError(f"Search operation failed: {str(e)}")
@@ -7,22 +7,98 @@ This module implements a TCP server for string search operations with the follow
 - Multiple search algorithms (linear, binary, Boyer-Moore, KMP)
 - Configurable file rereading behavior
 - Thread pool for handling concurrent connections
+- Optional Unix domain socket listener for co-located clients
+- Prometheus-format metrics on a separate HTTP port
 """
 
 import socket
 import ssl
+import selectors
 import threading
+import heapq
+import itertools
 import json
-from typing import Optional, Tuple
+import logging
+import os
+import signal
+import stat
+import struct
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from concurrent.futures import ThreadPoolExecutor
-# import time
 from pathlib import Path
 # import os
 
-from config import Config
+from config import Config, ConfigSnapshot
 from search import FileSearcher, SearchAlgorithm
-from utils import setup_logging, format_debug_message
-from rate_limiter import RateLimiter
+from utils import DebugMessage, dropped_log_records, setup_logging
+from rate_limiter import (
+    TOKEN_BUCKET,
+    ConnectionLimiter,
+    CostModel,
+    RateLimitSweeper,
+    create_rate_limiter,
+)
+from metrics import (
+    LOG_LINEAR_LATENCY_BUCKETS,
+    MetricsRegistry,
+    MetricsServer,
+)
+from access_log import AccessLog, query_hash
+from profiling import ProfilingController
+from slow_log import SlowQueryLog
+
+# Responses sent on the hot path, encoded once
+RESPONSE_FOUND = b"STRING EXISTS\n"
+RESPONSE_NOT_FOUND = b"STRING NOT FOUND\n"
+
+# Longest request line accepted
+MAX_REQUEST_BYTES = 1024
+
+# Commands that expose server internals; only served over the Unix socket,
+# and only with [server] admin_commands = true
+_ADMIN_COMMANDS = frozenset({
+    "stats", "profile", "sample", "tracemalloc", "slowlog",
+})
+
+# Settings reload_config() applies by rebuilding the rate limiters, which
+# starts every client with a fresh quota
+_RATE_LIMIT_SETTINGS = frozenset({
+    "max_requests_per_minute",
+    "rate_limit_window",
+    "rate_limit_algorithm",
+    "rate_limit_shards",
+    "rate_limit_max_clients",
+    "rate_limit_backend",
+    "rate_limit_shared_path",
+    "max_connections_per_minute",
+})
+# Rate limit settings applied while keeping the limiters' state
+_RATE_LIMIT_TUNING = frozenset({
+    "rate_limit_cleanup_interval",
+    "rate_limit_costs",
+    "rate_limit_time_cost",
+})
+# Settings that only take effect when the server is restarted
+_RESTART_SETTINGS = frozenset({
+    "port",
+    "ssl_enabled",
+    "tls_session_tickets",
+    "accept_threads",
+    "reuse_port",
+    "listen_backlog",
+    "handshake_queue_size",
+    "unix_socket_path",
+    "unix_socket_mode",
+    "metrics_port",
+    "metrics_host",
+    "log_queue_size",
+    "access_log_path",
+    "access_log_max_bytes",
+    "access_log_backup_count",
+    "slow_query_capacity",
+    "slow_query_log_path",
+})
 
 
 class SearchServerError(Exception):
@@ -40,6 +116,37 @@ class ConnectionError(SearchServerError):
     pass
 
 
+class _IdleConnection:
+    """A kept-alive connection waiting for its next request."""
+
+    __slots__ = ("sock", "address", "buffer", "served", "deadline")
+
+    def __init__(
+        self,
+        sock: socket.socket,
+        address: Tuple[str, int],
+        buffer: bytes,
+        served: int,
+        deadline: float,
+    ) -> None:
+        """
+        Initialize idle connection state.
+
+        Args:
+            sock: Client socket
+            address: Client address tuple (ip, port)
+            buffer: Bytes received but not consumed yet
+            served: Requests served on the connection so far
+            deadline: time.monotonic() value by which the next request
+                must be complete
+        """
+        self.sock = sock
+        self.address = address
+        self.buffer = buffer
+        self.served = served
+        self.deadline = deadline
+
+
 class SearchServer:
     """TCP server for string search operations."""
 
@@ -55,26 +162,427 @@ class SearchServer:
             ValueError: If configuration is invalid
         """
         self.config = Config(config_path)
-        self.logger = setup_logging()
+        self.logger = setup_logging(
+            self.config.log_level, self.config.log_queue_size
+        )
         self.searcher = FileSearcher(
             self.config.file_path, self.config.reread_on_query)
+        self.metrics = MetricsRegistry()
         self.server_socket: Optional[socket.socket] = None
+        self.unix_socket: Optional[socket.socket] = None
         self.ssl_context: Optional[ssl.SSLContext] = None
-        self.rate_limiter = RateLimiter(
-            max_requests=self.config.max_requests_per_minute,
-            window_seconds=self.config.rate_limit_window
+        self._create_rate_limiters()
+        self.connection_limiter = ConnectionLimiter(
+            self.config.max_connections_per_client,
+            shards=self.config.rate_limit_shards,
+        )
+        self._tls_handshakes = self.metrics.counter(
+            "search_tls_handshakes_total",
+            "Completed TLS handshakes",
+            ("resumed",),
+        )
+        self._tls_handshake_latency = self.metrics.histogram(
+            "search_tls_handshake_seconds",
+            "TLS handshake latency",
+            ("resumed",),
         )
         self._running = False
         self._port = None
         self._shutdown_event = threading.Event()
+        # Self-pipe used to wake acceptor threads blocked in select()
+        self._wakeup_reader: Optional[socket.socket] = None
+        self._wakeup_writer: Optional[socket.socket] = None
+        self._acceptors_done = threading.Event()
         # Thread pool to limit concurrent connections
-        self._thread_pool = ThreadPoolExecutor(max_workers=50)
+        self._thread_pool = ThreadPoolExecutor(
+            max_workers=self.config.search_workers
+        )
+        # Separate, bounded stage for TLS handshakes
+        self._handshake_pool = ThreadPoolExecutor(
+            max_workers=self.config.handshake_workers,
+            thread_name_prefix="handshake",
+        )
+        self._handshake_slots = threading.BoundedSemaphore(
+            self.config.handshake_queue_size
+        )
+        self._handshake_queue_depth = self.metrics.gauge(
+            "search_tls_handshake_queue_depth",
+            "Connections waiting for a handshake thread",
+        )
+        self._handshakes_in_progress = self.metrics.gauge(
+            "search_tls_handshakes_in_progress",
+            "TLS handshakes currently running",
+        )
+        self._handshake_failures = self.metrics.counter(
+            "search_tls_handshake_failures_total",
+            "Failed or rejected TLS handshakes",
+            ("reason",),
+        )
+        self._requests = self.metrics.counter(
+            "search_requests_total",
+            "Search requests by result and algorithm",
+            ("result", "algorithm"),
+        )
+        self._stage_latency = self.metrics.histogram(
+            "search_stage_seconds",
+            "Time spent in each request processing stage",
+            ("stage",),
+            buckets=LOG_LINEAR_LATENCY_BUCKETS,
+        )
+        self._algorithm_latency = self.metrics.histogram(
+            "search_algorithm_seconds",
+            "Search time by algorithm",
+            ("algorithm",),
+            buckets=LOG_LINEAR_LATENCY_BUCKETS,
+        )
+        self.metrics.quantiles(
+            "search_stage_quantile_seconds",
+            "Estimated per-stage latency quantiles",
+            self._stage_latency,
+        )
+        self.metrics.quantiles(
+            "search_algorithm_quantile_seconds",
+            "Estimated search latency quantiles by algorithm",
+            self._algorithm_latency,
+        )
+        self.profiler = ProfilingController(
+            self.config.profile_dir, self.config.profile_max_seconds
+        )
+        self.slow_log = SlowQueryLog(
+            threshold=self.config.slow_query_threshold,
+            capacity=self.config.slow_query_capacity,
+            path=self.config.slow_query_log_path,
+            include_query=self.config.slow_query_include_query,
+        )
+        self.metrics.counter(
+            "search_slow_queries_total",
+            "Requests captured by the slow-query log",
+            func=lambda: self.slow_log.captured,
+        )
+        # Admin commands, sent as {"command": name, ...}
+        self._commands: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+            "ping": lambda request: {"ok": True},
+            "stats": lambda request: self.stats(),
+            "profile": self._command_profile,
+            "slowlog": self._command_slowlog,
+            "sample": self._command_sample,
+            "tracemalloc": lambda request: self.profiler.tracemalloc(
+                request.get("action", "snapshot"),
+                int(request.get("limit", 10)),
+            ),
+        }
+        self._queue_depth = self.metrics.gauge(
+            "search_thread_pool_queue_depth",
+            "Connections waiting for a search worker",
+        )
+        self._active_connections = self.metrics.gauge(
+            "search_active_connections",
+            "Connections currently being served by search workers",
+        )
+        self._keepalive_requests = self.metrics.counter(
+            "search_keepalive_requests_total",
+            "Requests served on a reused, kept-alive connection",
+        )
+        # Kept-alive connections wait for their next request on a selector
+        # thread rather than holding a search worker. Workers hand them
+        # over through _idle_pending and a wakeup socket.
+        self._idle_pending: List[_IdleConnection] = []
+        self._idle_closed = False
+        self._idle_lock = threading.Lock()
+        self._idle_thread: Optional[threading.Thread] = None
+        self._idle_wakeup_reader: Optional[socket.socket] = None
+        self._idle_wakeup_writer: Optional[socket.socket] = None
+        self._idle_count = 0
+        self.metrics.gauge(
+            "search_keepalive_idle_connections",
+            "Kept-alive connections waiting for their next request",
+            func=lambda: self._idle_count,
+        )
+        self._reload_lock = threading.Lock()
+        self._rate_limited = self.metrics.counter(
+            "search_rate_limit_rejections_total",
+            "Requests rejected by the rate limiter",
+        )
+        self._connections_rejected = self.metrics.counter(
+            "search_connections_rejected_total",
+            "Connections closed right after accept by admission control",
+            ("reason",),
+        )
+        self._reload_duration = self.metrics.histogram(
+            "search_corpus_reload_seconds",
+            "Time taken to (re)load the search corpus",
+        )
+        self.metrics.gauge(
+            "search_rate_limit_tracked_clients",
+            "Clients currently tracked by the rate limiter",
+            func=lambda: self.rate_limiter.tracked_clients,
+        )
+        self.metrics.counter(
+            "search_rate_limit_evictions_total",
+            "Clients evicted from the rate limiter to respect max_clients",
+            func=lambda: self.rate_limiter.evictions,
+        )
+        self.metrics.counter(
+            "search_rate_limit_pressure_evictions_total",
+            "Clients evicted from the rate limiter while still throttled",
+            func=lambda: self.rate_limiter.pressure_evictions,
+        )
+        self.metrics.gauge(
+            "search_corpus_lines",
+            "Lines in the currently loaded corpus",
+            func=lambda: self.searcher.line_count,
+        )
+        self.metrics.counter(
+            "search_log_records_dropped_total",
+            "Log records dropped because the log queue was full",
+            func=dropped_log_records,
+        )
+        self.access_log: Optional[AccessLog] = None
+        if self.config.access_log_path:
+            self.access_log = AccessLog(
+                self.config.access_log_path,
+                sample_rate=self.config.access_log_sample_rate,
+                slow_threshold=self.config.access_log_slow_threshold,
+                max_bytes=self.config.access_log_max_bytes,
+                backup_count=self.config.access_log_backup_count,
+            )
+            self.metrics.counter(
+                "search_access_log_dropped_total",
+                "Access log records dropped because the queue was full",
+                func=lambda: self.access_log.dropped,
+            )
+        self.metrics_server: Optional[MetricsServer] = None
 
     @property
     def port(self) -> Optional[int]:
         """Get the actual port the server is running on."""
         return self._port
 
+    def _create_rate_limiters(self) -> None:
+        """Create the request and connection rate limiters from config."""
+        self.rate_limiter = create_rate_limiter(
+            self.config.rate_limit_algorithm,
+            max_requests=self.config.max_requests_per_minute,
+            window_seconds=self.config.rate_limit_window,
+            shards=self.config.rate_limit_shards,
+            max_clients=self.config.rate_limit_max_clients,
+            backend=self.config.rate_limit_backend,
+            shared_path=self.config.rate_limit_shared_path,
+        )
+        self._rate_limit_sweeper = RateLimitSweeper(
+            self.rate_limiter, self.config.rate_limit_cleanup_interval
+        )
+        self.cost_model = CostModel(
+            self.config.rate_limit_costs, self.config.rate_limit_time_cost
+        )
+        # Connection admission is checked right after accept(), before any
+        # TLS or parsing work is spent on the connection
+        self.connection_rate_limiter = None
+        self._connection_sweeper: Optional[RateLimitSweeper] = None
+        if self.config.max_connections_per_minute > 0:
+            self.connection_rate_limiter = create_rate_limiter(
+                TOKEN_BUCKET,
+                max_requests=self.config.max_connections_per_minute,
+                window_seconds=self.config.rate_limit_window,
+                shards=self.config.rate_limit_shards,
+                max_clients=self.config.rate_limit_max_clients,
+            )
+            self._connection_sweeper = RateLimitSweeper(
+                self.connection_rate_limiter,
+                self.config.rate_limit_cleanup_interval,
+            )
+
+    def reload_config(self) -> Dict[str, Tuple[Any, Any]]:
+        """
+        Re-read the configuration file and apply what changed.
+
+        Log level, rate limits and request costs, search and handshake pool
+        sizes, the corpus file, keep-alive limits, admin commands and the
+        access log, slow-query log and profiling settings take effect
+        immediately. Changing the limits themselves starts every client
+        with a fresh quota; changing costs or the sweep interval does not.
+        Listener, TLS and log file settings are only logged as needing a
+        restart. An invalid file, or a corpus that cannot be loaded, is
+        rejected as a whole and the running settings are kept.
+
+        Returns:
+            Changed settings, as name -> (old value, new value)
+
+        Raises:
+            FileNotFoundError: If the configuration file does not exist
+            ValueError: If a setting has an invalid value
+        """
+        with self._reload_lock:
+            old = self.config.snapshot
+            loaded: Dict[str, FileSearcher] = {}
+
+            def load_corpus(snapshot: ConfigSnapshot) -> None:
+                # Load the new corpus before anything is swapped, so a
+                # missing or unreadable file keeps the running one
+                if (snapshot.file_path, snapshot.reread_on_query) == (
+                    old.file_path, old.reread_on_query
+                ):
+                    return
+                if snapshot.file_path is None:
+                    raise ValueError(snapshot.file_path_error)
+                searcher = FileSearcher(
+                    snapshot.file_path, snapshot.reread_on_query
+                )
+                try:
+                    searcher.load()
+                except (OSError, ValueError) as e:
+                    raise ValueError(
+                        f"Corpus {snapshot.file_path} not loaded: {str(e)}"
+                    )
+                loaded["searcher"] = searcher
+
+            changes = self.config.reload(load_corpus)
+            if not changes:
+                self.logger.info("Configuration reloaded, nothing changed")
+                return changes
+            self.logger.info(
+                "Configuration reloaded, changed: %s",
+                ", ".join(sorted(changes)),
+            )
+
+            if "log_level" in changes:
+                setup_logging(self.config.log_level)
+            if changes.keys() & _RATE_LIMIT_SETTINGS:
+                self._replace_rate_limiters()
+            elif changes.keys() & _RATE_LIMIT_TUNING:
+                self._retune_rate_limiters()
+            if "max_connections_per_client" in changes:
+                self.connection_limiter.max_connections = (
+                    self.config.max_connections_per_client
+                )
+            if "search_workers" in changes:
+                self._replace_pool(
+                    "_thread_pool",
+                    ThreadPoolExecutor(
+                        max_workers=self.config.search_workers
+                    ),
+                )
+            if "handshake_workers" in changes:
+                self._replace_pool(
+                    "_handshake_pool",
+                    ThreadPoolExecutor(
+                        max_workers=self.config.handshake_workers,
+                        thread_name_prefix="handshake",
+                    ),
+                )
+            if "searcher" in loaded:
+                self.searcher = loaded["searcher"]
+                self._reload_duration.observe(
+                    self.searcher.last_load_duration
+                )
+            self.slow_log.threshold = self.config.slow_query_threshold
+            self.slow_log.include_query = self.config.slow_query_include_query
+            if self.access_log:
+                self.access_log.sample_rate = (
+                    self.config.access_log_sample_rate
+                )
+                self.access_log.slow_threshold = (
+                    self.config.access_log_slow_threshold
+                )
+            self.profiler.output_dir = self.config.profile_dir
+            self.profiler.max_seconds = self.config.profile_max_seconds
+
+            restart = sorted(changes.keys() & _RESTART_SETTINGS)
+            if restart:
+                self.logger.warning(
+                    "Restart the server to apply: %s", ", ".join(restart)
+                )
+            return changes
+
+    def _replace_rate_limiters(self) -> None:
+        """Swap in rate limiters built from the current config."""
+        old_limiter = self.rate_limiter
+        old_sweepers = (self._rate_limit_sweeper, self._connection_sweeper)
+        self._create_rate_limiters()
+        for sweeper in old_sweepers:
+            if sweeper:
+                sweeper.stop()
+        if self._running:
+            self._rate_limit_sweeper.start()
+            if self._connection_sweeper:
+                self._connection_sweeper.start()
+        if hasattr(old_limiter, "close"):
+            old_limiter.close()
+
+    def _retune_rate_limiters(self) -> None:
+        """Apply new costs and sweep interval to the running limiters."""
+        self.cost_model = CostModel(
+            self.config.rate_limit_costs, self.config.rate_limit_time_cost
+        )
+        for sweeper in (self._rate_limit_sweeper, self._connection_sweeper):
+            if sweeper is None:
+                continue
+            sweeper.interval = self.config.rate_limit_cleanup_interval
+            if self._running:
+                # Restart so the new interval applies to the current wait
+                sweeper.stop()
+                sweeper.start()
+
+    def _replace_pool(self, name: str, pool: ThreadPoolExecutor) -> None:
+        """
+        Swap a thread pool for a resized one.
+
+        Work already queued on the old pool still runs; its threads exit
+        once it is done.
+
+        Args:
+            name: Attribute holding the pool
+            pool: New pool
+        """
+        old = getattr(self, name)
+        setattr(self, name, pool)
+        old.shutdown(wait=False)
+
+    def _submit_to(self, name: str, *args: Any) -> None:
+        """
+        Submit work to a thread pool that reload_config() may replace.
+
+        Args:
+            name: Attribute holding the pool
+            args: Function and its arguments
+
+        Raises:
+            RuntimeError: If the pool has been shut down by stop()
+        """
+        while True:
+            pool = getattr(self, name)
+            try:
+                pool.submit(*args)
+                return
+            except RuntimeError:
+                # Retry on the replacement if the pool was swapped
+                if pool is getattr(self, name):
+                    raise
+
+    def install_reload_handler(self) -> None:
+        """
+        Reload the configuration on SIGHUP.
+
+        Must be called from the main thread. The reload runs on its own
+        thread, so the signal handler never waits on locks held by the
+        code it interrupted.
+        """
+
+        def reload() -> None:
+            try:
+                self.reload_config()
+            except (OSError, ValueError) as e:
+                self.logger.error(
+                    f"Configuration not reloaded, keeping current: {str(e)}"
+                )
+
+        signal.signal(
+            signal.SIGHUP,
+            lambda signum, frame: threading.Thread(
+                target=reload, name="config-reload", daemon=True
+            ).start(),
+        )
+
     def setup_ssl(self) -> None:
         """
         Set up SSL context with strict security requirements.
@@ -110,6 +618,11 @@ class SearchServer:
                 "HIGH:!aNULL:!eNULL:!EXPORT:!SSLv2:!SSLv3"
             )
 
+            # Allow abbreviated handshakes for returning clients: TLS 1.3
+            # tickets plus OpenSSL's server-side session cache for TLS 1.2
+            self.ssl_context.options &= ~ssl.OP_NO_TICKET
+            self.ssl_context.num_tickets = self.config.tls_session_tickets
+
             self.logger.info(
                 "SSL context configured successfully with strict security "
                 "requirements"
@@ -129,6 +642,24 @@ class SearchServer:
         Returns:
             Tuple of (query, algorithm, is_benchmark)
 
+        Raises:
+            ValueError: If the request is invalid
+        """
+        query, algorithm, is_benchmark, _ = self._parse_request(data)
+        return query, algorithm, is_benchmark
+
+    def _parse_request(
+        self, data: str
+    ) -> Tuple[str, SearchAlgorithm, bool, bool]:
+        """
+        Parse client request, including its keep-alive flag.
+
+        Args:
+            data: Raw request data
+
+        Returns:
+            Tuple of (query, algorithm, is_benchmark, keepalive)
+
         Raises:
             ValueError: If the request is invalid
         """
@@ -138,6 +669,7 @@ class SearchServer:
             query = request.get("query", "").strip()
             algorithm_name = request.get("algorithm", "linear")
             is_benchmark = request.get("benchmark", False)
+            keepalive = bool(request.get("keepalive", False))
 
             if not query:
                 raise ValueError("Empty query")
@@ -147,7 +679,7 @@ class SearchServer:
             except ValueError:
                 algorithm = SearchAlgorithm.LINEAR
 
-            return query, algorithm, is_benchmark
+            return query, algorithm, is_benchmark, keepalive
         except json.JSONDecodeError:
             # Only treat as legacy if it does NOT look like JSON
             if data.strip().startswith("{"):
@@ -155,161 +687,999 @@ class SearchServer:
             query = data.strip()
             if not query:
                 raise ValueError("Empty query")
-            return query, SearchAlgorithm.LINEAR, False
+            return query, SearchAlgorithm.LINEAR, False, False
 
-    def handle_client(
+    def _rate_limit_key(
         self, client_socket: socket.socket, client_address: Tuple[str, int]
+    ) -> str:
+        """
+        Get the identity a client is rate limited by.
+
+        With [rate_limit] key = certificate, TLS clients are limited by the
+        common name of their certificate, so one client keeps its quota
+        across addresses and clients behind one NAT do not share a quota.
+        Other connections fall back to the client address.
+
+        Args:
+            client_socket: Client socket
+            client_address: Client address tuple (ip, port)
+
+        Returns:
+            str: Rate limit key
+        """
+        if (
+            self.config.rate_limit_key == "certificate"
+            and isinstance(client_socket, ssl.SSLSocket)
+        ):
+            cert = client_socket.getpeercert() or {}
+            for rdn in cert.get("subject", ()):
+                for name, value in rdn:
+                    if name == "commonName":
+                        return f"cert:{value}"
+        return client_address[0]
+
+    @staticmethod
+    def _transport(client_socket: socket.socket) -> str:
+        """Get how a client is connected: "tls", "tcp" or "unix"."""
+        if isinstance(client_socket, ssl.SSLSocket):
+            return "tls"
+        if getattr(client_socket, "family", None) == socket.AF_UNIX:
+            return "unix"
+        return "tcp"
+
+    def _respond(
+        self,
+        client_socket: socket.socket,
+        response: bytes,
+        result: str,
+        algorithm: str,
+        access: Dict[str, Any],
+    ) -> None:
+        """
+        Send a response and record its outcome.
+
+        Args:
+            client_socket: Client socket
+            response: Encoded response line
+            result: Result label for metrics and the access log
+            algorithm: Algorithm label ("none" if the request was invalid)
+            access: Access log record for this request
+        """
+        access["result"] = result
+        access["algorithm"] = algorithm
+        self._requests.inc(result, algorithm)
+        send_start = time.perf_counter_ns()
+        client_socket.sendall(response)
+        self._stage_done("send", send_start, access)
+        access["bytes_out"] = len(response)
+
+    def _stage_done(
+        self,
+        stage: str,
+        start_ns: int,
+        record: Optional[Dict[str, Any]] = None,
+    ) -> int:
+        """
+        Record the latency of a request stage.
+
+        Args:
+            stage: Stage label
+            start_ns: perf_counter_ns() value when the stage started
+            record: Per-request record the stage time is also stored in
+
+        Returns:
+            int: perf_counter_ns() value now, i.e. the start of the next
+                stage
+        """
+        now = time.perf_counter_ns()
+        elapsed = (now - start_ns) / 1e9
+        self._stage_latency.observe(elapsed, stage)
+        if record is not None:
+            record[stage] = elapsed
+        return now
+
+    def stats(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """
+        Summarize latency percentiles per stage and per algorithm.
+
+        Returns:
+            {"stages": {stage: summary}, "algorithms": {name: summary}},
+            where each summary has a count and p50/p90/p99/p999 in seconds
+        """
+        return {
+            "stages": {
+                labels[0]: summary
+                for labels, summary in self._stage_latency.quantiles().items()
+            },
+            "algorithms": {
+                labels[0]: summary
+                for labels, summary in (
+                    self._algorithm_latency.quantiles().items()
+                )
+            },
+        }
+
+    def _command_profile(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Start or stop a cProfile window ("action", "seconds")."""
+        if request.get("action", "start") == "stop":
+            return self.profiler.stop_cprofile()
+        return self.profiler.start_cprofile(
+            float(request.get("seconds", self.config.profile_seconds))
+        )
+
+    def _command_slowlog(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Read or clear the slow-query ring buffer ("action", "limit")."""
+        if request.get("action") == "reset":
+            self.slow_log.clear()
+            return {"cleared": True}
+        limit = request.get("limit")
+        return {
+            "threshold": self.slow_log.threshold,
+            "captured": self.slow_log.captured,
+            "entries": self.slow_log.entries(
+                int(limit) if limit is not None else None
+            ),
+        }
+
+    def _command_sample(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Start or stop the stack sampler ("action", "seconds", ...)."""
+        if request.get("action", "start") == "stop":
+            return self.profiler.stop_sampling()
+        return self.profiler.start_sampling(
+            float(request.get("seconds", self.config.profile_seconds)),
+            interval=float(request.get("interval", 0.005)),
+        )
+
+    @staticmethod
+    def _parse_command(data: str) -> Optional[Dict[str, Any]]:
+        """
+        Recognize an admin command request.
+
+        Args:
+            data: Raw request data
+
+        Returns:
+            The decoded request if it is a JSON object with a "command"
+            key, otherwise None
+        """
+        # Cheap pre-check so ordinary queries are not decoded twice
+        if '"command"' not in data or not data.lstrip().startswith("{"):
+            return None
+        try:
+            request = json.loads(data)
+        except json.JSONDecodeError:
+            return None
+        if isinstance(request, dict) and "command" in request:
+            return request
+        return None
+
+    def _handle_command(
+        self,
+        client_socket: socket.socket,
+        request: Dict[str, Any],
+        access: Dict[str, Any],
     ) -> None:
+        """
+        Run an admin command and send its result as one JSON line.
+
+        Args:
+            client_socket: Client socket
+            request: Decoded command request
+            access: Access log record for this request
+        """
+        name = request["command"]
+        handler = self._commands.get(name)
+        if handler is not None and name in _ADMIN_COMMANDS and not (
+            self.config.admin_commands
+            and self._transport(client_socket) == "unix"
+        ):
+            self.logger.warning(
+                "Admin command %s refused from %s", name, access["peer"]
+            )
+            handler = None
+        if handler is None:
+            self.logger.error(f"Unknown command: {name}")
+            self._respond(
+                client_socket, b"INVALID REQUEST\n", "invalid", "none", access
+            )
+            return
+        try:
+            payload = handler(request)
+        except ValueError as e:
+            payload = {"error": str(e)}
+        response = json.dumps(payload).encode("utf-8") + b"\n"
+        self._respond(client_socket, response, "command", "none", access)
+
+    @staticmethod
+    def _has_buffered_data(client_socket: socket.socket) -> bool:
+        """Get whether TLS has decrypted bytes the selector cannot see."""
+        return (
+            isinstance(client_socket, ssl.SSLSocket)
+            and client_socket.pending() > 0
+        )
+
+    def _recv_before(
+        self, client_socket: socket.socket, deadline: float
+    ) -> bytes:
+        """
+        Receive from a kept-alive connection that has data waiting.
+
+        The wait is bounded by the request deadline, so a partial TLS
+        record cannot hold the worker past it.
+
+        Args:
+            client_socket: Client socket
+            deadline: time.monotonic() value the request must be in by
+
+        Returns:
+            bytes: Data received, empty at end of file or past the deadline
+        """
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return b""
+        previous_timeout = client_socket.gettimeout()
+        client_socket.settimeout(remaining)
+        try:
+            return client_socket.recv(MAX_REQUEST_BYTES)
+        except socket.timeout:
+            return b""
+        finally:
+            client_socket.settimeout(previous_timeout)
+
+    def handle_client(
+        self,
+        client_socket: socket.socket,
+        client_address: Tuple[str, int],
+        timings: Optional[Dict[str, float]] = None,
+        idle: Optional[_IdleConnection] = None,
+    ) -> bool:
         """
         Handle a client connection.
 
+        Serves one request, or a series of requests for clients that send
+        "keepalive": true. The first request on a connection is read with
+        a single recv(), so clients that send no trailing newline are
+        still served. Later requests are newline-delimited and may already
+        be buffered when the client pipelines them.
+
+        Between requests a kept-alive connection is parked on the idle
+        selector thread instead of holding this worker, and comes back
+        here with its state once it is readable. It is closed when its
+        next request is not complete [server] keepalive_timeout seconds
+        after the previous response, however the bytes trickle in, or
+        after keepalive_max_requests requests.
+
         Args:
             client_socket: Client socket
             client_address: Client address tuple (ip, port)
+            timings: Seconds already spent in earlier stages ("tls",
+                "queue_wait"), reported for the first request
+            idle: State of a parked connection that became readable
+
+        Returns:
+            bool: True if the connection was parked and is still open
 
         Raises:
             ConnectionError: If client handling fails
         """
-        self.logger.info(f"Handling client from {client_address}")
+        if idle is None:
+            # Lazy %-style arguments: nothing is formatted unless INFO is on
+            self.logger.info("Handling client from %s", client_address)
+            buffer, served, deadline = b"", 0, 0.0
+        else:
+            buffer, served, deadline = idle.buffer, idle.served, idle.deadline
+        keepalive = idle is not None
+        readable = True
+        parked = False
         try:
-            # Read the request
-            data = client_socket.recv(1024)
-            if not data:
-                return
+            while True:
+                recv_start = None
+                if not keepalive:
+                    recv_start = time.perf_counter_ns()
+                    data = client_socket.recv(MAX_REQUEST_BYTES)
+                    if not data:
+                        return False
+                    request, _, buffer = data.partition(b"\n")
+                elif b"\n" in buffer:
+                    request, _, buffer = buffer.partition(b"\n")
+                elif len(buffer) > MAX_REQUEST_BYTES:
+                    self.logger.warning("Request too long, closing")
+                    return False
+                elif readable or self._has_buffered_data(client_socket):
+                    chunk = self._recv_before(client_socket, deadline)
+                    if not chunk:
+                        return False
+                    buffer += chunk
+                    readable = False
+                    continue
+                else:
+                    parked = self._park(
+                        _IdleConnection(
+                            client_socket, client_address, buffer, served,
+                            deadline,
+                        )
+                    )
+                    return parked
+
+                if served:
+                    self._keepalive_requests.inc()
+                served += 1
+                keepalive = self._handle_request(
+                    client_socket,
+                    client_address,
+                    request,
+                    recv_start,
+                    timings if served == 1 else None,
+                )
+                if (
+                    not keepalive
+                    or self.config.keepalive_timeout <= 0
+                    or served >= self.config.keepalive_max_requests
+                ):
+                    return False
+                deadline = time.monotonic() + self.config.keepalive_timeout
+                readable = False
+        except Exception as e:
+            self.logger.error("Error reading from client: %s", e)
+            return False
+        finally:
+            if not parked:
+                client_socket.close()
+
+    def _park(self, idle: _IdleConnection) -> bool:
+        """
+        Hand a kept-alive connection to the idle selector thread.
 
+        Args:
+            idle: Connection state
+
+        Returns:
+            bool: False if the server is stopping and the connection
+                should be closed instead
+        """
+        with self._idle_lock:
+            # Checked under the lock so the idle thread cannot miss it
+            if self._idle_closed:
+                return False
+            self._idle_pending.append(idle)
+        try:
+            self._idle_wakeup_writer.send(b"\0")
+        except BlockingIOError:
+            pass  # A wakeup is already pending
+        return True
+
+    def _idle_loop(self) -> None:
+        """
+        Wait for parked kept-alive connections to send their next request.
+
+        Readable connections go back to the search pool; connections whose
+        deadline passes first are closed, as is every parked connection
+        once the server stops.
+        """
+        deadlines: List[Tuple[float, int, _IdleConnection]] = []
+        order = itertools.count()
+        with selectors.DefaultSelector() as selector:
+            selector.register(self._idle_wakeup_reader, selectors.EVENT_READ)
+            try:
+                while True:
+                    timeout = None
+                    if deadlines:
+                        timeout = max(0.0, deadlines[0][0] - time.monotonic())
+                    for key, _ in selector.select(timeout):
+                        if key.fileobj is self._idle_wakeup_reader:
+                            try:
+                                self._idle_wakeup_reader.recv(4096)
+                            except BlockingIOError:
+                                pass
+                            continue
+                        selector.unregister(key.fileobj)
+                        self._idle_count -= 1
+                        self._submit_search(
+                            key.data.sock, key.data.address, idle=key.data
+                        )
+
+                    with self._idle_lock:
+                        pending, self._idle_pending = self._idle_pending, []
+                        stopping = self._idle_closed
+                    for idle in pending:
+                        if stopping:
+                            self._close_connection(idle.sock, idle.address)
+                            continue
+                        selector.register(
+                            idle.sock, selectors.EVENT_READ, idle
+                        )
+                        self._idle_count += 1
+                        heapq.heappush(
+                            deadlines, (idle.deadline, next(order), idle)
+                        )
+                    if stopping:
+                        return
+
+                    now = time.monotonic()
+                    while deadlines and deadlines[0][0] <= now:
+                        idle = heapq.heappop(deadlines)[2]
+                        try:
+                            key = selector.get_key(idle.sock)
+                        except (KeyError, ValueError):
+                            continue  # Already resumed
+                        if key.data is idle:
+                            selector.unregister(idle.sock)
+                            self._idle_count -= 1
+                            self._close_connection(idle.sock, idle.address)
+            finally:
+                for key in list(selector.get_map().values()):
+                    if key.data is not None:
+                        selector.unregister(key.fileobj)
+                        self._close_connection(
+                            key.data.sock, key.data.address
+                        )
+                self._idle_count = 0
+
+    def _handle_request(
+        self,
+        client_socket: socket.socket,
+        client_address: Tuple[str, int],
+        data: bytes,
+        recv_start: Optional[int] = None,
+        timings: Optional[Dict[str, float]] = None,
+    ) -> bool:
+        """
+        Serve one request and record it.
+
+        Args:
+            client_socket: Client socket
+            client_address: Client address tuple (ip, port)
+            data: Raw request, without its trailing newline
+            recv_start: perf_counter_ns() value when reading the request
+                started, or None if it was already buffered
+            timings: Seconds already spent in earlier stages ("tls",
+                "queue_wait"), reported in the access log
+
+        Returns:
+            bool: True if the client asked to keep the connection open
+        """
+        handle_start = time.perf_counter_ns()
+        access: Dict[str, Any] = {
+            "client": client_address[0],
+            "peer": f"{client_address[0]}:{client_address[1]}",
+            "transport": self._transport(client_socket),
+            "bytes_in": len(data),
+        }
+        if timings:
+            access.update(timings)
+        query = None
+        keepalive = False
+        stage_start = handle_start
+        if recv_start is not None:
+            handle_start = recv_start
+            stage_start = self._stage_done("recv", recv_start, access)
+        try:
             # Parse the request
             try:
-                query, algorithm, benchmark = self.parse_request(
-                    data.decode("utf-8")
+                text = data.decode("utf-8")
+                command = self._parse_command(text)
+                if command is not None:
+                    client_key = self._rate_limit_key(
+                        client_socket, client_address
+                    )
+                    access["client"] = client_key
+                    # Health checks ping every second; charging them would
+                    # spend the client's search quota on probing
+                    exempt = command.get("command") == "ping"
+                    if exempt or self.rate_limiter.check_rate_limit(
+                        client_key
+                    ):
+                        self._handle_command(client_socket, command, access)
+                    else:
+                        self._rate_limited.inc()
+                        self._respond(
+                            client_socket, b"RATE LIMIT EXCEEDED\n",
+                            "rate_limited", "none", access,
+                        )
+                    return bool(command.get("keepalive"))
+                query, algorithm, benchmark, keepalive = self._parse_request(
+                    text
                 )
             except ValueError as e:
-                self.logger.error(f"Invalid request: {str(e)}")
-                client_socket.sendall(b"INVALID REQUEST\n")
-                return
+                self.logger.error("Invalid request: %s", e)
+                self._respond(
+                    client_socket, b"INVALID REQUEST\n", "invalid", "none",
+                    access,
+                )
+                return False
             except Exception as e:
-                self.logger.error(f"Error parsing request: {str(e)}")
-                client_socket.sendall(b"INVALID REQUEST\n")
-                return
+                self.logger.error("Error parsing request: %s", e)
+                self._respond(
+                    client_socket, b"INVALID REQUEST\n", "invalid", "none",
+                    access,
+                )
+                return False
+            access["query_hash"] = query_hash(query)
+            access["query_length"] = len(query)
+            stage_start = self._stage_done("parse", stage_start, access)
 
             # Check rate limit
-            if not self.rate_limiter.check_rate_limit(client_address[0]):
-                self.logger.warning(
-                    f"Rate limit exceeded for {client_address[0]}")
-                client_socket.sendall(b"RATE LIMIT EXCEEDED\n")
-                return
+            client_key = self._rate_limit_key(client_socket, client_address)
+            access["client"] = client_key
+            cost = self.cost_model.upfront(algorithm.value)
+            allowed = self.rate_limiter.check_rate_limit(client_key, cost)
+            self._stage_done("rate_limit", stage_start, access)
+            if not allowed:
+                self.logger.warning("Rate limit exceeded for %s", client_key)
+                self._rate_limited.inc()
+                self._respond(
+                    client_socket, b"RATE LIMIT EXCEEDED\n", "rate_limited",
+                    algorithm.value, access,
+                )
+                return keepalive
 
             # Re-read file if needed
             try:
                 if self.config.reread_on_query:
                     self.logger.debug(
-                        f"Re-reading file for query: {query}, "
-                        f"Algorithm: {algorithm}")
+                        "Re-reading file for query: %s, Algorithm: %s",
+                        query,
+                        algorithm,
+                    )
                     self.searcher = FileSearcher(
                         self.config.file_path,
                         self.config.reread_on_query
                     )
             except FileNotFoundError as e:
-                self.logger.error(f"File not found: {str(e)}")
-                client_socket.sendall(b"FILE NOT FOUND\n")
-                return
+                self.logger.error("File not found: %s", e)
+                self._respond(
+                    client_socket, b"FILE NOT FOUND\n", "file_not_found",
+                    algorithm.value, access,
+                )
+                return keepalive
             except Exception as e:
-                self.logger.error(f"Error reading file: {str(e)}")
-                client_socket.sendall(b"INTERNAL ERROR\n")
-                return
+                self.logger.error("Error reading file: %s", e)
+                self._respond(
+                    client_socket, b"INTERNAL ERROR\n", "error",
+                    algorithm.value, access,
+                )
+                return keepalive
 
             # Perform search
             try:
                 # Log debug info if benchmark mode
                 if benchmark:
                     self.logger.debug(
-                        f"Benchmark mode: Query={query}, Algorithm={algorithm}"
+                        "Benchmark mode: Query=%s, Algorithm=%s",
+                        query,
+                        algorithm,
                     )
 
                 # Perform the search
-                found, execution_time = self.searcher.search(query, algorithm)
-
-                # Log debug information
-                debug_message = format_debug_message(
-                    query, client_address[0], execution_time, found
+                searcher = self.searcher
+                generation = searcher.generation
+                found, execution_time = searcher.search(query, algorithm)
+                access["search"] = execution_time
+                access["generation"] = searcher.generation
+                self._stage_latency.observe(execution_time, "search")
+                self._algorithm_latency.observe(
+                    execution_time, algorithm.value
                 )
-                self.logger.debug(debug_message)
+                extra_cost = self.cost_model.measured(execution_time)
+                if extra_cost:
+                    self.rate_limiter.charge(client_key, extra_cost)
+                if searcher.generation != generation:
+                    self._reload_duration.observe(searcher.last_load_duration)
+
+                # Log debug information; the message is only formatted if
+                # a handler actually emits it
+                if self.logger.isEnabledFor(logging.DEBUG):
+                    self.logger.debug(
+                        DebugMessage(
+                            query, client_address[0], execution_time, found
+                        )
+                    )
 
                 # Send response
-                response = "STRING EXISTS\n" if found else "STRING NOT FOUND\n"
-                client_socket.sendall(response.encode("utf-8"))
+                if found:
+                    self._respond(
+                        client_socket, RESPONSE_FOUND, "found",
+                        algorithm.value, access,
+                    )
+                else:
+                    self._respond(
+                        client_socket, RESPONSE_NOT_FOUND, "not_found",
+                        algorithm.value, access,
+                    )
 
             except Exception as e:
-                self.logger.error(f"Error during search: {str(e)}")
-                client_socket.sendall(b"SEARCH ERROR\n")
+                self.logger.error("Error during search: %s", e)
+                self._respond(
+                    client_socket, b"SEARCH ERROR\n", "error",
+                    algorithm.value, access,
+                )
+            return keepalive
 
         except Exception as e:
-            self.logger.error(f"Error handling client: {str(e)}")
+            self.logger.error("Error handling client: %s", e)
+            access["result"] = "error"
             try:
                 client_socket.sendall(b"INTERNAL ERROR\n")
             except Exception:
                 pass
+            return False
+        finally:
+            if "result" in access:
+                access["duration"] = (
+                    (time.perf_counter_ns() - handle_start) / 1e9
+                    + access.get("queue_wait", 0.0)
+                    + access.get("tls", 0.0)
+                )
+                self.slow_log.record(access, query)
+                if self.access_log is not None:
+                    self.access_log.log(access)
+
+    def _serve_connection(
+        self,
+        client_socket: socket.socket,
+        client_address: Tuple[str, int],
+        enqueued_at: int,
+        timings: Dict[str, float],
+        idle: Optional[_IdleConnection] = None,
+    ) -> None:
+        """
+        Run handle_client on a search worker, recording pool metrics.
+
+        Args:
+            client_socket: Client socket
+            client_address: Client address tuple (ip, port)
+            enqueued_at: perf_counter_ns() value when the job was submitted
+            timings: Seconds spent in earlier stages, by stage name
+            idle: State of a parked kept-alive connection being resumed
+        """
+        self._queue_depth.dec()
+        queue_wait = (time.perf_counter_ns() - enqueued_at) / 1e9
+        self._stage_latency.observe(queue_wait, "queue_wait")
+        timings["queue_wait"] = queue_wait
+        self._active_connections.inc()
+        parked = False
+        try:
+            parked = self.profiler.call(
+                self.handle_client, client_socket, client_address, timings,
+                idle,
+            )
         finally:
-            client_socket.close()
+            self._active_connections.dec()
+            # A parked connection stays open and keeps its slot
+            if not parked:
+                self.connection_limiter.release(client_address[0])
+
+    def _submit_search(
+        self,
+        client_socket: socket.socket,
+        client_address: Tuple[str, int],
+        timings: Optional[Dict[str, float]] = None,
+        idle: Optional[_IdleConnection] = None,
+    ) -> None:
+        """
+        Queue a ready connection for a search worker.
+
+        Args:
+            client_socket: Client socket
+            client_address: Client address tuple (ip, port)
+            timings: Seconds spent in earlier stages, by stage name
+            idle: State of a parked kept-alive connection that became
+                readable
+        """
+        self._queue_depth.inc()
+        try:
+            self._submit_to(
+                "_thread_pool",
+                self._serve_connection,
+                client_socket,
+                client_address,
+                time.perf_counter_ns(),
+                timings if timings is not None else {},
+                idle,
+            )
+        except RuntimeError:
+            # Search pool already shut down
+            self._queue_depth.dec()
+            self._close_connection(client_socket, client_address)
 
     def _handle_connection(
         self, client_socket: socket.socket, client_address: Tuple[str, int]
     ) -> None:
         """
-        Handle SSL wrapping and client processing.
+        Perform the TLS handshake and hand the connection to a search worker.
+
+        Runs on the handshake pool, so slow or malicious handshakers can only
+        tie up handshake threads. The socket timeout acts as a deadline for
+        the whole handshake, not for each read.
+
+        Args:
+            client_socket: Client socket
+            client_address: Client address tuple (ip, port)
+        """
+        self._handshake_queue_depth.dec()
+        self._handshakes_in_progress.inc()
+        try:
+            client_socket.settimeout(self.config.handshake_timeout)
+            handshake_start = time.perf_counter_ns()
+            client_socket = self.ssl_context.wrap_socket(
+                client_socket, server_side=True
+            )
+            # Verify client certificate
+            if not client_socket.getpeercert():
+                raise ssl.SSLError("No client certificate provided")
+            resumed = str(client_socket.session_reused).lower()
+            handshake_time = (time.perf_counter_ns() - handshake_start) / 1e9
+            self._tls_handshake_latency.observe(handshake_time, resumed)
+            self._stage_latency.observe(handshake_time, "handshake")
+            self._tls_handshakes.inc(resumed)
+            self.logger.info("SSL handshake completed successfully")
+        except ssl.SSLError as e:
+            self._handshake_failures.inc("ssl_error")
+            self.logger.error(
+                f"SSL handshake failed from {client_address}: {str(e)}"
+            )
+            try:
+                client_socket.sendall(b"SSL_REQUIRED\n")
+            except Exception:
+                pass
+            self._close_connection(client_socket, client_address)
+            return
+        except socket.timeout:
+            self._handshake_failures.inc("timeout")
+            self.logger.error(
+                f"SSL handshake timed out from {client_address}"
+            )
+            self._close_connection(client_socket, client_address)
+            return
+        except Exception as e:
+            self._handshake_failures.inc("error")
+            self.logger.error(
+                f"SSL connection error from {client_address}: {str(e)}"
+            )
+            self._close_connection(client_socket, client_address)
+            return
+        finally:
+            self._handshakes_in_progress.dec()
+            self._handshake_slots.release()
+
+        # Only established, authenticated connections reach search workers
+        self._submit_search(
+            client_socket, client_address, {"tls": handshake_time}
+        )
+
+    @staticmethod
+    def _peer_identity(client_socket: socket.socket) -> Tuple[str, int]:
+        """
+        Identify the process on the other end of a Unix domain socket.
+
+        Args:
+            client_socket: Accepted Unix domain socket
+
+        Returns:
+            Tuple of ("uid:<uid>", pid), used in place of (ip, port)
+        """
+        peercred = getattr(socket, "SO_PEERCRED", None)
+        if peercred is None:
+            return "unix", 0
+        fmt = "3i"  # struct ucred: pid, uid, gid
+        creds = client_socket.getsockopt(
+            socket.SOL_SOCKET, peercred, struct.calcsize(fmt)
+        )
+        pid, uid, _ = struct.unpack(fmt, creds)
+        return f"uid:{uid}", pid
+
+    def _admit_connection(
+        self, client_socket: socket.socket, client_address: Tuple[str, int]
+    ) -> bool:
+        """
+        Apply connection-level limits right after accept().
+
+        Rejected connections are closed before any TLS handshake, read or
+        parsing work is done for them. Admitted connections count against
+        the client's concurrent-connection cap until _close_connection()
+        or the search worker releases them.
+
+        Args:
+            client_socket: Client socket
+            client_address: Client address tuple (ip, port)
+
+        Returns:
+            bool: True if the connection may proceed
+        """
+        client_key = client_address[0]
+        reason = None
+        if (
+            self.connection_rate_limiter is not None
+            and not self.connection_rate_limiter.check_rate_limit(client_key)
+        ):
+            reason = "rate_limited"
+        elif not self.connection_limiter.acquire(client_key):
+            reason = "too_many_connections"
+
+        if reason is None:
+            return True
+        self._connections_rejected.inc(reason)
+        self.logger.warning(
+            f"Rejecting connection from {client_address}: {reason}"
+        )
+        client_socket.close()
+        return False
+
+    def _close_connection(
+        self, client_socket: socket.socket, client_address: Tuple[str, int]
+    ) -> None:
+        """
+        Close an admitted connection that never reached a search worker.
 
         Args:
             client_socket: Client socket
             client_address: Client address tuple (ip, port)
+        """
+        client_socket.close()
+        self.connection_limiter.release(client_address[0])
+
+    def _dispatch_connection(
+        self,
+        client_socket: socket.socket,
+        client_address: Tuple[str, int],
+        local: bool = False,
+    ) -> None:
+        """
+        Route an accepted connection to the handshake or search stage.
+
+        Args:
+            client_socket: Client socket
+            client_address: Client address tuple (ip, port)
+            local: Whether the connection came in over the Unix socket,
+                which relies on filesystem permissions instead of TLS
+        """
+        if local or not self.config.ssl_enabled:
+            self._submit_search(client_socket, client_address)
+            return
+
+        # Bound pending handshakes so a flood cannot grow the queue forever
+        if not self._handshake_slots.acquire(blocking=False):
+            self._handshake_failures.inc("queue_full")
+            self.logger.warning(
+                f"Handshake queue full, rejecting {client_address}"
+            )
+            self._close_connection(client_socket, client_address)
+            return
+
+        self._handshake_queue_depth.inc()
+        try:
+            self._submit_to(
+                "_handshake_pool",
+                self._handle_connection,
+                client_socket,
+                client_address,
+            )
+        except RuntimeError:
+            # Handshake pool already shut down
+            self._handshake_queue_depth.dec()
+            self._handshake_slots.release()
+            self._close_connection(client_socket, client_address)
+
+    def _accept_pending(self, listener: socket.socket) -> None:
+        """
+        Accept every connection currently queued on a listening socket.
+
+        Listening sockets are non-blocking, so a burst of connections is
+        drained in one pass and the loop returns as soon as the backlog is
+        empty (or another acceptor thread has taken the remaining ones).
+
+        Args:
+            listener: Listening socket that became readable
+        """
+        local = listener is self.unix_socket
+        while not self._shutdown_event.is_set():
+            try:
+                client_socket, client_address = listener.accept()
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError as e:
+                if not self._shutdown_event.is_set():
+                    self.logger.error(f"Error accepting connection: {str(e)}")
+                return
+
+            client_socket.setblocking(True)
+            if local:
+                client_address = self._peer_identity(client_socket)
+            self.logger.info("Accepted connection from %s", client_address)
+
+            if self._admit_connection(client_socket, client_address):
+                self._dispatch_connection(
+                    client_socket, client_address, local
+                )
+
+    def _accept_loop(self) -> None:
+        """
+        Block until connections arrive or the server is asked to stop.
+
+        Each acceptor thread owns a selector watching the listening sockets
+        and the wakeup socket, so idle servers sleep in the kernel instead
+        of polling, and stop() interrupts the wait immediately.
+        """
+        with selectors.DefaultSelector() as selector:
+            selector.register(self.server_socket, selectors.EVENT_READ)
+            if self.unix_socket:
+                selector.register(self.unix_socket, selectors.EVENT_READ)
+            selector.register(self._wakeup_reader, selectors.EVENT_READ)
+
+            while not self._shutdown_event.is_set():
+                for key, _ in selector.select():
+                    # The wakeup byte is never consumed, so every acceptor
+                    # thread sees it and exits.
+                    if key.fileobj is self._wakeup_reader:
+                        return
+                    self._accept_pending(key.fileobj)
+
+    def _open_unix_socket(self, path: str) -> None:
+        """
+        Create the Unix domain socket listener.
+
+        Access control is left to the filesystem: the socket file gets the
+        configured mode, so only users with write permission can connect.
+
+        Args:
+            path: Filesystem path of the socket
 
         Raises:
-            ConnectionError: If connection handling fails
+            SearchServerError: If a non-socket file exists at the path
         """
+        if os.path.lexists(path):
+            if not stat.S_ISSOCK(os.lstat(path).st_mode):
+                raise SearchServerError(
+                    f"Refusing to replace non-socket file: {path}"
+                )
+            # Stale socket left behind by a previous run
+            os.unlink(path)
+
+        self.unix_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        # Create the file with no permissions, so nobody can connect before
+        # it gets the configured mode
+        old_umask = os.umask(0o777)
         try:
-            # If SSL is enabled, wrap the socket immediately and verify
-            if self.config.ssl_enabled:
-                try:
-                    # Perform SSL handshake with timeout
-                    client_socket.settimeout(10.0)
-                    client_socket = self.ssl_context.wrap_socket(
-                        client_socket, server_side=True
-                    )
-                    # Verify client certificate
-                    cert = client_socket.getpeercert()
-                    if not cert:
-                        raise ssl.SSLError(
-                            "No client certificate provided"
-                        )
-                    self.logger.info(
-                        "SSL handshake completed successfully"
-                    )
-                except ssl.SSLError as e:
-                    self.logger.error(
-                        f"SSL handshake failed from {client_address}: {str(e)}"
-                    )
-                    try:
-                        client_socket.sendall(b"SSL_REQUIRED\n")
-                    except Exception:
-                        pass
-                    client_socket.close()
-                    return
-                except Exception as e:
-                    self.logger.error(
-                        f"SSL connection error from {client_address}: {str(e)}"
-                    )
-                    client_socket.close()
-                    return
+            self.unix_socket.bind(path)
+        finally:
+            os.umask(old_umask)
+        os.chmod(path, self.config.unix_socket_mode)
+        self.unix_socket.listen(self.config.listen_backlog)
+        self.unix_socket.setblocking(False)
+        self.logger.info(f"Listening on Unix socket {path}")
+
+    def _close_unix_socket(self) -> None:
+        """Close the Unix domain socket listener and remove its file."""
+        if not self.unix_socket:
+            return
+        path = self.unix_socket.getsockname()
+        self.unix_socket.close()
+        self.unix_socket = None
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
 
-            # Process the client request
-            self.handle_client(client_socket, client_address)
+    def _wakeup_acceptors(self) -> None:
+        """Wake all acceptor threads blocked in select()."""
+        if self._wakeup_writer:
+            try:
+                self._wakeup_writer.send(b"\0")
+            except OSError:
+                pass
 
-        except Exception as e:
-            self.logger.error(
-                f"Error handling connection from {client_address}: {str(e)}"
-            )
+    def _close_idle_connections(self) -> None:
+        """Close parked kept-alive connections and stop the idle thread."""
+        with self._idle_lock:
+            self._idle_closed = True
+        if self._idle_wakeup_writer:
             try:
-                client_socket.close()
-            except Exception:
+                self._idle_wakeup_writer.send(b"\0")
+            except OSError:
                 pass
+        idle_thread = self._idle_thread
+        if idle_thread and idle_thread is not threading.current_thread():
+            idle_thread.join()
 
     def start(self) -> None:
         """
@@ -322,6 +1692,8 @@ class SearchServer:
             self.logger.warning("Server is already running")
             return
 
+        acceptors = []
+        self._acceptors_done.clear()
         try:
             # Create server socket
             self.server_socket = socket.socket(
@@ -330,11 +1702,35 @@ class SearchServer:
             self.server_socket.setsockopt(
                 socket.SOL_SOCKET, socket.SO_REUSEADDR, 1
             )
+            if self.config.reuse_port:
+                # Let several server processes share the port; combine with
+                # the shared rate limit backend for one global quota
+                self.server_socket.setsockopt(
+                    socket.SOL_SOCKET, socket.SO_REUSEPORT, 1
+                )
             self.server_socket.bind(("localhost", self.config.port))
-            self.server_socket.listen(5)
-            # Set a timeout to allow checking shutdown event
-            self.server_socket.settimeout(0.1)
+            self.server_socket.listen(self.config.listen_backlog)
+            # Non-blocking so acceptors can drain bursts without stalling
+            self.server_socket.setblocking(False)
             self._port = self.server_socket.getsockname()[1]
+            if self.config.unix_socket_path:
+                self._open_unix_socket(self.config.unix_socket_path)
+            elif self.config.admin_commands:
+                self.logger.warning(
+                    "admin_commands is set but no unix_socket_path is; "
+                    "admin commands are only served over the Unix socket"
+                )
+            self._wakeup_reader, self._wakeup_writer = socket.socketpair()
+            (
+                self._idle_wakeup_reader, self._idle_wakeup_writer
+            ) = socket.socketpair()
+            self._idle_wakeup_reader.setblocking(False)
+            self._idle_wakeup_writer.setblocking(False)
+            self._idle_closed = False
+            self._idle_thread = threading.Thread(
+                target=self._idle_loop, name="keepalive-idle", daemon=True
+            )
+            self._idle_thread.start()
             self._running = True
 
             # Set up SSL if enabled
@@ -346,35 +1742,66 @@ class SearchServer:
 
             self.logger.info(f"Server started on port {self._port}")
 
-            while not self._shutdown_event.is_set():
-                try:
-                    # Accept client connection
-                    client_socket, client_address = self.server_socket.accept()
-                    self.logger.info(
-                        f"Accepted connection from {client_address}"
-                    )
+            self._rate_limit_sweeper.start()
+            if self._connection_sweeper:
+                self._connection_sweeper.start()
+            if self.access_log:
+                self.access_log.start()
+            self.slow_log.start()
+
+            if self.config.metrics_port is not None:
+                self.metrics_server = MetricsServer(
+                    self.metrics,
+                    host=self.config.metrics_host,
+                    port=self.config.metrics_port,
+                )
+                self.metrics_server.start()
+
+            # The calling thread is one acceptor; start the others
+            for i in range(1, self.config.accept_threads):
+                acceptor = threading.Thread(
+                    target=self._accept_loop,
+                    name=f"acceptor-{i}",
+                    daemon=True,
+                )
+                acceptor.start()
+                acceptors.append(acceptor)
 
-                    # Submit connection handling to thread pool
-                    self._thread_pool.submit(
-                        self._handle_connection, client_socket, client_address
-                    )
-
-                except socket.timeout:
-                    continue
-                except Exception as e:
-                    if not self._shutdown_event.is_set():
-                        self.logger.error(
-                            f"Error accepting connection: {str(e)}"
-                        )
+            self._accept_loop()
 
         except Exception as e:
             self.logger.error(f"Server error: {str(e)}")
             raise SearchServerError(f"Failed to start server: {str(e)}")
         finally:
             self._running = False
+            self._shutdown_event.set()
+            self._wakeup_acceptors()
+            for acceptor in acceptors:
+                acceptor.join()
             if self.server_socket:
                 self.server_socket.close()
-            # Shutdown thread pool gracefully
+            self._close_unix_socket()
+            self._rate_limit_sweeper.stop()
+            if self._connection_sweeper:
+                self._connection_sweeper.stop()
+            if self.access_log:
+                self.access_log.stop()
+            self.slow_log.stop()
+            self.profiler.stop()
+            if self.metrics_server:
+                self.metrics_server.stop()
+                self.metrics_server = None
+            for sock in (self._wakeup_reader, self._wakeup_writer):
+                if sock:
+                    sock.close()
+            self._acceptors_done.set()
+            self._close_idle_connections()
+            for sock in (self._idle_wakeup_reader, self._idle_wakeup_writer):
+                if sock:
+                    sock.close()
+            # Shutdown thread pools gracefully; handshakes first since they
+            # feed the search pool
+            self._handshake_pool.shutdown(wait=True)
             self._thread_pool.shutdown(wait=True)
 
     def stop(self) -> None:
@@ -385,15 +1812,16 @@ class SearchServer:
         self._running = False
         self._shutdown_event.set()
 
-        # Close the server socket to break the accept() call
-        if self.server_socket:
-            try:
-                self.server_socket.close()
-            except Exception as e:
-                self.logger.error(f"Error closing server socket: {str(e)}")
-            self.server_socket = None
+        # Wake the acceptors; start() closes the listening socket once they
+        # have all left select()
+        self._wakeup_acceptors()
+        if not self._acceptors_done.wait(timeout=5.0):
+            self.logger.error("Timed out waiting for acceptor threads")
+        self.server_socket = None
+        self._close_idle_connections()
 
-        # Shutdown thread pool
+        # Shutdown thread pools
+        self._handshake_pool.shutdown(wait=True)
         self._thread_pool.shutdown(wait=True)
 
         self.logger.info("Server stopped")
@@ -402,6 +1830,8 @@ class SearchServer:
 def main() -> None:
     """Main entry point."""
     server = SearchServer()
+    server.profiler.install_signal_handler()
+    server.install_reload_handler()
     try:
         server.start()
     except KeyboardInterrupt:
@@ -0,0 +1,320 @@
+"""
+Cross-process rate limiting module.
+
+Several server processes on one host can enforce a single per-client quota
+by sharing a token bucket table stored in an mmap-backed file (by default
+under /dev/shm). The table has a fixed number of slots grouped into small
+sets: a client key hashes to one set, and only that set is locked while
+the client's bucket is updated. Locking combines a thread lock (for
+threads of the same process) with an fcntl byte-range lock on the set
+(for other processes). When a set is full the least recently updated
+bucket is reused, so memory never grows.
+
+fcntl locks belong to the process, not to a file descriptor: they do not
+exclude each other within a process, and closing any descriptor of the
+file drops all of them. Each process therefore opens a table file once,
+and every limiter on that path shares the descriptor and thread locks.
+"""
+
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import time
+from typing import Callable, Dict, List
+
+MAGIC = b"SRCHRL01"
+# magic, number of slots, slots per set
+HEADER = struct.Struct("<8sII")
+# key fingerprint (0 = empty), tokens, last update (monotonic seconds)
+SLOT = struct.Struct("<Qdd")
+
+DEFAULT_SHARED_PATH = "/dev/shm/search-server-ratelimit"
+DEFAULT_SHARED_SLOTS = 65536
+SET_SIZE = 8
+_THREAD_LOCKS = 64
+
+
+def _fingerprint(key: str) -> int:
+    """Get a non-zero 64-bit hash that is stable across processes."""
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little") or 1
+
+
+def _incompatible(path: str) -> ValueError:
+    """Build the error for a table file with a different layout."""
+    return ValueError(
+        f"Shared rate limit table {path} has an incompatible layout"
+    )
+
+
+class _SharedTable:
+    """A table file mapped once per process and shared by its limiters."""
+
+    def __init__(self, path: str, slots: int) -> None:
+        """
+        Open, initialize if needed, and map the backing file.
+
+        Args:
+            path: File backing the table
+            slots: Number of client slots, a multiple of SET_SIZE
+
+        Raises:
+            ValueError: If an existing table has a different layout
+        """
+        self.path = path
+        self.slots = slots
+        self.sets = slots // SET_SIZE
+        self.users = 0
+        self.thread_locks: List[threading.Lock] = [
+            threading.Lock() for _ in range(min(self.sets, _THREAD_LOCKS))
+        ]
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            self.map = self._open()
+        except Exception:
+            os.close(self.fd)
+            raise
+
+    def _open(self) -> mmap.mmap:
+        """Size, initialize and map the backing file."""
+        size = HEADER.size + self.slots * SLOT.size
+        # Whole-file lock so only one process initializes the table
+        fcntl.lockf(self.fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(self.fd).st_size == 0:
+                os.ftruncate(self.fd, size)
+                os.pwrite(
+                    self.fd,
+                    HEADER.pack(MAGIC, self.slots, SET_SIZE),
+                    0,
+                )
+            magic, slots, set_size = HEADER.unpack(
+                os.pread(self.fd, HEADER.size, 0)
+            )
+            if magic != MAGIC or slots != self.slots or set_size != SET_SIZE:
+                raise _incompatible(self.path)
+        finally:
+            fcntl.lockf(self.fd, fcntl.LOCK_UN)
+        return mmap.mmap(self.fd, size)
+
+
+# Open tables keyed by real path, so limiters created for a reload share
+# the descriptor (and its fcntl locks) with the ones they replace
+_tables: Dict[str, _SharedTable] = {}
+_tables_lock = threading.Lock()
+
+
+def _acquire_table(path: str, slots: int) -> _SharedTable:
+    """Get this process's table for a path, opening it on first use."""
+    key = os.path.realpath(path)
+    with _tables_lock:
+        table = _tables.get(key)
+        if table is None:
+            table = _tables[key] = _SharedTable(path, slots)
+        elif table.slots != slots:
+            raise _incompatible(path)
+        table.users += 1
+        return table
+
+
+def _release_table(table: _SharedTable) -> None:
+    """Drop a limiter's use of a table, closing it after the last one."""
+    with _tables_lock:
+        table.users -= 1
+        if table.users:
+            return
+        _tables.pop(os.path.realpath(table.path), None)
+    table.map.close()
+    os.close(table.fd)
+
+
+class SharedMemoryRateLimiter:
+    """Token bucket rate limiter whose state is shared between processes."""
+
+    def __init__(
+        self,
+        max_requests: int,
+        window_seconds: int,
+        path: str = DEFAULT_SHARED_PATH,
+        slots: int = DEFAULT_SHARED_SLOTS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Initialize rate limiter, creating the shared table if needed.
+
+        Args:
+            max_requests: Bucket capacity (burst size)
+            window_seconds: Time to refill an empty bucket completely
+            path: File backing the shared table
+            slots: Number of client slots (rounded up to a whole set)
+            clock: Time source shared by all processes; CLOCK_MONOTONIC is
+                system-wide on Linux
+
+        Raises:
+            ValueError: If an existing table has a different layout
+        """
+        self.max_requests = max_requests
+        self.window_seconds = window_seconds
+        self.refill_rate = max_requests / window_seconds
+        self.clock = clock
+        self.path = path
+        self.sets = max(1, -(-slots // SET_SIZE))
+        self.slots = self.sets * SET_SIZE
+        self.evictions = 0
+        # Evictions of clients whose bucket had not refilled
+        self.pressure_evictions = 0
+        self._table = _acquire_table(path, self.slots)
+        self._thread_locks = self._table.thread_locks
+        self._fd = self._table.fd
+        self._map = self._table.map
+
+    def _set_offset(self, index: int) -> int:
+        return HEADER.size + index * SET_SIZE * SLOT.size
+
+    def _lock_set(self, index: int) -> None:
+        fcntl.lockf(
+            self._fd,
+            fcntl.LOCK_EX,
+            SET_SIZE * SLOT.size,
+            self._set_offset(index),
+        )
+
+    def _unlock_set(self, index: int) -> None:
+        fcntl.lockf(
+            self._fd,
+            fcntl.LOCK_UN,
+            SET_SIZE * SLOT.size,
+            self._set_offset(index),
+        )
+
+    def _update(self, ip_address: str, cost: float, force: bool) -> bool:
+        """
+        Refill a client's bucket and try to spend tokens from it.
+
+        Args:
+            ip_address: IP address (or other identity) of the client
+            cost: Tokens to spend
+            force: Spend even if the bucket runs into debt (down to minus
+                its capacity)
+
+        Returns:
+            bool: True if the tokens were available
+        """
+        key = _fingerprint(ip_address)
+        index = key % self.sets
+        base = self._set_offset(index)
+
+        with self._thread_locks[index % len(self._thread_locks)]:
+            self._lock_set(index)
+            try:
+                now = self.clock()
+                target = None
+                empty = None
+                idle = None
+                stalest = None
+                stalest_time = float("inf")
+                for offset in range(base, base + SET_SIZE * SLOT.size,
+                                    SLOT.size):
+                    slot_key, tokens, updated = SLOT.unpack_from(
+                        self._map, offset
+                    )
+                    if slot_key == key:
+                        target = offset
+                        tokens = min(
+                            self.max_requests,
+                            tokens + (now - updated) * self.refill_rate,
+                        )
+                        break
+                    if slot_key == 0:
+                        if empty is None:
+                            empty = offset
+                        continue
+                    if idle is None and (
+                        tokens + (now - updated) * self.refill_rate
+                        >= self.max_requests
+                    ):
+                        idle = offset
+                    if updated < stalest_time:
+                        stalest, stalest_time = offset, updated
+
+                if target is None:
+                    # New client: take an empty slot, one whose bucket has
+                    # refilled, or as a last resort the stalest one
+                    if empty is not None:
+                        target = empty
+                    elif idle is not None:
+                        target = idle
+                        self.evictions += 1
+                    else:
+                        target = stalest
+                        self.evictions += 1
+                        self.pressure_evictions += 1
+                    tokens = float(self.max_requests)
+
+                allowed = tokens >= cost
+                if force:
+                    tokens = max(-self.max_requests, tokens - cost)
+                elif allowed:
+                    tokens -= cost
+                SLOT.pack_into(self._map, target, key, tokens, now)
+                return allowed
+            finally:
+                self._unlock_set(index)
+
+    def check_rate_limit(self, ip_address: str, cost: float = 1.0) -> bool:
+        """
+        Check if a request from an IP address is allowed.
+
+        Args:
+            ip_address: IP address (or other identity) of the client
+            cost: Tokens the request consumes
+
+        Returns:
+            bool: True if request is allowed, False if rate limit exceeded
+        """
+        return self._update(ip_address, cost, force=False)
+
+    def charge(self, ip_address: str, cost: float) -> None:
+        """
+        Consume tokens after the fact, e.g. for measured execution time.
+
+        Args:
+            ip_address: IP address (or other identity) of the client
+            cost: Tokens to consume
+        """
+        self._update(ip_address, cost, force=True)
+
+    @property
+    def tracked_clients(self) -> int:
+        """Get the number of occupied slots in the shared table."""
+        data = self._map[HEADER.size:]
+        return sum(1 for key, _, _ in SLOT.iter_unpack(data) if key)
+
+    def cleanup(self) -> None:
+        """Free slots whose buckets have refilled completely."""
+        empty = SLOT.pack(0, 0.0, 0.0)
+        for index in range(self.sets):
+            base = self._set_offset(index)
+            with self._thread_locks[index % len(self._thread_locks)]:
+                self._lock_set(index)
+                try:
+                    now = self.clock()
+                    for offset in range(base, base + SET_SIZE * SLOT.size,
+                                        SLOT.size):
+                        key, tokens, updated = SLOT.unpack_from(
+                            self._map, offset
+                        )
+                        refilled = tokens + (now - updated) * self.refill_rate
+                        if key and refilled >= self.max_requests:
+                            self._map[offset:offset + SLOT.size] = empty
+                finally:
+                    self._unlock_set(index)
+
+    def close(self) -> None:
+        """Release the table; the last limiter on it unmaps and closes it."""
+        if self._table is not None:
+            table, self._table = self._table, None
+            _release_table(table)
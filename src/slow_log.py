@@ -0,0 +1,113 @@
+"""
+Slow-query log module.
+
+Requests slower than a threshold are captured with their full stage
+breakdown, so the queries behind high percentiles can be examined. The
+most recent captures are kept in a fixed-size ring buffer (read through
+the slowlog admin command). They can also be appended to a dedicated
+JSON-lines file.
+"""
+
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from access_log import JsonLinesWriter
+
+DEFAULT_SLOW_QUERY_THRESHOLD = 0.1
+DEFAULT_SLOW_QUERY_CAPACITY = 128
+
+# Request stages reported in the breakdown, in pipeline order
+STAGES = (
+    "tls", "queue_wait", "recv", "parse", "rate_limit", "search", "send",
+)
+
+
+class SlowQueryLog:
+    """Capture requests that exceed a latency threshold."""
+
+    def __init__(
+        self,
+        threshold: float = DEFAULT_SLOW_QUERY_THRESHOLD,
+        capacity: int = DEFAULT_SLOW_QUERY_CAPACITY,
+        path: Optional[str] = None,
+        include_query: bool = False,
+    ) -> None:
+        """
+        Initialize slow-query log.
+
+        Args:
+            threshold: Requests taking at least this many seconds are
+                captured
+            capacity: Number of captures kept in memory
+            path: Optional JSON-lines file captures are also written to
+            include_query: Store the query text, not only its hash and
+                length
+        """
+        self.threshold = threshold
+        self.include_query = include_query
+        self.captured = 0
+        self._entries: Deque[Dict[str, Any]] = deque(maxlen=capacity)
+        self._writer = JsonLinesWriter(path) if path else None
+
+    def start(self) -> None:
+        """Start the file writer, if any."""
+        if self._writer:
+            self._writer.start()
+
+    def stop(self) -> None:
+        """Flush and stop the file writer, if any."""
+        if self._writer:
+            self._writer.stop()
+
+    def record(
+        self, request: Dict[str, Any], query: Optional[str] = None
+    ) -> bool:
+        """
+        Capture a request if it was slow.
+
+        Args:
+            request: Per-request record built by the server (result,
+                duration, stage timings, algorithm, client, ...)
+            query: Query text, stored only if include_query is set
+
+        Returns:
+            bool: True if the request was captured
+        """
+        duration = request["duration"]
+        if duration < self.threshold:
+            return False
+
+        entry = {
+            key: value for key, value in request.items()
+            if key not in STAGES
+        }
+        entry["stages"] = {
+            stage: request[stage] for stage in STAGES if stage in request
+        }
+        entry.setdefault("ts", time.time())
+        if self.include_query and query is not None:
+            entry["query"] = query
+        self._entries.append(entry)
+        self.captured += 1
+        if self._writer:
+            self._writer.write(entry)
+        return True
+
+    def entries(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Get captured requests, newest first.
+
+        Args:
+            limit: Maximum number of entries to return
+
+        Returns:
+            Captured request records
+        """
+        entries = list(self._entries)
+        entries.reverse()
+        return entries[:limit] if limit is not None else entries
+
+    def clear(self) -> None:
+        """Drop every captured request from the ring buffer."""
+        self._entries.clear()
@@ -2,24 +2,74 @@
 Utility functions module.
 """
 
+import atexit
 import logging
+import logging.handlers
+import queue
 import socket
-from typing import Tuple
+from typing import Optional, Tuple, Union
 
+DEFAULT_LOG_QUEUE_SIZE = 10000
 
-def setup_logging() -> logging.Logger:
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that drops records instead of blocking when full."""
+
+    def __init__(self, log_queue: queue.Queue) -> None:
+        """
+        Initialize handler.
+
+        Args:
+            log_queue: Bounded queue drained by a QueueListener
+        """
+        super().__init__(log_queue)
+        self.dropped = 0
+        self.listener: Optional[logging.handlers.QueueListener] = None
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """Queue records as they are; the listener thread formats them."""
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        """Queue a record, counting it as dropped if the queue is full."""
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # handle() holds the handler lock, so this is not racy
+            self.dropped += 1
+
+
+def setup_logging(
+    level: Union[int, str] = logging.DEBUG,
+    queue_size: int = DEFAULT_LOG_QUEUE_SIZE,
+) -> logging.Logger:
     """
     Set up logging configuration.
 
+    Request threads only put records on a bounded queue; a background
+    QueueListener formats them and writes them to stderr. When the queue
+    is full, records are dropped and counted rather than blocking the
+    caller. Calling this again only updates the level, so handlers never
+    stack up.
+
+    Args:
+        level: Logger level (number or name such as "INFO")
+        queue_size: Maximum number of records waiting to be written; the
+            size set by the first call is kept
+
     Returns:
         Configured logger instance
     """
     logger = logging.getLogger("search_server")
-    logger.setLevel(logging.DEBUG)
-
-    # Create console handler
+    logger.setLevel(level.upper() if isinstance(level, str) else level)
+    if any(
+        isinstance(handler, logging.handlers.QueueHandler)
+        for handler in logger.handlers
+    ):
+        return logger
+
+    # Create console handler, run by the listener thread
     handler = logging.StreamHandler()
-    handler.setLevel(logging.DEBUG)
 
     # Create formatter
     formatter = logging.Formatter(
@@ -27,12 +77,26 @@ def setup_logging() -> logging.Logger:
     )
     handler.setFormatter(formatter)
 
+    queue_handler = DroppingQueueHandler(queue.Queue(maxsize=queue_size))
+    queue_handler.listener = logging.handlers.QueueListener(
+        queue_handler.queue, handler
+    )
+    queue_handler.listener.start()
+    # Flush queued records on interpreter exit
+    atexit.register(queue_handler.listener.stop)
+
     # Add handler to logger
-    logger.addHandler(handler)
+    logger.addHandler(queue_handler)
 
     return logger
 
 
+def dropped_log_records() -> int:
+    """Get the number of log records dropped because the queue was full."""
+    logger = logging.getLogger("search_server")
+    return sum(getattr(handler, "dropped", 0) for handler in logger.handlers)
+
+
 def get_client_info(client_socket: socket.socket) -> Tuple[str, int]:
     """
     Get client IP address and port.
@@ -47,6 +111,43 @@ def get_client_info(client_socket: socket.socket) -> Tuple[str, int]:
     return client_address[0], client_address[1]
 
 
+class DebugMessage:
+    """
+    Per-query debug log message, formatted only when it is emitted.
+
+    Passing an instance as the log message defers building the string to
+    the handler (the log listener thread), and skips it entirely when the
+    record is filtered out.
+    """
+
+    __slots__ = ("query", "ip_address", "execution_time", "found")
+
+    def __init__(
+        self, query: str, ip_address: str, execution_time: float, found: bool
+    ) -> None:
+        """
+        Initialize message.
+
+        Args:
+            query: Search query
+            ip_address: Client IP address
+            execution_time: Query execution time in milliseconds
+            found: Whether the string was found
+        """
+        self.query = query
+        self.ip_address = ip_address
+        self.execution_time = execution_time
+        self.found = found
+
+    def __str__(self) -> str:
+        return (
+            f"DEBUG: Query='{self.query}' "
+            f"IP={self.ip_address} "
+            f"Time={self.execution_time:.2f}ms "
+            f"Result={'STRING EXISTS' if self.found else 'STRING NOT FOUND'}"
+        )
+
+
 def format_debug_message(
     query: str, ip_address: str, execution_time: float, found: bool
 ) -> str:
@@ -62,9 +163,4 @@ def format_debug_message(
     Returns:
         Formatted debug message
     """
-    return (
-        f"DEBUG: Query='{query}' "
-        f"IP={ip_address} "
-        f"Time={execution_time:.2f}ms "
-        f"Result={'STRING EXISTS' if found else 'STRING NOT FOUND'}"
-    )
+    return str(DebugMessage(query, ip_address, execution_time, found))
@@ -0,0 +1,123 @@
+"""
+Tests for the structured access log.
+"""
+
+import json
+import threading
+import time
+
+import pytest
+
+from src.access_log import AccessLog, query_hash
+from src.client import SearchClient
+from src.server import SearchServer
+
+
+@pytest.fixture
+def test_file(tmp_path):
+    """Create a temporary test file."""
+    file_path = tmp_path / "test.txt"
+    file_path.write_text("line1\nline2\ntest string\n")
+    return str(file_path)
+
+
+def read_records(path):
+    """Parse every JSON line in an access log."""
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_sampling_keeps_slow_and_failed_requests(tmp_path):
+    """Test that sampling never drops slow or failed requests."""
+    access_log = AccessLog(
+        str(tmp_path / "access.log"),
+        sample_rate=0.5,
+        slow_threshold=0.1,
+        rng=lambda: 0.9,
+    )
+    assert access_log.should_log("found", 0.01) is False
+    assert access_log.should_log("found", 0.2) is True
+    assert access_log.should_log("error", 0.01) is True
+    assert access_log.should_log("invalid", 0.01) is True
+
+    access_log.rng = lambda: 0.1
+    assert access_log.should_log("found", 0.01) is True
+
+    access_log.sample_rate = 0.0
+    assert access_log.should_log("found", 0.01) is False
+
+
+def test_access_log_writes_json_lines(tmp_path):
+    """Test that kept records are written as JSON lines."""
+    path = tmp_path / "access.log"
+    access_log = AccessLog(str(path), sample_rate=1.0)
+    access_log.start()
+    assert access_log.log({"result": "found", "duration": 0.001}) is True
+    access_log.stop()
+
+    records = read_records(path)
+    assert len(records) == 1
+    assert records[0]["result"] == "found"
+    assert "ts" in records[0]
+
+
+def test_access_log_rotates(tmp_path):
+    """Test that the access log file is rotated by size."""
+    path = tmp_path / "access.log"
+    access_log = AccessLog(
+        str(path), sample_rate=1.0, max_bytes=200, backup_count=2
+    )
+    access_log.start()
+    for i in range(20):
+        access_log.log({"result": "found", "duration": 0.0, "i": i})
+    access_log.stop()
+
+    assert (tmp_path / "access.log.1").exists()
+    assert path.stat().st_size <= 200
+
+
+def test_server_access_log(tmp_path, test_file):
+    """Test that the server records per-request fields."""
+    log_path = tmp_path / "access.log"
+    config_path = tmp_path / "config.ini"
+    config_path.write_text(
+        f"""
+[server]
+port = 0
+ssl_enabled = true
+reread_on_query = false
+
+[file]
+linuxpath = {test_file}
+
+[rate_limit]
+max_requests_per_minute = 100
+window_seconds = 60
+
+[access_log]
+path = {log_path}
+sample_rate = 1.0
+"""
+    )
+    server = SearchServer(str(config_path))
+    server_thread = threading.Thread(target=server.start)
+    server_thread.daemon = True
+    server_thread.start()
+    time.sleep(0.1)  # Give server time to start
+
+    try:
+        client = SearchClient(port=server.port)
+        assert client.search("test string", algorithm="kmp")[0] is True
+    finally:
+        server.stop()
+        server_thread.join(timeout=1)
+
+    (record,) = read_records(log_path)
+    assert record["result"] == "found"
+    assert record["algorithm"] == "kmp"
+    assert record["client"] == "127.0.0.1"
+    assert record["query_hash"] == query_hash("test string")
+    assert record["bytes_out"] == len(b"STRING EXISTS\n")
+    assert record["bytes_in"] > 0
+    for stage in ("tls", "queue_wait", "search", "duration"):
+        assert record[stage] >= 0
@@ -0,0 +1,263 @@
+"""
+Tests for the asyncio client.
+"""
+
+import asyncio
+import io
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+from src.async_client import AsyncSearchClient
+from src.client import main
+from src.server import SearchServer
+
+
+@pytest.fixture
+def test_file(tmp_path):
+    """Create a temporary test file."""
+    file_path = tmp_path / "test.txt"
+    file_path.write_text("line1\nline2\ntest string\nhello world\n")
+    return str(file_path)
+
+
+def make_server(tmp_path, test_file, extra=""):
+    """Start a TLS server in a background thread."""
+    config_path = tmp_path / "config.ini"
+    config_path.write_text(
+        f"""
+[server]
+port = 0
+ssl_enabled = true
+reread_on_query = false
+{extra}
+
+[file]
+linuxpath = {test_file}
+
+[rate_limit]
+max_requests_per_minute = 10000
+window_seconds = 60
+"""
+    )
+    server = SearchServer(str(config_path))
+    server_thread = threading.Thread(target=server.start)
+    server_thread.daemon = True
+    server_thread.start()
+    time.sleep(0.1)  # Give server time to start
+    return server, server_thread
+
+
+def test_search_many_pipelines(tmp_path, test_file):
+    """Test that many searches share a few pipelined connections."""
+    server, server_thread = make_server(tmp_path, test_file)
+    queries = ["test string", "missing", "hello world"] * 100
+
+    async def run():
+        async with AsyncSearchClient(
+            port=server.port, connections=2, max_concurrency=50
+        ) as client:
+            results = await client.search_many(queries)
+            assert client.transport == "tls"
+            return results
+
+    try:
+        results = asyncio.run(run())
+        assert [found for found, _ in results] == [True, False, True] * 100
+
+        handshakes = server.metrics.get("search_tls_handshakes_total")
+        assert handshakes.value("true") + handshakes.value("false") <= 2
+        reused = server.metrics.get("search_keepalive_requests_total")
+        assert reused.value() >= 298
+    finally:
+        server.stop()
+        server_thread.join(timeout=1)
+
+
+def test_timeout_and_cancellation_keep_order(tmp_path, test_file):
+    """Test that abandoned requests do not shift later responses."""
+    server, server_thread = make_server(tmp_path, test_file)
+    search = server.searcher.search
+
+    def slow_search(query, *args, **kwargs):
+        if query == "__SLOW__":
+            time.sleep(0.3)
+        return search(query, *args, **kwargs)
+
+    server.searcher.search = slow_search
+
+    async def run():
+        async with AsyncSearchClient(
+            port=server.port, connections=1
+        ) as client:
+            assert (await client.search("test string"))[0] is True
+
+            client.timeout = 0.1
+            with pytest.raises(TimeoutError):
+                await client.search("__SLOW__")
+            client.timeout = None
+
+            task = asyncio.ensure_future(client.search("__SLOW__"))
+            await asyncio.sleep(0.05)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+            # Both abandoned responses are skipped, not handed to these
+            assert (await client.search("missing"))[0] is False
+            assert (await client.search("hello world"))[0] is True
+            assert len(client._connections) == 1
+
+    try:
+        asyncio.run(run())
+    finally:
+        server.stop()
+        server_thread.join(timeout=1)
+
+
+def test_connection_retired_and_commands(tmp_path, test_file):
+    """Test retiring connections at the server's request limit."""
+    server, server_thread = make_server(
+        tmp_path, test_file, "keepalive_max_requests = 5"
+    )
+
+    async def run():
+        async with AsyncSearchClient(
+            port=server.port, connections=1, max_requests_per_connection=5
+        ) as client:
+            results = await client.search_many(["test string"] * 12)
+            assert all(found for found, _ in results)
+            assert await client.command("ping") == {"ok": True}
+            # Admin commands are only served over the Unix socket
+            with pytest.raises(ValueError, match="not accepted"):
+                await client.command("stats")
+
+    try:
+        asyncio.run(run())
+        handshakes = server.metrics.get("search_tls_handshakes_total")
+        assert handshakes.value("true") + handshakes.value("false") == 3
+    finally:
+        server.stop()
+        server_thread.join(timeout=1)
+
+
+def test_fallback_without_keepalive(tmp_path, test_file):
+    """Test one connection per request when keep-alive is refused."""
+    server, server_thread = make_server(
+        tmp_path, test_file, "keepalive_timeout = 0"
+    )
+
+    async def run():
+        async with AsyncSearchClient(
+            port=server.port, connections=1
+        ) as client:
+            results = await client.search_many(["test string", "missing"] * 5)
+            assert [found for found, _ in results] == [True, False] * 5
+            assert client.keepalive_refused is True
+
+    try:
+        asyncio.run(run())
+    finally:
+        server.stop()
+        server_thread.join(timeout=1)
+
+
+def test_search_stream_bounded_and_ordered(tmp_path, test_file):
+    """Test that the input is read no further ahead than the window."""
+    server, server_thread = make_server(tmp_path, test_file)
+    queries = ["test string", "missing", "hello world"] * 100
+    consumed = []
+
+    def lines():
+        for query in queries:
+            consumed.append(query)
+            yield query
+
+    async def run():
+        results = []
+        async with AsyncSearchClient(port=server.port) as client:
+            async for query, result in client.search_stream(
+                lines(), window=8
+            ):
+                assert len(consumed) - len(results) <= 8
+                results.append((query, result))
+        return results
+
+    try:
+        results = asyncio.run(run())
+        assert [query for query, _ in results] == queries
+        assert [found for _, found in results] == [True, False, True] * 100
+    finally:
+        server.stop()
+        server_thread.join(timeout=1)
+
+
+def test_bulk_cli(tmp_path, test_file, monkeypatch, capsys):
+    """Test streaming queries from stdin through the client CLI."""
+    server, server_thread = make_server(tmp_path, test_file)
+    monkeypatch.setattr(
+        sys, "argv",
+        ["client.py", "--port", str(server.port), "--input", "-",
+         "--window", "4"],
+    )
+    monkeypatch.setattr(
+        sys, "stdin", io.StringIO("hello world\nmissing\n\nline1\r\n" * 3)
+    )
+
+    try:
+        main()
+        lines = capsys.readouterr().out.splitlines()
+        assert lines == [
+            "hello world\tfound", "missing\tnot_found", "line1\tfound"
+        ] * 3
+    finally:
+        server.stop()
+        server_thread.join(timeout=1)
+
+
+def test_bulk_cli_streams_paused_input(tmp_path, test_file, monkeypatch):
+    """Test that results are written while a piped producer pauses."""
+    server, server_thread = make_server(tmp_path, test_file)
+    read_fd, write_fd = os.pipe()
+    writes = []
+
+    class Output:
+        def write(self, text):
+            writes.append((time.monotonic(), text))
+
+        def flush(self):
+            pass
+
+    def produce():
+        with os.fdopen(write_fd, "w") as pipe:
+            pipe.write("hello world\nmissing\nline1\n")
+            pipe.flush()
+            time.sleep(1.0)
+            pipe.write("line2\n")
+
+    monkeypatch.setattr(
+        sys, "argv",
+        ["client.py", "--port", str(server.port), "--input", "-"],
+    )
+    monkeypatch.setattr(sys, "stdin", os.fdopen(read_fd))
+    monkeypatch.setattr(sys, "stdout", Output())
+    producer = threading.Thread(target=produce)
+
+    try:
+        start = time.monotonic()
+        producer.start()
+        main()
+        producer.join()
+        assert [text for _, text in writes] == [
+            "hello world\tfound\n", "missing\tnot_found\n", "line1\tfound\n",
+            "line2\tfound\n",
+        ]
+        assert all(when - start < 0.8 for when, _ in writes[:3])
+        assert writes[3][0] - start >= 1.0
+    finally:
+        sys.stdin.close()
+        server.stop()
+        server_thread.join(timeout=1)
@@ -0,0 +1,179 @@
+"""
+Tests for the benchmark suite.
+"""
+
+import copy
+import json
+
+import pytest
+
+from src.benchmark import (
+    MISS_SUFFIX,
+    SCHEMA_VERSION,
+    CorpusSpec,
+    compare,
+    generate_corpus,
+    main,
+    make_queries,
+    measure,
+    run,
+    run_limiters,
+    summarize,
+)
+
+
+def test_corpus_is_reproducible():
+    """Test that a spec always generates the same corpus."""
+    spec = CorpusSpec(lines=500, seed=7)
+    assert generate_corpus(spec) == generate_corpus(spec)
+    assert generate_corpus(spec) != generate_corpus(spec._replace(seed=8))
+
+
+def test_corpus_parameters():
+    """Test line length, duplicate and Unicode parameters."""
+    lines = generate_corpus(CorpusSpec(lines=1000, min_length=5,
+                                       max_length=8))
+    assert len(lines) == 1000
+    assert all(5 <= len(line) <= 8 for line in lines)
+    assert all(line.isascii() for line in lines)
+
+    lines = generate_corpus(CorpusSpec(lines=1000, duplicate_ratio=0.5))
+    assert 400 < 1000 - len(set(lines)) < 600
+
+    lines = generate_corpus(CorpusSpec(lines=1000, unicode_ratio=1.0))
+    assert not any(line.isascii() for line in lines)
+
+    with pytest.raises(ValueError):
+        generate_corpus(CorpusSpec(duplicate_ratio=2.0))
+    with pytest.raises(ValueError):
+        generate_corpus(CorpusSpec(min_length=10, max_length=5))
+
+
+def test_make_queries():
+    """Test the share of queries found in the corpus."""
+    lines = generate_corpus(CorpusSpec(lines=100))
+    queries = make_queries(lines, 40, 0.25, seed=1)
+    assert queries == make_queries(lines, 40, 0.25, seed=1)
+    assert sum(query in lines for query in queries) == 10
+    assert sum(query.endswith(MISS_SUFFIX) for query in queries) == 30
+
+
+def test_measure_and_summarize():
+    """Test warmup calls, trial count and statistics."""
+    calls = []
+    samples = measure(lambda: calls.append(1), trials=4, warmup=2)
+    assert len(calls) == 6
+    assert len(samples) == 4 and all(s >= 0 for s in samples)
+
+    stats = summarize([1.0, 2.0, 3.0, 10.0])
+    assert stats["min"] == 1.0 and stats["max"] == 10.0
+    assert stats["median"] == 2.5
+    assert stats["mean"] == 4.0
+    assert stats["stdev"] == pytest.approx(4.0826, rel=1e-3)
+    assert summarize([5.0])["stdev"] == 0.0
+
+
+def test_run_report():
+    """Test a small run and its JSON-ready report."""
+    report = run(["small"], ["linear", "binary"], trials=2, warmup=0,
+                 queries=10, seed=3)
+    assert report["schema"] == SCHEMA_VERSION
+    assert report["settings"]["seed"] == 3
+    assert set(report["results"]) == {"small/linear", "small/binary"}
+    result = report["results"]["small/binary"]
+    assert result["corpus"]["lines"] == 1000
+    assert result["corpus"]["seed"] == 3
+    assert len(result["samples"]) == 2
+    assert result["stats"]["median"] > 0
+    assert json.loads(json.dumps(report)) == report
+
+    with pytest.raises(ValueError):
+        run(["huge"])
+
+
+def fake_report(**medians):
+    """Build a report with three trials per benchmark around a median."""
+    results = {}
+    for key, median in medians.items():
+        samples = [median * 0.98, median, median * 1.02]
+        results[key.replace("__", "/")] = {
+            "samples": samples, "stats": summarize(samples)
+        }
+    return {"schema": SCHEMA_VERSION, "environment": {}, "results": results}
+
+
+def test_compare_flags_regressions():
+    """Test regression, improvement, noise, new and missing benchmarks."""
+    baseline = fake_report(a__linear=100.0, a__binary=10.0, a__kmp=50.0,
+                           b__linear=80.0)
+    current = fake_report(a__linear=130.0, a__binary=5.0, a__kmp=53.0,
+                          c__linear=1.0)
+    # A wide spread is noise even though the median moved
+    noisy = current["results"]["a/kmp"]
+    noisy["stats"] = summarize([40.0, 60.0, 70.0])
+
+    statuses = {c.key: c.status for c in compare(baseline, current)}
+    assert statuses == {
+        "a/linear": "regression",
+        "a/binary": "improvement",
+        "a/kmp": "unchanged",
+        "b/linear": "missing",
+        "c/linear": "new",
+    }
+    assert compare(baseline, current, threshold=0.5)[2].status == "unchanged"
+
+
+def test_main_compare_exit_status(tmp_path, capsys):
+    """Test that compare exits non-zero on a regression."""
+    baseline = fake_report(a__linear=100.0)
+    faster = copy.deepcopy(baseline)
+    slower = fake_report(a__linear=200.0)
+    paths = {}
+    for name, report in (("base", baseline), ("fast", faster),
+                         ("slow", slower)):
+        paths[name] = tmp_path / f"{name}.json"
+        paths[name].write_text(json.dumps(report))
+
+    main(["compare", str(paths["base"]), str(paths["fast"])])
+    assert "unchanged" in capsys.readouterr().out
+
+    with pytest.raises(SystemExit) as exc:
+        main(["compare", str(paths["base"]), str(paths["slow"]), "--json"])
+    assert exc.value.code == 1
+    data = json.loads(capsys.readouterr().out)
+    assert data[0]["status"] == "regression"
+    assert data[0]["change"] == pytest.approx(1.0)
+
+    paths["bad"] = tmp_path / "bad.json"
+    paths["bad"].write_text("[]")
+    with pytest.raises(SystemExit) as exc:
+        main(["compare", str(paths["bad"]), str(paths["fast"])])
+    assert exc.value.code == 2
+
+
+def test_main_run_output(tmp_path, capsys):
+    """Test the run command writing a JSON report."""
+    output = tmp_path / "baseline.json"
+    main(["run", "-s", "small", "-a", "binary", "-n", "2", "-w", "0",
+          "-q", "5", "--output", str(output)])
+    assert "small/binary" in capsys.readouterr().out
+    assert "small/binary" in json.loads(output.read_text())["results"]
+
+
+def test_run_limiters_report(capsys):
+    """Test the limiters command reporting checks per second as JSON."""
+    report = run_limiters(
+        shards=(1, 4), threads=(1, 2), clients_per_thread=3,
+        checks_per_client=5,
+    )
+    assert report["schema"] == SCHEMA_VERSION
+    assert len(report["results"]) == 8
+    result = report["results"]["token_bucket/shards=4/threads=2"]
+    assert result["checks"] == 2 * 3 * 5
+    assert result["checks_per_second"] > 0
+
+    main(["limiters", "--shards", "2", "--threads", "2", "--json"])
+    printed = json.loads(capsys.readouterr().out)
+    assert set(printed["results"]) == {
+        "sliding_log/shards=2/threads=2", "token_bucket/shards=2/threads=2",
+    }
@@ -3,10 +3,14 @@ Tests for client functionality.
 """
 
 # import socket
+import os
+import shutil
+import socket
+import stat
 import threading
 import time
 import pytest
-from src.client import SearchClient
+from src.client import SearchClient, get_client_ssl_context
 from src.server import SearchServer
 from src.search import SearchAlgorithm
 
@@ -178,6 +182,94 @@ def test_client_rate_limiting(server_config, client_config, test_file):
         server_thread.join(timeout=1)
 
 
+def test_connection_admission_limit(tmp_path, test_file):
+    """Test that throttled clients are rejected before the TLS handshake."""
+    config_path = tmp_path / "admission.ini"
+    config_path.write_text(
+        f"""
+[server]
+port = 0
+ssl_enabled = true
+reread_on_query = false
+
+[file]
+linuxpath = {test_file}
+
+[rate_limit]
+max_requests_per_minute = 100
+window_seconds = 60
+max_connections_per_minute = 3
+"""
+    )
+    server = SearchServer(str(config_path))
+    server_thread = threading.Thread(target=server.start)
+    server_thread.daemon = True
+    server_thread.start()
+    time.sleep(0.1)  # Give server time to start
+
+    try:
+        client = SearchClient(port=server.port)
+        for _ in range(3):
+            assert client.search("test string")[0] is True
+        with pytest.raises((ConnectionError, RuntimeError)):
+            client.search("test string")
+
+        rejected = server.metrics.get("search_connections_rejected_total")
+        assert rejected.value("rate_limited") >= 1
+        # No handshake was performed for the rejected connections
+        handshakes = server.metrics.get("search_tls_handshakes_total")
+        assert handshakes.value("true") + handshakes.value("false") == 3
+    finally:
+        server.stop()
+        server_thread.join(timeout=1)
+
+
+def test_concurrent_connection_cap(tmp_path, test_file):
+    """Test the per-client cap on simultaneously open connections."""
+    config_path = tmp_path / "concurrency.ini"
+    config_path.write_text(
+        f"""
+[server]
+port = 0
+ssl_enabled = true
+reread_on_query = false
+
+[file]
+linuxpath = {test_file}
+
+[rate_limit]
+max_requests_per_minute = 100
+window_seconds = 60
+max_connections_per_client = 1
+"""
+    )
+    server = SearchServer(str(config_path))
+    server_thread = threading.Thread(target=server.start)
+    server_thread.daemon = True
+    server_thread.start()
+    time.sleep(0.1)  # Give server time to start
+
+    try:
+        # An idle connection holds the client's only slot
+        idle = socket.create_connection(("localhost", server.port))
+        time.sleep(0.1)
+        client = SearchClient(port=server.port)
+        with pytest.raises((ConnectionError, RuntimeError)):
+            client.search("test string")
+        rejected = server.metrics.get("search_connections_rejected_total")
+        assert rejected.value("too_many_connections") >= 1
+
+        # Closing it frees the slot
+        idle.close()
+        time.sleep(0.2)
+        assert client.search("test string")[0] is True
+        time.sleep(0.1)  # The worker releases the slot after replying
+        assert server.connection_limiter.tracked_clients == 0
+    finally:
+        server.stop()
+        server_thread.join(timeout=1)
+
+
 def test_client_connection_error():
     """Test client connection error handling."""
     client = SearchClient(port=99999)  # Invalid port
@@ -194,6 +286,17 @@ def test_client_timeout(server_config, client_config, test_file):
     server_thread.start()
     time.sleep(0.1)  # Give server time to start
 
+    # Make "__SLOW__" queries take far longer than the client timeout so the
+    # test does not depend on how fast the handshake happens to be
+    search = server.searcher.search
+
+    def slow_search(query, *args, **kwargs):
+        if query == "__SLOW__":
+            time.sleep(0.2)
+        return search(query, *args, **kwargs)
+
+    server.searcher.search = slow_search
+
     try:
         # Create client with short timeout
         client = SearchClient(
@@ -206,3 +309,342 @@ def test_client_timeout(server_config, client_config, test_file):
     finally:
         server.stop()
         server_thread.join(timeout=1)
+
+
+def test_client_unix_socket(tmp_path, test_file):
+    """Test searching over the Unix domain socket listener."""
+    socket_path = tmp_path / "search.sock"
+    config_path = tmp_path / "unix_config.ini"
+    config_path.write_text(
+        f"""
+[server]
+port = 0
+ssl_enabled = true
+reread_on_query = false
+unix_socket_path = {socket_path}
+unix_socket_mode = 600
+
+[file]
+linuxpath = {test_file}
+
+[rate_limit]
+max_requests_per_minute = 100
+window_seconds = 60
+"""
+    )
+    server = SearchServer(str(config_path))
+    server_thread = threading.Thread(target=server.start)
+    server_thread.daemon = True
+    server_thread.start()
+    time.sleep(0.1)  # Give server time to start
+
+    try:
+        assert stat.S_IMODE(os.stat(socket_path).st_mode) == 0o600
+
+        client = SearchClient(unix_socket=str(socket_path))
+        found, _ = client.search("test string")
+        assert found is True
+        found, _ = client.search("nonexistent")
+        assert found is False
+
+        # Peer credentials identify the client for rate limiting
+        assert f"uid:{os.getuid()}" in server.rate_limiter.requests
+    finally:
+        server.stop()
+        server_thread.join(timeout=1)
+
+    assert not socket_path.exists()
+
+
+def test_unix_socket_never_world_accessible(tmp_path, test_file, monkeypatch):
+    """Test that the socket file has no permissions until it is chmod'ed."""
+    socket_path = tmp_path / "search.sock"
+    config_path = tmp_path / "unix_config.ini"
+    config_path.write_text(
+        f"""
+[server]
+unix_socket_path = {socket_path}
+unix_socket_mode = 600
+
+[file]
+linuxpath = {test_file}
+"""
+    )
+    server = SearchServer(str(config_path))
+    modes = []
+    chmod = os.chmod
+
+    def recording_chmod(path, mode):
+        modes.append(stat.S_IMODE(os.stat(path).st_mode))
+        chmod(path, mode)
+
+    monkeypatch.setattr(os, "chmod", recording_chmod)
+    umask = os.umask(0o022)
+    try:
+        server._open_unix_socket(str(socket_path))
+        assert modes == [0]
+        assert stat.S_IMODE(os.stat(socket_path).st_mode) == 0o600
+        assert os.umask(0o022) == 0o022  # Restored
+    finally:
+        os.umask(umask)
+        server._close_unix_socket()
+        server._thread_pool.shutdown()
+        server._handshake_pool.shutdown()
+
+
+def test_client_keepalive_pool(server_config):
+    """Test that a pooled client reuses connections across threads."""
+    server = SearchServer(server_config)
+    server_thread = threading.Thread(target=server.start)
+    server_thread.daemon = True
+    server_thread.start()
+    time.sleep(0.1)  # Give server time to start
+
+    try:
+        client = SearchClient(port=server.port, keepalive=True, pool_size=2)
+        for _ in range(5):
+            assert client.search("test string")[0] is True
+        assert client.pool.idle == 1
+
+        results = []
+
+        def worker():
+            for _ in range(5):
+                results.append(client.search("nonexistent")[0])
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert results == [False] * 20
+        assert client.pool.idle <= 2
+
+        handshakes = server.metrics.get("search_tls_handshakes_total")
+        total = handshakes.value("true") + handshakes.value("false")
+        reused = server.metrics.get("search_keepalive_requests_total")
+        assert total + reused.value() == 25
+        assert reused.value() >= 15
+        client.close()
+        assert client.pool.idle == 0
+    finally:
+        server.stop()
+        server_thread.join(timeout=1)
+
+
+def test_client_keepalive_fallback(tmp_path, test_file):
+    """Test falling back to one-shot mode when keep-alive is refused."""
+    config_path = tmp_path / "no_keepalive.ini"
+    config_path.write_text(
+        f"""
+[server]
+port = 0
+ssl_enabled = true
+reread_on_query = false
+keepalive_timeout = 0
+
+[file]
+linuxpath = {test_file}
+
+[rate_limit]
+max_requests_per_minute = 100
+window_seconds = 60
+"""
+    )
+    server = SearchServer(str(config_path))
+    server_thread = threading.Thread(target=server.start)
+    server_thread.daemon = True
+    server_thread.start()
+    time.sleep(0.1)  # Give server time to start
+
+    try:
+        client = SearchClient(port=server.port, keepalive=True)
+        for _ in range(3):
+            assert client.search("test string")[0] is True
+        assert client.keepalive is False
+        assert client.pool.idle == 0
+    finally:
+        server.stop()
+        server_thread.join(timeout=1)
+
+
+def test_server_pipelined_requests(tmp_path, test_file):
+    """Test several newline-delimited requests sent in one write."""
+    config_path = tmp_path / "plain.ini"
+    config_path.write_text(
+        f"""
+[server]
+port = 0
+ssl_enabled = false
+reread_on_query = false
+
+[file]
+linuxpath = {test_file}
+
+[rate_limit]
+max_requests_per_minute = 100
+window_seconds = 60
+"""
+    )
+    server = SearchServer(str(config_path))
+    server_thread = threading.Thread(target=server.start)
+    server_thread.daemon = True
+    server_thread.start()
+    time.sleep(0.1)  # Give server time to start
+
+    idle = None
+    try:
+        sock = socket.create_connection(("localhost", server.port))
+        sock.sendall(
+            b'{"query": "test string", "keepalive": true}\n'
+            b'{"query": "nonexistent", "keepalive": true}\n'
+            b'{"query": "hello world"}\n'
+        )
+        received = b""
+        while True:
+            chunk = sock.recv(1024)
+            if not chunk:
+                break
+            received += chunk
+        sock.close()
+        # The last request did not ask for keep-alive, so the server
+        # closed the connection after answering it
+        assert received == (
+            b"STRING EXISTS\nSTRING NOT FOUND\nSTRING EXISTS\n"
+        )
+
+        # An idle kept-alive connection does not hold up shutdown
+        idle = socket.create_connection(("localhost", server.port))
+        idle.sendall(b'{"query": "test string", "keepalive": true}\n')
+        assert idle.recv(1024) == b"STRING EXISTS\n"
+    finally:
+        start = time.monotonic()
+        server.stop()
+        server_thread.join(timeout=1)
+        assert time.monotonic() - start < 2
+        if idle:
+            idle.close()
+
+
+def test_idle_keepalive_connections_free_workers(tmp_path, test_file):
+    """Test that idle kept-alive connections do not hold search workers."""
+    config_path = tmp_path / "plain.ini"
+    config_path.write_text(
+        f"""
+[server]
+port = 0
+ssl_enabled = false
+reread_on_query = false
+search_workers = 2
+keepalive_timeout = 0.5
+
+[file]
+linuxpath = {test_file}
+
+[rate_limit]
+max_requests_per_minute = 100
+window_seconds = 60
+"""
+    )
+    server = SearchServer(str(config_path))
+    server_thread = threading.Thread(target=server.start)
+    server_thread.daemon = True
+    server_thread.start()
+    time.sleep(0.1)  # Give server time to start
+
+    sockets = []
+    try:
+        # Two idle kept-alive connections, one per search worker
+        for _ in range(2):
+            sock = socket.create_connection(("localhost", server.port))
+            sock.sendall(b'{"query": "test string", "keepalive": true}\n')
+            assert sock.recv(1024) == b"STRING EXISTS\n"
+            sockets.append(sock)
+
+        start = time.monotonic()
+        client = SearchClient(port=server.port)
+        assert client.search("test string")[0] is True
+        assert time.monotonic() - start < 0.4
+
+        # A parked connection is served again when its request arrives
+        sockets[0].sendall(b'{"query": "missing", "keepalive": true}\n')
+        assert sockets[0].recv(1024) == b"STRING NOT FOUND\n"
+
+        # Trickling bytes does not extend the deadline for the request
+        trickle = sockets[1]
+        start = time.monotonic()
+        closed = False
+        for byte in b'{"query": "test string"}':
+            try:
+                trickle.sendall(bytes([byte]))
+            except OSError:
+                closed = True
+                break
+            time.sleep(0.05)
+        if not closed:
+            trickle.settimeout(2)
+            assert trickle.recv(1024) == b""
+        assert time.monotonic() - start < 1.5
+    finally:
+        server.stop()
+        server_thread.join(timeout=1)
+        for sock in sockets:
+            sock.close()
+
+
+def test_ssl_context_cached_per_certificates(tmp_path):
+    """Test that clients share one context until certificates change."""
+    first = get_client_ssl_context()
+    assert get_client_ssl_context("certs") is first
+
+    cert_dir = tmp_path / "certs"
+    shutil.copytree("certs", cert_dir)
+    copied = get_client_ssl_context(str(cert_dir))
+    assert copied is not first
+    assert get_client_ssl_context(str(cert_dir)) is copied
+
+    # Replacing a certificate loads a new context
+    key = cert_dir / "client.key"
+    stat_result = key.stat()
+    os.utime(key, ns=(stat_result.st_atime_ns, stat_result.st_mtime_ns + 1))
+    assert get_client_ssl_context(str(cert_dir)) is not copied
+
+
+def test_client_remembers_transport(tmp_path, test_file, capsys):
+    """Test that the TLS probe happens once, quietly, per client."""
+    config_path = tmp_path / "plain.ini"
+    config_path.write_text(
+        f"""
+[server]
+port = 0
+ssl_enabled = false
+reread_on_query = false
+
+[file]
+linuxpath = {test_file}
+
+[rate_limit]
+max_requests_per_minute = 100
+window_seconds = 60
+"""
+    )
+    server = SearchServer(str(config_path))
+    server_thread = threading.Thread(target=server.start)
+    server_thread.daemon = True
+    server_thread.start()
+    time.sleep(0.1)  # Give server time to start
+
+    try:
+        client = SearchClient(port=server.port)
+        for _ in range(3):
+            assert client.search("test string")[0] is True
+        assert client.transport == "tcp"
+
+        # Only the first connection sent a ClientHello
+        requests = server.metrics.get("search_requests_total")
+        assert requests.value("invalid", "none") == 1
+        assert requests.value("found", "linear") == 3
+        assert capsys.readouterr().out == ""
+    finally:
+        server.stop()
+        server_thread.join(timeout=1)
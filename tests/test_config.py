@@ -3,8 +3,15 @@ Tests for configuration handling.
 """
 
 # import os
+import os
+import signal
+import threading
+import time
+
 import pytest
+from src.client import SearchClient
 from src.config import Config
+from src.server import SearchServer
 
 
 @pytest.fixture
@@ -50,6 +57,7 @@ linuxpath = /test/path/file.txt
 
     assert config.ssl_enabled is False
     assert config.reread_on_query is False
+    assert config.rate_limit_algorithm == "sliding_log"
 
 
 def test_missing_file_path(tmp_path):
@@ -70,3 +78,182 @@ def test_invalid_config_file():
     """Test handling of invalid config file."""
     with pytest.raises(FileNotFoundError):
         Config("nonexistent.ini")
+
+
+def test_snapshot_is_immutable(config_file):
+    """Test that settings are parsed once into a read-only snapshot."""
+    config = Config(config_file)
+
+    assert config.snapshot.port == 44445
+    assert config.rate_limit_costs == {}
+    with pytest.raises(AttributeError):
+        config.snapshot.port = 1
+    with pytest.raises(AttributeError):
+        config.snapshot.__dict__
+
+
+def test_invalid_values_rejected(tmp_path):
+    """Test that invalid settings fail when the file is loaded."""
+    config_path = tmp_path / "config.ini"
+    for section, option in [
+        ("server", "port = 70000"),
+        ("server", "port = abc"),
+        ("logging", "level = LOUD"),
+        ("rate_limit", "algorithm = leaky"),
+        ("rate_limit", "window_seconds = 0"),
+        ("server", "port = 1\nport = 2"),
+        ("profiling", "seconds = 600"),
+        ("profiling", "seconds = 0"),
+        ("rate_limit", "cost_linear = 0"),
+        ("rate_limit", "cost_kmp = -1"),
+        ("rate_limit", "max_requests_per_minute = 5\ncost_linear = 6"),
+        ("rate_limit", "time_cost_seconds = -0.01"),
+        ("rate_limit", "backend = shared"),
+        ("rate_limit", "backend = shared\nalgorithm = sliding_log"),
+    ]:
+        config_path.write_text(f"[{section}]\n{option}\n")
+        with pytest.raises(ValueError):
+            Config(str(config_path))
+
+
+def test_reload_reports_changes(tmp_path, config_file):
+    """Test that reload swaps the snapshot and reports what changed."""
+    config = Config(config_file)
+    snapshot = config.snapshot
+    with open(config_file, "a") as f:
+        f.write("\n[rate_limit]\nmax_requests_per_minute = 5\n")
+
+    changes = config.reload()
+    assert changes == {"max_requests_per_minute": (100, 5)}
+    assert config.max_requests_per_minute == 5
+    assert snapshot.max_requests_per_minute == 100
+
+    with open(config_file, "a") as f:
+        f.write("window_seconds = -1\n")
+    with pytest.raises(ValueError):
+        config.reload()
+    assert config.max_requests_per_minute == 5
+    assert config.rate_limit_window == 60
+
+
+def test_sighup_applies_changes(tmp_path):
+    """Test reloading a running server's settings on SIGHUP."""
+    test_file = tmp_path / "test.txt"
+    test_file.write_text("line1\ntest string\n")
+    config_path = tmp_path / "config.ini"
+    settings = """
+[server]
+port = {port}
+ssl_enabled = true
+reread_on_query = false
+search_workers = {workers}
+
+[file]
+linuxpath = {test_file}
+
+[rate_limit]
+max_requests_per_minute = {limit}
+window_seconds = 60
+algorithm = token_bucket
+"""
+    config_path.write_text(
+        settings.format(port=0, workers=50, test_file=test_file, limit=100)
+    )
+    server = SearchServer(str(config_path))
+    previous_handler = signal.getsignal(signal.SIGHUP)
+    server.install_reload_handler()
+    server_thread = threading.Thread(target=server.start)
+    server_thread.daemon = True
+    server_thread.start()
+    time.sleep(0.1)  # Give server time to start
+
+    try:
+        client = SearchClient(port=server.port)
+        assert client.search("test string")[0] is True
+
+        config_path.write_text(
+            settings.format(port=1, workers=3, test_file=test_file, limit=2)
+        )
+        os.kill(os.getpid(), signal.SIGHUP)
+        for _ in range(50):
+            if server.config.max_requests_per_minute == 2:
+                break
+            time.sleep(0.02)
+        time.sleep(0.1)  # Let the reload thread finish applying
+
+        assert server.rate_limiter.max_requests == 2
+        assert server._thread_pool._max_workers == 3
+        # The listener keeps its port until a restart
+        assert server.port != 1
+
+        # Fresh quota of 2 under the new limit, served by the new pool
+        assert client.search("test string")[0] is True
+        assert client.search("line1")[0] is True
+        with pytest.raises(RuntimeError, match="RATE LIMIT"):
+            client.search("line1")
+
+        # An invalid file is rejected and the running settings are kept
+        config_path.write_text("[server]\nport = -1\n")
+        with pytest.raises(ValueError):
+            server.reload_config()
+        assert server.config.max_requests_per_minute == 2
+    finally:
+        signal.signal(signal.SIGHUP, previous_handler)
+        server.stop()
+        server_thread.join(timeout=1)
+
+
+def test_reload_keeps_corpus_and_quotas(tmp_path):
+    """Test that a bad corpus is rejected and tuning keeps quotas."""
+    corpus = tmp_path / "test.txt"
+    corpus.write_text("line1\ntest string\n")
+    config_path = tmp_path / "config.ini"
+    settings = """
+[file]
+linuxpath = {path}
+
+[rate_limit]
+max_requests_per_minute = 2
+window_seconds = 60
+algorithm = token_bucket
+cleanup_interval = {interval}
+{extra}
+"""
+    config_path.write_text(
+        settings.format(path=corpus, interval=60, extra="")
+    )
+    server = SearchServer(str(config_path))
+    searcher = server.searcher
+    limiter = server.rate_limiter
+    assert limiter.check_rate_limit("10.0.0.1", 2)
+
+    # Costs and the sweep interval apply without resetting quotas
+    config_path.write_text(
+        settings.format(path=corpus, interval=30, extra="cost_linear = 2")
+    )
+    changes = server.reload_config()
+    assert set(changes) == {"rate_limit_cleanup_interval", "rate_limit_costs"}
+    assert server.rate_limiter is limiter
+    assert not limiter.check_rate_limit("10.0.0.1")
+    assert server.cost_model.upfront("linear") == 2
+    assert server._rate_limit_sweeper.interval == 30
+
+    # A corpus that cannot be loaded keeps the running config and searcher
+    config_path.write_text(
+        settings.format(path=tmp_path / "missing.txt", interval=30, extra="")
+    )
+    with pytest.raises(ValueError, match="not loaded"):
+        server.reload_config()
+    assert server.searcher is searcher
+    assert server.config.file_path == str(corpus)
+    assert server.cost_model.upfront("linear") == 2
+
+    # Loading the new corpus is timed like any other corpus reload
+    reloads = server.metrics.get("search_corpus_reload_seconds")
+    assert reloads.count() == 0
+    other = tmp_path / "other.txt"
+    other.write_text("a\nb\nc\n")
+    config_path.write_text(settings.format(path=other, interval=30, extra=""))
+    server.reload_config()
+    assert server.searcher.line_count == 3
+    assert reloads.count() == 1
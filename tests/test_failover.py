@@ -0,0 +1,218 @@
+"""
+Tests for the multi-endpoint failover client.
+"""
+
+import socket
+import threading
+import time
+
+import pytest
+
+from src.failover import FailoverSearchClient, RetryBudget, parse_endpoint
+from src.server import SearchServer
+
+
+@pytest.fixture
+def test_file(tmp_path):
+    """Create a temporary test file."""
+    file_path = tmp_path / "test.txt"
+    file_path.write_text("line1\nline2\ntest string\n")
+    return str(file_path)
+
+
+@pytest.fixture
+def servers(tmp_path, test_file):
+    """Run two TLS servers (replicas) in background threads."""
+    started = []
+    for i in range(2):
+        config_path = tmp_path / f"config{i}.ini"
+        config_path.write_text(
+            f"""
+[server]
+port = 0
+ssl_enabled = true
+reread_on_query = false
+
+[file]
+linuxpath = {test_file}
+
+[rate_limit]
+max_requests_per_minute = 10000
+window_seconds = 60
+"""
+        )
+        server = SearchServer(str(config_path))
+        server_thread = threading.Thread(target=server.start)
+        server_thread.daemon = True
+        server_thread.start()
+        started.append((server, server_thread))
+    time.sleep(0.1)  # Give servers time to start
+    yield [server for server, _ in started]
+    for server, server_thread in started:
+        server.stop()
+        server_thread.join(timeout=1)
+
+
+def unused_port():
+    """Get a port nothing is listening on."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("localhost", 0))
+        return sock.getsockname()[1]
+
+
+def test_parse_endpoint():
+    """Test the endpoint forms accepted."""
+    assert parse_endpoint("db1:5000") == ("db1", 5000)
+    assert parse_endpoint("5000") == ("localhost", 5000)
+    assert parse_endpoint("db1") == ("db1", 44445)
+    assert parse_endpoint("[::1]:5000") == ("::1", 5000)
+    with pytest.raises(ValueError):
+        parse_endpoint("db1:http")
+
+
+def test_retry_budget():
+    """Test that retries are limited to a fraction of requests."""
+    budget = RetryBudget(ratio=0.5, reserve=2)
+    assert budget.withdraw() and budget.withdraw()
+    assert not budget.withdraw()
+    budget.deposit()
+    assert not budget.withdraw()
+    budget.deposit()
+    assert budget.withdraw()
+    for _ in range(10):
+        budget.deposit()
+    assert budget.tokens == 2
+
+
+def test_selection_strategies(servers):
+    """Test picking by latency average and by outstanding requests."""
+    with FailoverSearchClient(
+        [s.port for s in servers], health_interval=None
+    ) as client:
+        first, second = client.endpoints
+        first.ewma, second.ewma = 0.010, 0.002
+        assert client._select() is second
+        second.outstanding = 9
+        assert client._select() is first
+
+        client.strategy = "least_outstanding"
+        assert client._select() is first
+        first.healthy = False
+        assert client._select() is second
+        assert client._select(exclude=[second]) is first
+
+
+def test_failover_to_healthy_endpoint(servers):
+    """Test that a dead endpoint is skipped after its first failure."""
+    dead = unused_port()
+    with FailoverSearchClient(
+        [f"localhost:{dead}", f"localhost:{servers[0].port}"],
+        health_interval=None,
+    ) as client:
+        for _ in range(5):
+            assert client.search("test string")[0] is True
+        assert client.retries == 1
+
+        stats = client.stats()
+        assert stats[0]["healthy"] is False
+        assert stats[0]["failures"] == 1
+        assert stats[1]["requests"] == 5
+        assert stats[1]["ewma"] > 0
+
+
+def test_retry_budget_exhausted(servers):
+    """Test that failures surface once the retry budget is spent."""
+    with FailoverSearchClient(
+        [unused_port(), unused_port()],
+        retry_budget=RetryBudget(reserve=0),
+        health_interval=None,
+    ) as client:
+        with pytest.raises(ConnectionError):
+            client.search("test string")
+        assert client.retries == 0
+
+
+def test_health_check_restores_endpoint(servers):
+    """Test that the background health check brings endpoints back."""
+    with FailoverSearchClient(
+        [s.port for s in servers], health_interval=0.05
+    ) as client:
+        client.endpoints[0].healthy = False
+        time.sleep(0.5)
+        assert client.endpoints[0].healthy is True
+        assert client.endpoints[0].ewma > 0
+
+        servers[1].stop()
+        time.sleep(0.5)
+        assert client.endpoints[1].healthy is False
+    assert not client._health_thread.is_alive()
+
+
+def test_health_checks_spare_the_rate_limit(tmp_path, test_file):
+    """Test that probing alone never uses up the default search quota."""
+    config_path = tmp_path / "default_quota.ini"
+    config_path.write_text(
+        f"""
+[server]
+port = 0
+ssl_enabled = true
+reread_on_query = false
+
+[file]
+linuxpath = {test_file}
+"""
+    )
+    server = SearchServer(str(config_path))
+    server_thread = threading.Thread(target=server.start)
+    server_thread.daemon = True
+    server_thread.start()
+    time.sleep(0.1)  # Give server time to start
+
+    try:
+        assert server.config.max_requests_per_minute == 100
+        with FailoverSearchClient(
+            [server.port], health_interval=None
+        ) as client:
+            # More than a minute's quota of health checks
+            for _ in range(150):
+                client.check_health()
+            assert client.endpoints[0].healthy is True
+            assert client.search("test string")[0] is True
+        rejections = server.metrics.get("search_rate_limit_rejections_total")
+        assert rejections.value() == 0
+    finally:
+        server.stop()
+        server_thread.join(timeout=1)
+
+
+def test_hedged_request(servers):
+    """Test that a slow endpoint is hedged on another one."""
+    slow, fast = servers
+    search = slow.searcher.search
+
+    def slow_search(query, *args, **kwargs):
+        time.sleep(0.5)
+        return search(query, *args, **kwargs)
+
+    slow.searcher.search = slow_search
+    with FailoverSearchClient(
+        [slow.port, fast.port], timeout=2.0, hedge_after=0.05,
+        health_interval=None,
+    ) as client:
+        client.endpoints[1].ewma = 1.0  # Make the slow server look best
+        start = time.perf_counter()
+        assert client.search("test string")[0] is True
+        assert time.perf_counter() - start < 0.4
+        assert client.hedges == 1
+        assert client.retries == 0
+        # The caller's cancelled attempt is not held against the endpoint
+        assert client.endpoints[0].failures == 0
+        assert client.endpoints[0].healthy is True
+        # Fast answers are not hedged, and the caller's thread can be
+        # reused right after a cancellation
+        client.endpoints[0].ewma = 1.0
+        assert client.search("line1")[0] is True
+        assert client.hedges == 1
+
+    with pytest.raises(ValueError, match="timeout"):
+        FailoverSearchClient([fast.port], hedge_after=0.05)
@@ -0,0 +1,161 @@
+"""
+Tests for the load generator.
+"""
+
+import asyncio
+import json
+import random
+import threading
+import time
+
+import pytest
+
+from src.async_client import AsyncSearchClient
+from src.loadgen import (
+    LoadReport,
+    QueryMix,
+    classify_error,
+    main,
+    run_closed_loop,
+    run_open_loop,
+)
+from src.server import SearchServer
+
+QUERIES = ["line1", "line2", "test string"]
+
+
+@pytest.fixture
+def test_file(tmp_path):
+    """Create a temporary test file."""
+    file_path = tmp_path / "test.txt"
+    file_path.write_text("\n".join(QUERIES) + "\n")
+    return str(file_path)
+
+
+@pytest.fixture
+def server(tmp_path, test_file):
+    """Run a TLS server in a background thread."""
+    config_path = tmp_path / "config.ini"
+    config_path.write_text(
+        f"""
+[server]
+port = 0
+ssl_enabled = true
+reread_on_query = false
+
+[file]
+linuxpath = {test_file}
+
+[rate_limit]
+max_requests_per_minute = 100000
+window_seconds = 60
+"""
+    )
+    server = SearchServer(str(config_path))
+    server_thread = threading.Thread(target=server.start)
+    server_thread.daemon = True
+    server_thread.start()
+    time.sleep(0.1)  # Give server time to start
+    yield server
+    server.stop()
+    server_thread.join(timeout=1)
+
+
+def test_query_mix_hit_ratio():
+    """Test that misses are made at roughly the requested ratio."""
+    mix = QueryMix(QUERIES, hit_ratio=0.7, rng=random.Random(1))
+    picks = [mix.next() for _ in range(2000)]
+    hits = sum(query in QUERIES for query in picks)
+    assert 1300 < hits < 1500
+
+    mix = QueryMix(QUERIES)
+    assert all(mix.next() in QUERIES for _ in range(100))
+    with pytest.raises(ValueError):
+        QueryMix(QUERIES, hit_ratio=1.5)
+
+
+def test_classify_error():
+    """Test the error kinds in the report."""
+    assert classify_error(TimeoutError()) == "timeout"
+    assert classify_error(ConnectionError()) == "connection"
+    assert classify_error(RuntimeError("RATE LIMIT EXCEEDED")) == (
+        "rate_limited"
+    )
+    assert classify_error(ValueError("INVALID REQUEST")) == "invalid"
+    assert classify_error(RuntimeError("ERROR")) == "error"
+
+
+def test_report_to_dict():
+    """Test throughput, error rate and percentiles in the report."""
+    report = LoadReport()
+    report.started, report.finished = 10.0, 12.0
+    for i in range(1, 101):
+        report.record(i / 1000, found=i % 2 == 0)
+    report.record_error("timeout")
+
+    data = report.to_dict()
+    assert data["requests"] == 101
+    assert data["found"] == data["not_found"] == 50
+    assert data["throughput"] == 50.0
+    assert data["error_rate"] == pytest.approx(1 / 101)
+    assert data["errors"] == {"timeout": 1}
+    assert data["latency"]["max"] == 0.1
+    assert data["latency"]["p50"] == pytest.approx(0.05, rel=0.1)
+    assert data["latency"]["p99"] == pytest.approx(0.099, rel=0.1)
+    assert "p999" in report.format_text()
+
+
+def test_closed_loop(server):
+    """Test a closed loop stopping after a number of requests."""
+    report = LoadReport()
+
+    async def run():
+        async with AsyncSearchClient(port=server.port) as client:
+            await run_closed_loop(
+                client, QueryMix(QUERIES, 0.5, random.Random(2)), report,
+                concurrency=8, duration=None, requests=200,
+            )
+
+    asyncio.run(run())
+    assert report.requests == report.completed == 200
+    assert report.found and report.not_found
+    assert report.to_dict()["throughput"] > 0
+
+
+def test_open_loop(server):
+    """Test Poisson arrivals measured after a warmup."""
+    report = LoadReport()
+
+    async def run():
+        async with AsyncSearchClient(port=server.port) as client:
+            await run_open_loop(
+                client, QueryMix(QUERIES), report, rate=500, duration=0.3,
+                warmup=0.1, rng=random.Random(3),
+            )
+
+    asyncio.run(run())
+    # About 150 arrivals in the measured 0.3 seconds
+    assert 75 < report.requests < 250
+    assert report.found == report.requests
+
+    with pytest.raises(ValueError):
+        asyncio.run(run_open_loop(None, None, LoadReport(), rate=0))
+
+
+def test_main_json(server, tmp_path, capsys):
+    """Test the command line with a JSON report."""
+    queries = tmp_path / "queries.txt"
+    queries.write_text("test string\n\nmissing\n")
+    output = tmp_path / "report.json"
+    main([
+        "--host", "localhost", "--port", str(server.port),
+        "--queries", str(queries),
+        "--transport", "tls", "--requests", "50", "--concurrency", "4",
+        "--seed", "1", "--json", "--output", str(output),
+    ])
+
+    data = json.loads(capsys.readouterr().out)
+    assert data["completed"] == 50
+    assert data["settings"]["mode"] == "closed"
+    assert data["found"] > 0 and data["not_found"] > 0
+    assert json.loads(output.read_text()) == data
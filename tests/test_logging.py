@@ -5,13 +5,17 @@ Tests for logging functionality.
 # import os
 import pytest
 import logging
+import logging.handlers
 import time
 import threading
 import socket
 import json
+import queue
+import tracemalloc
 from pathlib import Path
 from src.server import SearchServer
 from src.client import SearchClient
+from src.utils import DroppingQueueHandler, setup_logging
 import ssl
 
 
@@ -213,3 +217,110 @@ def test_ssl_logging(log_config, caplog):
     finally:
         server.stop()
         server_thread.join(timeout=1)
+
+
+def test_setup_logging_does_not_stack_handlers():
+    """Test that repeated setup reuses one queue handler."""
+    logger = setup_logging()
+    setup_logging("INFO")
+    try:
+        queue_handlers = [
+            handler for handler in logger.handlers
+            if isinstance(handler, logging.handlers.QueueHandler)
+        ]
+        assert len(queue_handlers) == 1
+        assert not logger.isEnabledFor(logging.DEBUG)
+        assert logger.isEnabledFor(logging.INFO)
+    finally:
+        setup_logging()
+
+
+def test_full_log_queue_drops_records():
+    """Test that a full log queue drops and counts records."""
+    handler = DroppingQueueHandler(queue.Queue(maxsize=2))
+    for i in range(5):
+        handler.handle(
+            logging.LogRecord(
+                "search_server", logging.INFO, __file__, 1, f"msg {i}",
+                None, None,
+            )
+        )
+    assert handler.queue.qsize() == 2
+    assert handler.dropped == 3
+
+
+class FakeSocket:
+    """Minimal client socket replaying one request."""
+
+    def __init__(self, request: bytes) -> None:
+        self.request = request
+        self.sent = []
+
+    def recv(self, size: int) -> bytes:
+        return self.request
+
+    def sendall(self, data: bytes) -> None:
+        self.sent.append(data)
+
+    def close(self) -> None:
+        pass
+
+
+def _bench_requests(server, count):
+    """Get the seconds and peak bytes allocated per handled request."""
+    request = json.dumps({"query": "test string"}).encode("utf-8")
+    elapsed = 0.0
+    peak_total = 0
+    tracemalloc.start()
+    try:
+        for _ in range(count):
+            client_socket = FakeSocket(request)
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            start = time.perf_counter()
+            server.handle_client(client_socket, ("127.0.0.1", 12345))
+            elapsed += time.perf_counter() - start
+            peak_total += tracemalloc.get_traced_memory()[1] - baseline
+            assert client_socket.sent == [b"STRING EXISTS\n"]
+    finally:
+        tracemalloc.stop()
+    return elapsed / count, peak_total / count
+
+
+def test_logging_overhead_benchmark(tmp_path):
+    """Compare per-request allocations with logging on and off."""
+    corpus = tmp_path / "corpus.txt"
+    corpus.write_text("line1\ntest string\n")
+    config_path = tmp_path / "bench.ini"
+    config_path.write_text(
+        f"""
+[server]
+port = 0
+ssl_enabled = false
+reread_on_query = false
+
+[file]
+linuxpath = {corpus}
+
+[rate_limit]
+max_requests_per_minute = 1000000
+window_seconds = 60
+algorithm = token_bucket
+"""
+    )
+    server = SearchServer(str(config_path))
+    logger = server.logger
+    # Measure the server's own queue pipeline, not pytest's capture handler
+    logger.propagate = False
+    try:
+        logger.setLevel(logging.DEBUG)
+        on_seconds, on_bytes = _bench_requests(server, 500)
+        logger.setLevel(logging.WARNING)
+        off_seconds, off_bytes = _bench_requests(server, 500)
+    finally:
+        logger.setLevel(logging.DEBUG)
+        logger.propagate = True
+
+    # Disabled levels must not build messages or records
+    assert off_bytes < on_bytes
+    assert on_seconds > 0 and off_seconds > 0
@@ -0,0 +1,245 @@
+"""
+Tests for metrics collection and the Prometheus endpoint.
+"""
+
+import threading
+import time
+import urllib.request
+
+import pytest
+
+from src.client import SearchClient
+from src.metrics import (
+    MetricsRegistry,
+    log_linear_buckets,
+    quantile_name,
+)
+from src.server import SearchServer
+
+
+@pytest.fixture
+def test_file(tmp_path):
+    """Create a temporary test file."""
+    file_path = tmp_path / "test.txt"
+    file_path.write_text("line1\nline2\ntest string\n")
+    return str(file_path)
+
+
+@pytest.fixture
+def metrics_config(tmp_path, test_file):
+    """Create a config with the metrics listener enabled."""
+    config_path = tmp_path / "config.ini"
+    config_path.write_text(
+        f"""
+[server]
+port = 0
+ssl_enabled = false
+reread_on_query = false
+
+[file]
+linuxpath = {test_file}
+
+[rate_limit]
+max_requests_per_minute = 2
+window_seconds = 60
+
+[metrics]
+port = 0
+"""
+    )
+    return str(config_path)
+
+
+def test_counter_aggregates_thread_shards():
+    """Test that per-thread counter shards are summed on read."""
+    registry = MetricsRegistry()
+    counter = registry.counter("requests_total", "Requests", ("result",))
+
+    def work():
+        for _ in range(1000):
+            counter.inc("ok")
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert counter.value("ok") == 8000
+    assert counter.snapshot() == {("ok",): 8000}
+
+
+def test_render_prometheus_text():
+    """Test Prometheus text exposition of each metric type."""
+    registry = MetricsRegistry()
+    registry.counter("c_total", "A counter", ("result",)).inc('say "hi"')
+    registry.gauge("g", "A gauge", func=lambda: 7)
+    histogram = registry.histogram("h_seconds", "A histogram", buckets=(1, 2))
+    histogram.observe(0.5)
+    histogram.observe(1.5)
+    histogram.observe(3)
+
+    text = registry.render()
+
+    assert "# TYPE c_total counter" in text
+    assert 'c_total{result="say \\"hi\\""} 1' in text
+    assert "# TYPE g gauge\ng 7" in text
+    assert 'h_seconds_bucket{le="1"} 1' in text
+    assert 'h_seconds_bucket{le="2"} 2' in text
+    assert 'h_seconds_bucket{le="+Inf"} 3' in text
+    assert "h_seconds_sum 5.0" in text
+    assert "h_seconds_count 3" in text
+
+
+def test_metrics_endpoint(metrics_config):
+    """Test that the server exposes request metrics over HTTP."""
+    server = SearchServer(metrics_config)
+    server_thread = threading.Thread(target=server.start)
+    server_thread.daemon = True
+    server_thread.start()
+    time.sleep(0.1)  # Give server time to start
+
+    try:
+        client = SearchClient(port=server.port)
+        assert client.search("test string")[0] is True
+        assert client.search("missing", algorithm="binary")[0] is False
+        with pytest.raises(RuntimeError, match="RATE LIMIT EXCEEDED"):
+            client.search("test string")
+
+        url = f"http://localhost:{server.metrics_server.port}/metrics"
+        with urllib.request.urlopen(url) as response:
+            assert response.status == 200
+            text = response.read().decode("utf-8")
+
+        assert (
+            'search_requests_total{result="found",algorithm="linear"} 1'
+            in text
+        )
+        assert (
+            'search_requests_total{result="not_found",algorithm="binary"} 1'
+            in text
+        )
+        assert "search_rate_limit_rejections_total 1" in text
+        assert "search_corpus_lines 3" in text
+        assert 'search_stage_seconds_count{stage="queue_wait"}' in text
+        assert "search_thread_pool_queue_depth 0" in text
+    finally:
+        server.stop()
+        server_thread.join(timeout=1)
+
+
+def test_log_linear_buckets():
+    """Test log-linear bucket bounds."""
+    assert log_linear_buckets(0.001, 0.1) == (
+        0.001, 0.002, 0.003, 0.004, 0.005, 0.006, 0.007, 0.008, 0.009,
+        0.01, 0.02, 0.03, 0.04, 0.05, 0.06, 0.07, 0.08, 0.09, 0.1,
+    )
+    assert quantile_name(0.999) == "p999"
+
+
+def test_histogram_quantiles():
+    """Test quantile estimates from log-linear buckets."""
+    registry = MetricsRegistry()
+    histogram = registry.histogram(
+        "latency_seconds", "Latency", ("stage",),
+        buckets=log_linear_buckets(0.001, 1.0),
+    )
+    for i in range(1, 1001):
+        histogram.observe(i / 1000, "search")  # 1ms .. 1s, uniform
+
+    assert histogram.quantile(0.5, "search") == pytest.approx(0.5, rel=0.05)
+    assert histogram.quantile(0.99, "search") == pytest.approx(0.99, rel=0.05)
+    summary = histogram.quantiles()[("search",)]
+    assert summary["count"] == 1000
+    assert summary["p90"] == pytest.approx(0.9, rel=0.05)
+    assert histogram.quantile(0.5, "missing") == 0.0
+
+    registry.quantiles("latency_quantile_seconds", "Quantiles", histogram)
+    text = registry.render()
+    assert "# TYPE latency_quantile_seconds gauge" in text
+    assert 'latency_quantile_seconds{stage="search",quantile="0.999"}' in text
+
+
+def test_stats_command(tmp_path, test_file):
+    """Test reading per-stage percentiles through the stats command."""
+    unix_path = str(tmp_path / "search.sock")
+    config_path = tmp_path / "config.ini"
+    config_path.write_text(
+        f"""
+[server]
+port = 0
+ssl_enabled = false
+reread_on_query = false
+unix_socket_path = {unix_path}
+admin_commands = true
+
+[file]
+linuxpath = {test_file}
+
+[rate_limit]
+max_requests_per_minute = 3
+window_seconds = 60
+"""
+    )
+    server = SearchServer(str(config_path))
+    server_thread = threading.Thread(target=server.start)
+    server_thread.daemon = True
+    server_thread.start()
+    time.sleep(0.1)  # Give server time to start
+
+    try:
+        client = SearchClient(port=server.port)
+        assert client.search("test string", algorithm="kmp")[0] is True
+        # Admin commands are refused on the TCP port, ping is not
+        with pytest.raises(ValueError, match="not accepted"):
+            client.command("stats")
+        assert client.command("ping") == {"ok": True}
+
+        admin = SearchClient(unix_socket=unix_path)
+        stats = admin.command("stats")
+        for stage in ("recv", "parse", "rate_limit", "search", "send"):
+            assert stats["stages"][stage]["count"] >= 1
+            assert stats["stages"][stage]["p99"] >= 0
+        assert set(stats["algorithms"]["kmp"]) == {
+            "count", "p50", "p90", "p99", "p999"
+        }
+        with pytest.raises(ValueError, match="not accepted"):
+            admin.command("reboot")
+        # Commands count against the rate limit like searches
+        admin.command("stats")
+        with pytest.raises(RuntimeError, match="RATE LIMIT"):
+            admin.command("stats")
+    finally:
+        server.stop()
+        server_thread.join(timeout=1)
+
+
+def test_admin_commands_off_by_default(tmp_path, test_file):
+    """Test that admin commands need admin_commands even locally."""
+    unix_path = str(tmp_path / "search.sock")
+    config_path = tmp_path / "config.ini"
+    config_path.write_text(
+        f"""
+[server]
+port = 0
+ssl_enabled = false
+unix_socket_path = {unix_path}
+
+[file]
+linuxpath = {test_file}
+"""
+    )
+    server = SearchServer(str(config_path))
+    server_thread = threading.Thread(target=server.start)
+    server_thread.daemon = True
+    server_thread.start()
+    time.sleep(0.1)  # Give server time to start
+
+    try:
+        admin = SearchClient(unix_socket=unix_path)
+        with pytest.raises(ValueError, match="not accepted"):
+            admin.command("stats")
+        assert admin.command("ping") == {"ok": True}
+    finally:
+        server.stop()
+        server_thread.join(timeout=1)
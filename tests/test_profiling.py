@@ -0,0 +1,205 @@
+"""
+Tests for on-demand profiling.
+"""
+
+import os
+import pstats
+import re
+import signal
+import threading
+import time
+
+import pytest
+
+from src.client import SearchClient
+from src.profiling import ProfilingController, StackSampler
+from src.server import SearchServer
+
+
+def busy_loop(stop_event):
+    """Spin until stopped so the sampler has something to see."""
+    while not stop_event.is_set():
+        sum(range(1000))
+
+
+def test_stack_sampler_writes_collapsed_stacks(tmp_path):
+    """Test that sampled stacks are written in collapsed format."""
+    stop_event = threading.Event()
+    worker = threading.Thread(
+        target=busy_loop, args=(stop_event,), name="busy worker"
+    )
+    worker.start()
+    sampler = StackSampler(interval=0.001)
+    sampler.start()
+    time.sleep(0.1)
+    sampler.stop()
+    stop_event.set()
+    worker.join()
+
+    path = tmp_path / "stacks.folded"
+    assert sampler.write(str(path)) > 0
+    lines = path.read_text().splitlines()
+    assert all(re.fullmatch(r"\S+ \d+", line) for line in lines)
+    assert any(
+        line.startswith("busy_worker;") and ":busy_loop" in line
+        for line in lines
+    )
+
+
+def test_cprofile_window(tmp_path):
+    """Test that calls made during the window end up in one pstats file."""
+    profiler = ProfilingController(str(tmp_path))
+    assert profiler.call(sum, range(10)) == 45
+
+    path = str(tmp_path / "out.prof")
+    profiler.start_cprofile(seconds=60, path=path)
+    with pytest.raises(ValueError, match="already running"):
+        profiler.start_cprofile()
+    stop_event = threading.Event()
+    threads = [
+        threading.Thread(target=profiler.call, args=(busy_loop, stop_event))
+        for _ in range(2)
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    stop_event.set()
+    for thread in threads:
+        thread.join()
+    result = profiler.stop_cprofile()
+
+    assert result["output"] == path
+    functions = {func[2] for func in pstats.Stats(path).stats}
+    assert "busy_loop" in functions
+    assert profiler.stop_cprofile() == {"profiling": False}
+
+
+def test_profiler_busy_runs_unprofiled(tmp_path, monkeypatch):
+    """Test that a request still runs when another one holds cProfile."""
+
+    class BusyProfile:
+        def enable(self):
+            raise ValueError("Another profiling tool is already active")
+
+    profiler = ProfilingController(str(tmp_path))
+    profiler.start_cprofile(seconds=60)
+    monkeypatch.setattr("src.profiling.cProfile.Profile", BusyProfile)
+    assert profiler.call(sum, range(10)) == 45
+    monkeypatch.undo()
+    assert profiler.stop_cprofile()["calls"] == 0
+
+
+def test_window_bounds(tmp_path):
+    """Test that window lengths and sampling intervals are bounded."""
+    profiler = ProfilingController(str(tmp_path), max_seconds=10)
+    for seconds in (0, -1, 11, float("inf"), float("nan")):
+        with pytest.raises(ValueError, match="seconds"):
+            profiler.start_cprofile(seconds)
+        with pytest.raises(ValueError, match="seconds"):
+            profiler.start_sampling(seconds)
+    with pytest.raises(ValueError, match="interval"):
+        profiler.start_sampling(1, interval=0)
+    assert not profiler.cprofile_active and not profiler.sampling_active
+    assert os.listdir(tmp_path) == []
+
+
+def test_tracemalloc_snapshots(tmp_path):
+    """Test tracemalloc start, snapshot, diff and stop."""
+    profiler = ProfilingController(str(tmp_path))
+    with pytest.raises(ValueError, match="not running"):
+        profiler.tracemalloc("snapshot")
+    try:
+        profiler.tracemalloc("start")
+        first = profiler.tracemalloc("snapshot", limit=5)
+        assert len(first["top"]) <= 5
+        keep = [bytearray(1024) for _ in range(100)]
+        second = profiler.tracemalloc("snapshot", limit=5)
+        assert second["diff"]
+        assert second["current_bytes"] > 0
+        del keep
+    finally:
+        assert profiler.tracemalloc("stop") == {"tracing": False}
+
+
+def test_sigusr2_toggles_profiling(tmp_path):
+    """Test that SIGUSR2 starts and stops cProfile and the sampler."""
+    profiler = ProfilingController(str(tmp_path))
+    previous = signal.getsignal(signal.SIGUSR2)
+    profiler.install_signal_handler()
+    try:
+        # The handler toggles on its own thread, so poll for the result
+        os.kill(os.getpid(), signal.SIGUSR2)
+        deadline = time.time() + 5
+        while not profiler.sampling_active and time.time() < deadline:
+            time.sleep(0.01)
+        assert profiler.cprofile_active and profiler.sampling_active
+        os.kill(os.getpid(), signal.SIGUSR2)
+        while profiler.sampling_active and time.time() < deadline:
+            time.sleep(0.01)
+        assert not profiler.cprofile_active
+        assert not profiler.sampling_active
+    finally:
+        signal.signal(signal.SIGUSR2, previous)
+
+    suffixes = sorted(
+        os.path.splitext(name)[1] for name in os.listdir(tmp_path)
+    )
+    assert suffixes == [".folded", ".prof"]
+
+
+def test_profile_commands(tmp_path):
+    """Test driving the profilers through admin commands."""
+    corpus = tmp_path / "corpus.txt"
+    corpus.write_text("line1\ntest string\n")
+    config_path = tmp_path / "config.ini"
+    config_path.write_text(
+        f"""
+[server]
+port = 0
+ssl_enabled = false
+reread_on_query = false
+unix_socket_path = {tmp_path / "search.sock"}
+admin_commands = true
+
+[file]
+linuxpath = {corpus}
+
+[rate_limit]
+max_requests_per_minute = 100
+window_seconds = 60
+
+[profiling]
+output_dir = {tmp_path}
+"""
+    )
+    server = SearchServer(str(config_path))
+    server_thread = threading.Thread(target=server.start)
+    server_thread.daemon = True
+    server_thread.start()
+    time.sleep(0.1)  # Give server time to start
+
+    try:
+        client = SearchClient(unix_socket=str(tmp_path / "search.sock"))
+        assert client.command("profile", seconds=60)["profiling"] is True
+        assert client.command("sample", seconds=60)["sampling"] is True
+        assert client.command("profile")["error"] == (
+            "cProfile is already running"
+        )
+        assert "interval" in client.command("sample", interval=0)["error"]
+        assert "seconds" in client.command("profile", seconds=1e9)["error"]
+        assert client.search("test string")[0] is True
+
+        profile = client.command("profile", action="stop")
+        assert profile["calls"] > 0
+        assert "handle_client" in {
+            func[2] for func in pstats.Stats(profile["output"]).stats
+        }
+        sample = client.command("sample", action="stop")
+        assert os.path.exists(sample["output"])
+
+        assert client.command("tracemalloc", action="start")["tracing"]
+        assert "top" in client.command("tracemalloc", action="snapshot")
+        assert not client.command("tracemalloc", action="stop")["tracing"]
+    finally:
+        server.stop()
+        server_thread.join(timeout=1)
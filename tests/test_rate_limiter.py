@@ -0,0 +1,283 @@
+"""
+Tests for rate limiting.
+"""
+
+import sys
+import threading
+import time
+
+import pytest
+
+from src.benchmark import stress_rate_limiter
+from src.rate_limiter import (
+    ConnectionLimiter,
+    CostModel,
+    RateLimiter,
+    RateLimitSweeper,
+    TokenBucketRateLimiter,
+    create_rate_limiter,
+)
+
+
+class FakeClock:
+    """Manually advanced monotonic clock."""
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_sliding_log_limits_requests():
+    """Test the sliding log limiter rejects requests over the limit."""
+    limiter = RateLimiter(max_requests=3, window_seconds=60)
+
+    assert all(limiter.check_rate_limit("1.2.3.4") for _ in range(3))
+    assert limiter.check_rate_limit("1.2.3.4") is False
+    assert limiter.check_rate_limit("5.6.7.8") is True
+
+
+def test_token_bucket_burst_and_refill():
+    """Test the token bucket allows a burst then refills over time."""
+    clock = FakeClock()
+    limiter = TokenBucketRateLimiter(
+        max_requests=4, window_seconds=60, clock=clock
+    )
+
+    assert all(limiter.check_rate_limit("1.2.3.4") for _ in range(4))
+    assert limiter.check_rate_limit("1.2.3.4") is False
+
+    # One token every 15 seconds
+    clock.now += 14.9
+    assert limiter.check_rate_limit("1.2.3.4") is False
+    clock.now += 0.2
+    assert limiter.check_rate_limit("1.2.3.4") is True
+    assert limiter.check_rate_limit("1.2.3.4") is False
+
+    # Refilling never exceeds the bucket capacity
+    clock.now += 3600
+    assert all(limiter.check_rate_limit("1.2.3.4") for _ in range(4))
+    assert limiter.check_rate_limit("1.2.3.4") is False
+
+
+def test_token_bucket_constant_state_per_client():
+    """Test the token bucket stores a fixed-size record per client."""
+    clock = FakeClock()
+    limiter = TokenBucketRateLimiter(
+        max_requests=1000, window_seconds=60, clock=clock
+    )
+    for _ in range(1000):
+        limiter.check_rate_limit("1.2.3.4")
+
+    assert len(limiter.buckets["1.2.3.4"]) == 2
+
+
+def test_token_bucket_cleanup():
+    """Test that cleanup forgets clients with full buckets."""
+    clock = FakeClock()
+    limiter = TokenBucketRateLimiter(
+        max_requests=2, window_seconds=10, clock=clock
+    )
+    limiter.check_rate_limit("1.2.3.4")
+    clock.now += 1
+    limiter.check_rate_limit("5.6.7.8")
+
+    clock.now += 4.5
+    limiter.cleanup()
+    assert set(limiter.buckets) == {"5.6.7.8"}
+
+
+def test_create_rate_limiter():
+    """Test selecting the rate limiter implementation by name."""
+    assert isinstance(create_rate_limiter("sliding_log", 5, 60), RateLimiter)
+    assert isinstance(
+        create_rate_limiter("token_bucket", 5, 60), TokenBucketRateLimiter
+    )
+    with pytest.raises(ValueError, match="Unknown rate limit algorithm"):
+        create_rate_limiter("leaky", 5, 60)
+
+
+@pytest.mark.parametrize("limiter_cls", [RateLimiter, TokenBucketRateLimiter])
+def test_weighted_requests(limiter_cls):
+    """Test that costly requests use up more of the quota."""
+    limiter = limiter_cls(max_requests=5, window_seconds=60)
+    assert limiter.check_rate_limit("1.2.3.4", cost=3) is True
+    assert limiter.check_rate_limit("1.2.3.4", cost=3) is False
+    assert limiter.check_rate_limit("1.2.3.4", cost=2) is True
+    assert limiter.check_rate_limit("1.2.3.4") is False
+
+
+@pytest.mark.parametrize("limiter_cls", [RateLimiter, TokenBucketRateLimiter])
+def test_charge_after_request(limiter_cls):
+    """Test that measured cost charged afterwards blocks later requests."""
+    limiter = limiter_cls(max_requests=5, window_seconds=60)
+    assert limiter.check_rate_limit("1.2.3.4") is True
+    limiter.charge("1.2.3.4", 4)
+    assert limiter.check_rate_limit("1.2.3.4") is False
+    assert limiter.check_rate_limit("5.6.7.8") is True
+
+
+def test_token_bucket_debt_is_bounded():
+    """Test that post-hoc charges cannot push a bucket below -capacity."""
+    clock = FakeClock()
+    limiter = TokenBucketRateLimiter(
+        max_requests=4, window_seconds=4, clock=clock
+    )
+    limiter.charge("1.2.3.4", 100)
+    assert limiter.buckets["1.2.3.4"][0] == -4
+
+    clock.now += 5
+    assert limiter.check_rate_limit("1.2.3.4") is True
+
+
+def test_connection_limiter():
+    """Test the per-client concurrent connection cap."""
+    limiter = ConnectionLimiter(max_connections=2)
+    assert limiter.acquire("1.2.3.4") is True
+    assert limiter.acquire("1.2.3.4") is True
+    assert limiter.acquire("1.2.3.4") is False
+    assert limiter.acquire("5.6.7.8") is True
+
+    limiter.release("1.2.3.4")
+    assert limiter.connections("1.2.3.4") == 1
+    assert limiter.acquire("1.2.3.4") is True
+
+    for key in ("1.2.3.4", "1.2.3.4", "5.6.7.8"):
+        limiter.release(key)
+    assert limiter.tracked_clients == 0
+    assert ConnectionLimiter(max_connections=0).acquire("1.2.3.4") is True
+
+
+def test_cost_model():
+    """Test upfront and time-based request pricing."""
+    model = CostModel({"linear": 2.5}, seconds_per_unit=0.01)
+    assert model.upfront("linear") == 2.5
+    assert model.upfront("linear", batch_size=4) == 10
+    assert model.upfront("kmp") == 1.0
+    assert model.measured(0.05) == pytest.approx(5)
+    assert CostModel().measured(10) == 0
+
+
+@pytest.mark.parametrize("limiter_cls", [RateLimiter, TokenBucketRateLimiter])
+def test_concurrent_checks_are_exact(limiter_cls):
+    """Test that concurrent checks never admit more than the limit."""
+    old_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)  # Force frequent thread switches
+    try:
+        limiter = limiter_cls(max_requests=500, window_seconds=3600)
+        allowed = []
+
+        def work():
+            allowed.append(
+                sum(limiter.check_rate_limit("1.2.3.4") for _ in range(200))
+            )
+
+        threads = [threading.Thread(target=work) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(old_interval)
+
+    assert sum(allowed) == 500
+
+
+def test_rate_limiter_stress():
+    """
+    Stress the limiters from many threads.
+
+    Each thread checks its own set of clients, so correctness is verified
+    per client while the shard count controls lock contention. Throughput
+    is reported by ``benchmark.py limiters``.
+    """
+    clients_per_thread = 50
+    checks_per_client = 40
+    limit = 30
+
+    for limiter_cls in (RateLimiter, TokenBucketRateLimiter):
+        for shards in (1, 16):
+            for num_threads in (1, 4, 16):
+                limiter = limiter_cls(
+                    max_requests=limit, window_seconds=3600, shards=shards
+                )
+                _, allowed = stress_rate_limiter(
+                    limiter, num_threads, clients_per_thread,
+                    checks_per_client,
+                )
+
+                assert len(allowed) == num_threads * clients_per_thread
+                assert all(count == limit for count in allowed.values())
+
+
+@pytest.mark.parametrize("limiter_cls", [RateLimiter, TokenBucketRateLimiter])
+def test_tracked_clients_are_capped(limiter_cls):
+    """Test that a scan from many addresses keeps memory bounded."""
+    limiter = limiter_cls(
+        max_requests=10, window_seconds=60, shards=4, max_clients=1000
+    )
+    for i in range(50000):
+        limiter.check_rate_limit(f"10.{i >> 16}.{(i >> 8) & 255}.{i & 255}")
+
+    assert limiter.tracked_clients <= 1000
+    assert limiter.evictions >= 49000
+
+
+def test_lru_keeps_recently_active_clients():
+    """Test that eviction removes the least recently used client."""
+    limiter = RateLimiter(
+        max_requests=10, window_seconds=60, shards=1, max_clients=2
+    )
+    limiter.check_rate_limit("a")
+    limiter.check_rate_limit("b")
+    limiter.check_rate_limit("a")  # "b" is now least recently used
+    limiter.check_rate_limit("c")
+
+    assert set(limiter.requests) == {"a", "c"}
+    assert limiter.evictions == 1
+
+
+def test_eviction_prefers_idle_clients():
+    """Test that a full shard keeps throttled clients over idle ones."""
+    clock = FakeClock()
+    limiter = TokenBucketRateLimiter(
+        max_requests=10, window_seconds=10, clock=clock, shards=1,
+        max_clients=2,
+    )
+    limiter.check_rate_limit("throttled", cost=10)
+    limiter.check_rate_limit("idle")
+    clock.now += 2  # "idle" has refilled, "throttled" has 2 tokens
+
+    limiter.check_rate_limit("newcomer")
+    assert set(limiter.buckets) == {"throttled", "newcomer"}
+    assert limiter.evictions == 1
+    assert limiter.pressure_evictions == 0
+
+    # Only throttled clients are left: evict the least recently used
+    limiter.check_rate_limit("another")
+    assert set(limiter.buckets) == {"newcomer", "another"}
+    assert limiter.evictions == 2
+    assert limiter.pressure_evictions == 1
+
+
+def test_sweeper_runs_cleanup():
+    """Test that the background sweeper periodically cleans up."""
+    clock = FakeClock()
+    limiter = TokenBucketRateLimiter(
+        max_requests=1, window_seconds=1, clock=clock
+    )
+    limiter.check_rate_limit("1.2.3.4")
+    clock.now += 5
+
+    sweeper = RateLimitSweeper(limiter, interval=0.01)
+    sweeper.start()
+    try:
+        deadline = time.time() + 2
+        while limiter.tracked_clients and time.time() < deadline:
+            time.sleep(0.01)
+    finally:
+        sweeper.stop()
+
+    assert limiter.tracked_clients == 0
+    assert sweeper.sweeps >= 1
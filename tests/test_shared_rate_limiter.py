@@ -0,0 +1,211 @@
+"""
+Tests for the cross-process shared rate limiter.
+"""
+
+import multiprocessing
+import threading
+
+import pytest
+
+from src.rate_limiter import create_rate_limiter
+from src.shared_rate_limiter import SharedMemoryRateLimiter
+
+
+def _count_allowed(path, attempts, results):
+    """Run checks for one client from a separate process."""
+    limiter = SharedMemoryRateLimiter(
+        max_requests=150, window_seconds=3600, path=path, slots=64
+    )
+    allowed = sum(
+        limiter.check_rate_limit("1.2.3.4") for _ in range(attempts)
+    )
+    results.put(allowed)
+    limiter.close()
+
+
+def test_shared_limiter_basic(tmp_path):
+    """Test burst limit and independent clients in the shared table."""
+    limiter = SharedMemoryRateLimiter(
+        max_requests=3, window_seconds=60, path=str(tmp_path / "rl")
+    )
+    try:
+        assert all(limiter.check_rate_limit("1.2.3.4") for _ in range(3))
+        assert limiter.check_rate_limit("1.2.3.4") is False
+        assert limiter.check_rate_limit("5.6.7.8") is True
+        assert limiter.tracked_clients == 2
+    finally:
+        limiter.close()
+
+
+def test_shared_limiter_state_is_shared(tmp_path):
+    """Test that two limiters on the same file share quotas."""
+    path = str(tmp_path / "rl")
+    first = SharedMemoryRateLimiter(2, 60, path=path, slots=64)
+    second = SharedMemoryRateLimiter(2, 60, path=path, slots=64)
+    try:
+        assert first.check_rate_limit("1.2.3.4") is True
+        assert second.check_rate_limit("1.2.3.4") is True
+        assert first.check_rate_limit("1.2.3.4") is False
+        assert second.check_rate_limit("1.2.3.4") is False
+    finally:
+        first.close()
+        second.close()
+
+
+def test_shared_limiter_global_quota_across_processes(tmp_path):
+    """Test that several processes enforce one quota per client."""
+    path = str(tmp_path / "rl")
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    workers = [
+        context.Process(target=_count_allowed, args=(path, 100, results))
+        for _ in range(4)
+    ]
+    for worker in workers:
+        worker.start()
+    allowed = [results.get(timeout=30) for _ in workers]
+    for worker in workers:
+        worker.join(timeout=30)
+
+    assert sum(allowed) == 150
+
+
+def test_shared_limiter_weighted_requests(tmp_path):
+    """Test request costs and post-hoc charges in the shared table."""
+    limiter = SharedMemoryRateLimiter(
+        max_requests=5, window_seconds=60, path=str(tmp_path / "rl")
+    )
+    try:
+        assert limiter.check_rate_limit("1.2.3.4", cost=3) is True
+        assert limiter.check_rate_limit("1.2.3.4", cost=3) is False
+        limiter.charge("1.2.3.4", 1)
+        assert limiter.check_rate_limit("1.2.3.4") is True
+        assert limiter.check_rate_limit("1.2.3.4") is False
+    finally:
+        limiter.close()
+
+
+def test_shared_limiter_reuses_stalest_slot(tmp_path):
+    """Test that a full set evicts the least recently updated client."""
+    now = [0.0]
+    limiter = SharedMemoryRateLimiter(
+        max_requests=5,
+        window_seconds=60,
+        path=str(tmp_path / "rl"),
+        slots=8,
+        clock=lambda: now[0],
+    )
+    try:
+        for i in range(8):
+            now[0] += 1
+            limiter.check_rate_limit(f"client-{i}")
+        assert limiter.tracked_clients == 8
+
+        now[0] += 1
+        limiter.check_rate_limit("newcomer")
+        assert limiter.tracked_clients == 8
+        assert limiter.evictions == 1
+        # Every bucket was still refilling
+        assert limiter.pressure_evictions == 1
+    finally:
+        limiter.close()
+
+
+def test_shared_limiter_evicts_refilled_slot_first(tmp_path):
+    """Test that a throttled client outlives idle ones in a full set."""
+    now = [0.0]
+    limiter = SharedMemoryRateLimiter(
+        max_requests=5,
+        window_seconds=5,
+        path=str(tmp_path / "rl"),
+        slots=8,
+        clock=lambda: now[0],
+    )
+    try:
+        limiter.charge("throttled", 10)
+        for i in range(7):
+            now[0] += 1
+            limiter.check_rate_limit(f"client-{i}")
+        # The throttled client is the stalest, but has only 2 tokens back
+        limiter.check_rate_limit("newcomer")
+        assert limiter.evictions == 1
+        assert limiter.pressure_evictions == 0
+        assert limiter.check_rate_limit("throttled", cost=3) is False
+    finally:
+        limiter.close()
+
+
+def test_shared_limiter_cleanup(tmp_path):
+    """Test that cleanup frees slots whose buckets have refilled."""
+    now = [0.0]
+    limiter = SharedMemoryRateLimiter(
+        max_requests=2,
+        window_seconds=10,
+        path=str(tmp_path / "rl"),
+        clock=lambda: now[0],
+    )
+    try:
+        limiter.check_rate_limit("1.2.3.4")
+        now[0] += 6
+        limiter.cleanup()
+        assert limiter.tracked_clients == 0
+    finally:
+        limiter.close()
+
+
+def test_shared_limiter_rejects_incompatible_table(tmp_path):
+    """Test that a table with a different layout is not reused."""
+    path = str(tmp_path / "rl")
+    SharedMemoryRateLimiter(2, 60, path=path, slots=64).close()
+    with pytest.raises(ValueError, match="incompatible layout"):
+        SharedMemoryRateLimiter(2, 60, path=path, slots=128)
+
+
+def test_create_shared_rate_limiter(tmp_path):
+    """Test selecting the shared backend through the factory."""
+    limiter = create_rate_limiter(
+        "token_bucket",
+        5,
+        60,
+        max_clients=64,
+        backend="shared",
+        shared_path=str(tmp_path / "rl"),
+    )
+    assert type(limiter).__name__ == "SharedMemoryRateLimiter"
+    limiter.close()
+
+    with pytest.raises(ValueError, match="Unknown rate limit backend"):
+        create_rate_limiter("token_bucket", 5, 60, backend="redis")
+    with pytest.raises(ValueError, match="requires token_bucket"):
+        create_rate_limiter("sliding_log", 5, 60, backend="shared",
+                            shared_path=str(tmp_path / "rl"))
+
+
+def test_limiters_on_one_path_share_the_table(tmp_path):
+    """Test that two limiters in a process exclude each other safely."""
+    path = str(tmp_path / "rl")
+    first = SharedMemoryRateLimiter(100, 3600, path=path, slots=64)
+    second = SharedMemoryRateLimiter(100, 3600, path=path, slots=64)
+    allowed = []
+
+    def hammer(limiter):
+        for _ in range(100):
+            if limiter.check_rate_limit("1.2.3.4"):
+                allowed.append(1)
+
+    threads = [
+        threading.Thread(target=hammer, args=(limiter,))
+        for limiter in (first, second) * 4
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(allowed) == 100
+
+    # Closing one limiter keeps the table (and its locks) for the other
+    first.close()
+    first.close()
+    assert second.check_rate_limit("5.6.7.8") is True
+    assert second.tracked_clients == 2
+    second.close()
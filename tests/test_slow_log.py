@@ -0,0 +1,146 @@
+"""
+Tests for the slow-query log.
+"""
+
+import json
+import threading
+import time
+
+import pytest
+
+from src.client import SearchClient
+from src.server import SearchServer
+from src.slow_log import SlowQueryLog
+
+
+@pytest.fixture
+def test_file(tmp_path):
+    """Create a temporary test file."""
+    file_path = tmp_path / "test.txt"
+    file_path.write_text("line1\nline2\ntest string\n")
+    return str(file_path)
+
+
+def make_request(duration, **fields):
+    """Build a per-request record like the server does."""
+    request = {
+        "result": "found",
+        "duration": duration,
+        "recv": 0.001,
+        "search": duration / 2,
+    }
+    request.update(fields)
+    return request
+
+
+def test_only_slow_requests_are_captured():
+    """Test the threshold and the per-stage breakdown."""
+    slow_log = SlowQueryLog(threshold=0.1)
+    assert slow_log.record(make_request(0.05)) is False
+    assert slow_log.record(make_request(0.2), "secret") is True
+
+    (entry,) = slow_log.entries()
+    assert entry["duration"] == 0.2
+    assert entry["stages"] == {"recv": 0.001, "search": 0.1}
+    assert "search" not in entry
+    assert "query" not in entry
+    assert slow_log.captured == 1
+
+
+def test_ring_buffer_keeps_newest_first():
+    """Test that the buffer is bounded and read newest first."""
+    slow_log = SlowQueryLog(threshold=0.0, capacity=3, include_query=True)
+    for i in range(5):
+        slow_log.record(make_request(0.01, i=i), f"query {i}")
+
+    entries = slow_log.entries()
+    assert [entry["i"] for entry in entries] == [4, 3, 2]
+    assert entries[0]["query"] == "query 4"
+    assert len(slow_log.entries(limit=1)) == 1
+    assert slow_log.captured == 5
+
+    slow_log.clear()
+    assert slow_log.entries() == []
+
+
+def test_slow_log_file(tmp_path):
+    """Test that captures are also written as JSON lines."""
+    path = tmp_path / "slow.log"
+    slow_log = SlowQueryLog(threshold=0.0, path=str(path))
+    slow_log.start()
+    slow_log.record(make_request(0.3))
+    slow_log.stop()
+
+    with open(path) as f:
+        (entry,) = [json.loads(line) for line in f]
+    assert entry["stages"]["search"] == 0.15
+
+
+def test_slowlog_command(tmp_path, test_file):
+    """Test reading and resetting the slow-query log over the wire."""
+    config_path = tmp_path / "config.ini"
+    config_path.write_text(
+        f"""
+[server]
+port = 0
+ssl_enabled = true
+reread_on_query = false
+unix_socket_path = {tmp_path / "search.sock"}
+admin_commands = true
+
+[file]
+linuxpath = {test_file}
+
+[rate_limit]
+max_requests_per_minute = 100
+window_seconds = 60
+
+[slow_log]
+threshold = 0
+"""
+    )
+    server = SearchServer(str(config_path))
+    server_thread = threading.Thread(target=server.start)
+    server_thread.daemon = True
+    server_thread.start()
+    time.sleep(0.1)  # Give server time to start
+
+    try:
+        client = SearchClient(port=server.port)
+        assert client.search("test string", algorithm="kmp")[0] is True
+        assert client.search("missing")[0] is False
+
+        # Peer addresses and timings are not readable, or clearable,
+        # from the network
+        with pytest.raises(ValueError, match="not accepted"):
+            client.command("slowlog")
+        with pytest.raises(ValueError, match="not accepted"):
+            client.command("slowlog", action="reset")
+
+        admin = SearchClient(unix_socket=str(tmp_path / "search.sock"))
+        assert len(admin.command("slowlog", limit=1)["entries"]) == 1
+        result = admin.command("slowlog")
+        assert result["threshold"] == 0.0
+        assert result["captured"] >= 4
+        # Captures are recorded after the response is sent, so look the
+        # entry up rather than relying on its position
+        (entry,) = [
+            entry for entry in result["entries"]
+            if entry["result"] == "not_found"
+        ]
+        assert entry["transport"] == "tls"
+        assert entry["query_length"] == len("missing")
+        assert "generation" in entry
+        for stage in ("tls", "queue_wait", "recv", "parse", "rate_limit",
+                      "search", "send"):
+            assert entry["stages"][stage] >= 0
+
+        assert admin.command("slowlog", action="reset") == {"cleared": True}
+        # The searches are gone; only slowlog commands finishing around the
+        # reset can have been captured since
+        entries = admin.command("slowlog")["entries"]
+        assert len(entries) <= 2
+        assert all(entry["result"] == "command" for entry in entries)
+    finally:
+        server.stop()
+        server_thread.join(timeout=1)
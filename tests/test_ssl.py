@@ -5,6 +5,7 @@ Tests for SSL functionality.
 # import os
 import pytest
 import ssl
+import socket
 import time
 import threading
 from pathlib import Path
@@ -170,3 +171,125 @@ def test_ssl_certificate_chain(ssl_config):
     finally:
         server.stop()
         server_thread.join(timeout=1)
+
+
+def test_ssl_session_resumption(ssl_config):
+    """Test that a client resumes its TLS session across connections."""
+    server = SearchServer(ssl_config)
+    server_thread = threading.Thread(target=server.start)
+    server_thread.daemon = True
+    server_thread.start()
+    time.sleep(0.1)  # Give server time to start
+
+    try:
+        client = SearchClient(port=server.port)
+        client.search("test string")
+        assert client.last_session_reused is False
+        assert client.tls_session is not None
+
+        client.search("test string")
+        assert client.last_session_reused is True
+        assert client.handshake_latency.count("true") == 1
+        assert client.handshake_latency.count("false") == 1
+
+        # The server records handshake latency by resumption status
+        handshakes = server.metrics.get("search_tls_handshakes_total")
+        assert handshakes.value("true") == 1
+        assert handshakes.value("false") == 1
+    finally:
+        server.stop()
+        server_thread.join(timeout=1)
+
+
+def test_rate_limit_by_client_certificate(ssl_config):
+    """Test that TLS clients can be rate limited by certificate name."""
+    with open(ssl_config, "a") as f:
+        f.write("key = certificate\n")
+    server = SearchServer(ssl_config)
+    server_thread = threading.Thread(target=server.start)
+    server_thread.daemon = True
+    server_thread.start()
+    time.sleep(0.1)  # Give server time to start
+
+    try:
+        client = SearchClient(port=server.port)
+        client.search("test string")
+        client.search("test string")  # Resumed session keeps the identity
+        requests = server.rate_limiter.requests
+        assert list(requests) == ["cert:search_client"]
+        assert len(requests["cert:search_client"]) == 2
+    finally:
+        server.stop()
+        server_thread.join(timeout=1)
+
+
+def test_slow_handshake_isolated_from_search_workers(tmp_path):
+    """Test that stalled handshakes time out without blocking searches."""
+    config_path = tmp_path / "config.ini"
+    config_path.write_text(
+        """
+[server]
+port = 0
+ssl_enabled = true
+reread_on_query = false
+handshake_workers = 2
+handshake_queue_size = 3
+handshake_timeout = 0.5
+
+[file]
+linuxpath = test.txt
+
+[rate_limit]
+max_requests_per_minute = 100
+window_seconds = 60
+"""
+    )
+    server = SearchServer(str(config_path))
+    server_thread = threading.Thread(target=server.start)
+    server_thread.daemon = True
+    server_thread.start()
+    time.sleep(0.1)  # Give server time to start
+
+    stalled = []
+    try:
+        # Connect without ever sending a ClientHello
+        for _ in range(4):
+            stalled.append(
+                socket.create_connection(("localhost", server.port))
+            )
+        time.sleep(0.1)
+
+        failures = server.metrics.get("search_tls_handshake_failures_total")
+        assert failures.value("queue_full") == 1
+
+        # Stalled handshakes hit their deadline and free the stage
+        time.sleep(1.2)
+        assert failures.value("timeout") == 3
+
+        client = SearchClient(port=server.port)
+        found, _ = client.search("test string")
+        assert isinstance(found, bool)
+        assert client.last_handshake_time is not None
+    finally:
+        for sock in stalled:
+            sock.close()
+        server.stop()
+        server_thread.join(timeout=1)
+
+
+def test_dispatch_after_handshake_pool_shutdown(ssl_config):
+    """Test that a connection refused during stop() frees its slot."""
+    server = SearchServer(ssl_config)
+    server._handshake_pool.shutdown()
+    ours, theirs = socket.socketpair()
+    try:
+        server._dispatch_connection(ours, ("127.0.0.1", 12345))
+        assert theirs.recv(1) == b""  # Closed, not leaked
+        depth = server.metrics.get("search_tls_handshake_queue_depth")
+        assert depth.value() == 0
+        # Every slot is free again
+        for _ in range(server.config.handshake_queue_size):
+            assert server._handshake_slots.acquire(blocking=False)
+    finally:
+        theirs.close()
+        server._thread_pool.shutdown()
@@ -183,6 +183,61 @@ def test_server_graceful_shutdown(server_config):
     assert server._running is False
 
 
+def test_multiple_acceptor_threads(test_file):
+    """Test that several acceptor threads serve a burst of connections."""
+    config_content = f"""
+[server]
+port = 0
+ssl_enabled = false
+reread_on_query = false
+accept_threads = 4
+
+[file]
+linuxpath = {test_file}
+
+[rate_limit]
+max_requests_per_minute = 1000
+window_seconds = 60
+"""
+    with tempfile.NamedTemporaryFile(
+            mode='w', delete=False, suffix='.ini') as f:
+        f.write(config_content)
+        config_path = f.name
+
+    server = SearchServer(config_path)
+    server_thread = threading.Thread(target=server.start)
+    server_thread.daemon = True
+    server_thread.start()
+    time.sleep(0.1)
+
+    acceptors = [
+        t for t in threading.enumerate() if t.name.startswith("acceptor-")
+    ]
+    assert len(acceptors) == 3
+
+    def make_request(client_id):
+        client = SearchClient(port=server.port, config_path=None)
+        found, _ = client.search(f"test_line_{client_id}")
+        return found
+
+    with ThreadPoolExecutor(max_workers=40) as executor:
+        results = list(executor.map(make_request, range(40)))
+    assert all(results)
+
+    server.stop()
+    server_thread.join(timeout=2)
+    assert not server_thread.is_alive()
+    assert not any(t.is_alive() for t in acceptors)
+
+
+def test_stop_wakes_idle_acceptor(running_server):
+    """Test that stop() returns promptly while the server is idle."""
+    start = time.perf_counter()
+    running_server.stop()
+    assert time.perf_counter() - start < 1.0
+    assert running_server._running is False
+
+
 def test_connection_error_handling(running_server):
     """Test that server handles connection errors gracefully."""
     import socket